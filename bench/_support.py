@@ -0,0 +1,158 @@
+"""tests/ 与 bench/ 共用的支持代码：在 AstrBot 之外加载并创建插件实例。
+
+插件依赖的 httpx / Pillow 需按 requirements.txt 安装；AstrBot 框架本身不在此安装，
+这里只注入满足 main.py 导入所需的最小 astrbot 模块，不参与任何被测逻辑。
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+import types
+from enum import Enum
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _install_astrbot_shim() -> None:
+    try:
+        import astrbot.api  # noqa: F401
+
+        return
+    except ImportError:
+        pass
+
+    class AstrBotConfig(dict):
+        def save_config(self):
+            pass
+
+    class AstrMessageEvent:
+        def __init__(self, text: str = "", sender: str = "1", origin: str = "aiocqhttp:GroupMessage:1"):
+            self.message_str = text
+            self._sender = sender
+            self.unified_msg_origin = origin
+
+        def get_sender_id(self):
+            return self._sender
+
+        def get_sender_name(self):
+            return ""
+
+        def plain_result(self, text):
+            return text
+
+    class MessageChain:
+        def __init__(self):
+            self.chain = []
+
+        def message(self, text):
+            self.chain.append(text)
+            return self
+
+        def file_image(self, path):
+            self.chain.append(path)
+            return self
+
+    class _Filter:
+        def __getattr__(self, name):
+            def factory(*args, **kwargs):
+                return lambda func: func
+
+            return factory
+
+    class Context:
+        async def send_message(self, target, message):
+            return True
+
+    class Star:
+        def __init__(self, context):
+            self.context = context
+
+    def register(*args, **kwargs):
+        return lambda cls: cls
+
+    class MessageType(Enum):
+        GROUP_MESSAGE = "GroupMessage"
+        FRIEND_MESSAGE = "FriendMessage"
+        OTHER_MESSAGE = "OtherMessage"
+
+    modules = {
+        "astrbot": {},
+        "astrbot.api": {"AstrBotConfig": AstrBotConfig, "logger": logging.getLogger("astrbot")},
+        "astrbot.api.event": {"AstrMessageEvent": AstrMessageEvent, "MessageChain": MessageChain, "filter": _Filter()},
+        "astrbot.api.star": {"Context": Context, "Star": Star, "register": register},
+        "astrbot.core": {},
+        "astrbot.core.platform": {},
+        "astrbot.core.platform.message_type": {"MessageType": MessageType},
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+def load_plugin():
+    """导入并返回插件的 main 模块。"""
+    _install_astrbot_shim()
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    import main
+
+    return main
+
+
+def timeit(func: Callable[[], object], repeat: int = 5) -> Tuple[float, float]:
+    """运行 repeat 次，返回 (最快, 平均) 耗时（秒）。"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return min(samples), sum(samples) / len(samples)
+
+
+async def timeit_async(func: Callable[[], Awaitable[object]], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """先预热 warmup 次，再运行 repeat 次，返回每次耗时（秒）。"""
+    for _ in range(warmup):
+        await func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "best": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": len(samples),
+    }
+
+
+class BenchContext:
+    """替代 AstrBot Context：只统计发送次数，不真正发送。"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, target, message):
+        self.sent += 1
+        return True
+
+
+async def make_plugin(config: dict, context: "BenchContext" = None):
+    """在当前事件循环中创建插件实例，并停掉后台轮询与测速任务以免干扰计时；用完调用 terminate()。"""
+    main = load_plugin()
+    from astrbot.api import AstrBotConfig
+
+    plugin = main.SteamWatchPlugin(context or BenchContext(), AstrBotConfig(config))
+    for task in (plugin._task, plugin._probe_task):
+        task.cancel()
+    await asyncio.gather(plugin._task, plugin._probe_task, return_exceptions=True)
+    return plugin
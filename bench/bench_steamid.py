@@ -0,0 +1,59 @@
+"""SteamID 格式换算微基准。
+
+对比逐个换算（每次都重新计算 MD5 校验）与批量换算（带 LRU）的耗时：
+
+    python bench/bench_steamid.py [数量]
+"""
+
+import random
+import sys
+
+from _support import load_plugin, timeit
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    plugin = load_plugin()
+    rng = random.Random(0)
+    steamids = [plugin.STEAMID64_BASE + rng.randrange(1, 1 << 31) for _ in range(count)]
+    forms = []
+    for sid in steamids:
+        account_id = sid - plugin.STEAMID64_BASE
+        forms.extend([str(sid), str(account_id), f"STEAM_0:{account_id & 1}:{account_id >> 1}", f"[U:1:{account_id}]"])
+    raw_encode = plugin._encode_csgo_friend_code.__wrapped__
+
+    def per_id_uncached():
+        # 旧写法：调用方拿到字符串 SteamID 后逐个换算
+        for sid in map(str, steamids):
+            plugin._account_id_from_steamid64(int(sid))
+            raw_encode(int(sid))
+
+    def bulk_cold():
+        plugin._encode_csgo_friend_code.cache_clear()
+        plugin._convert_steamids(map(str, steamids), with_csgo=True)
+
+    def bulk_warm():
+        plugin._convert_steamids(map(str, steamids), with_csgo=True)
+
+    def parse_all_forms():
+        plugin._convert_steamids(forms)
+
+    codes = [plugin._encode_csgo_friend_code(sid) for sid in steamids]
+
+    def decode_codes():
+        plugin._convert_steamids(codes)
+
+    print(f"SteamID 换算基准：{count} 个账号（LRU 容量 {plugin.STEAMID_CODE_CACHE_SIZE}）")
+    for label, func in [
+        ("逐个换算（无缓存）", per_id_uncached),
+        ("批量换算（冷缓存）", bulk_cold),
+        ("批量换算（热缓存）", bulk_warm),
+        ("识别 64/32/Steam2/Steam3", parse_all_forms),
+        ("识别 CS:GO 好友码", decode_codes),
+    ]:
+        best, mean = timeit(func)
+        print(f"{label:<24} 最快 {best * 1000:8.2f} ms  平均 {mean * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""本地 Steam Web API 替身，用于离线压测轮询链路。
+
+模拟 N 个玩家，按固定节拍随机切换一部分玩家的游戏状态，并可注入延迟、429、5xx 与超时：
+
+    python bench/fake_steam.py --players 100000 --churn 0.02 --latency-ms 80 --latency-dist lognormal
+
+插件侧把三类镜像都指向它，并开启 steam_mirrors_only 以免失败时回落到官方地址：
+
+    steam_api_mirrors = ["http://127.0.0.1:8765"]
+    steam_store_mirrors = ["http://127.0.0.1:8765"]
+    steam_cdn_mirrors = ["http://127.0.0.1:8765"]
+    steam_mirrors_only = true
+
+玩家的 SteamID 为 76561197960265729 起连续编号，自定义链接 player<N> 解析到第 N 个玩家。
+GET /__stats 返回各接口请求数与注入的错误数。
+"""
+
+import argparse
+import colorsys
+import hashlib
+import io
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+STEAMID64_BASE = 76561197960265728
+APPS: Tuple[Tuple[int, str, str], ...] = (
+    (570, "Dota 2", "刀塔 2"),
+    (730, "Counter-Strike 2", "反恐精英 2"),
+    (440, "Team Fortress 2", "军团要塞 2"),
+    (271590, "Grand Theft Auto V", "侠盗猎车手 V"),
+    (1172470, "Apex Legends", "Apex 英雄"),
+    (1086940, "Baldur's Gate 3", "博德之门 3"),
+    (892970, "Valheim", "英灵神殿"),
+    (413150, "Stardew Valley", "星露谷物语"),
+)
+ACHIEVEMENTS_PER_APP = 50
+
+
+class FakeSteam:
+    """玩家状态与故障注入参数；HTTP 处理线程共享同一个实例。"""
+
+    def __init__(
+        self,
+        players: int = 1000,
+        churn: float = 0.02,
+        playing_ratio: float = 0.2,
+        tick_sec: float = 30.0,
+        latency_ms: float = 0.0,
+        latency_dist: str = "fixed",
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        rate_timeout: float = 0.0,
+        timeout_sec: float = 60.0,
+        seed: int = 0,
+    ):
+        self.players = players
+        self.churn = churn
+        self.tick_sec = tick_sec
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_timeout = rate_timeout
+        self.timeout_sec = timeout_sec
+        self.rng = random.Random(seed)
+        # 每个玩家一个字节：0 表示不在游戏，否则为 APPS 下标 + 1
+        self.state = bytearray(
+            self.rng.randrange(1, len(APPS) + 1) if self.rng.random() < playing_ratio else 0 for _ in range(players)
+        )
+        self.ticks = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._images: Dict[Tuple[int, int, int], bytes] = {}
+
+    # ---- 世界状态 ----
+
+    def advance(self) -> None:
+        """按经过的节拍数补齐状态变化：每个节拍随机切换 churn 比例的玩家。"""
+        if self.tick_sec <= 0:
+            return
+        due = int((time.monotonic() - self.started) // self.tick_sec)
+        with self.lock:
+            while self.ticks < due:
+                self.ticks += 1
+                for _ in range(int(self.players * self.churn)):
+                    idx = self.rng.randrange(self.players)
+                    self.state[idx] = 0 if self.state[idx] else self.rng.randrange(1, len(APPS) + 1)
+
+    def index_of(self, steamid: str) -> Optional[int]:
+        try:
+            idx = int(steamid) - STEAMID64_BASE - 1
+        except ValueError:
+            return None
+        return idx if 0 <= idx < self.players else None
+
+    def summary(self, idx: int) -> dict:
+        steamid = str(STEAMID64_BASE + idx + 1)
+        avatar_hash = hashlib.sha1(steamid.encode()).hexdigest()
+        player = {
+            "steamid": steamid,
+            "personaname": f"player{idx + 1}",
+            "profileurl": f"https://steamcommunity.com/id/player{idx + 1}/",
+            "avatarfull": f"{{base}}/avatars/{avatar_hash}_full.jpg",
+            "personastate": 1,
+        }
+        app = self.state[idx]
+        if app:
+            appid, name, _ = APPS[app - 1]
+            player["gameid"] = str(appid)
+            player["gameextrainfo"] = name
+        return player
+
+    # ---- 故障注入 ----
+
+    def latency(self) -> float:
+        mean = self.latency_ms / 1000
+        if mean <= 0:
+            return 0.0
+        if self.latency_dist == "uniform":
+            return random.uniform(0, 2 * mean)
+        if self.latency_dist == "exp":
+            return random.expovariate(1 / mean)
+        if self.latency_dist == "lognormal":
+            sigma = 0.6
+            return random.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+        return mean
+
+    def fault(self) -> Optional[str]:
+        roll = random.random()
+        if roll < self.rate_timeout:
+            return "timeout"
+        roll -= self.rate_timeout
+        if roll < self.rate_429:
+            return "429"
+        roll -= self.rate_429
+        if roll < self.rate_500:
+            return "500"
+        return None
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def image(self, seed: int, width: int, height: int) -> bytes:
+        key = (seed % 360, width, height)
+        cached = self._images.get(key)
+        if cached is None:
+            from PIL import Image
+
+            color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(key[0] / 360, 0.5, 0.6))
+            buffer = io.BytesIO()
+            Image.new("RGB", (width, height), color).save(buffer, format="JPEG", quality=80)
+            cached = self._images[key] = buffer.getvalue()
+        return cached
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_FakeSteamServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - 与基类签名一致
+        pass
+
+    def do_GET(self):  # noqa: N802 - http.server 约定
+        fake = self.server.fake
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if path == "/__stats":
+            self._send_json({"ticks": fake.ticks, "players": fake.players, "requests": fake.stats})
+            return
+        endpoint = path
+        route = _ROUTES.get(path)
+        if route is None:
+            for prefix, prefix_route in _PREFIX_ROUTES:
+                if path.startswith(prefix):
+                    endpoint, route = prefix, prefix_route
+                    break
+        fake.count(endpoint)
+        if route is None:
+            self._send(404, b"not found", "text/plain")
+            return
+        fault = fake.fault()
+        delay = fake.latency()
+        if fault == "timeout":
+            fake.count("fault:timeout")
+            time.sleep(fake.timeout_sec)
+            self.close_connection = True
+            return
+        if delay:
+            time.sleep(delay)
+        if fault == "429":
+            fake.count("fault:429")
+            self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": "1"})
+            return
+        if fault == "500":
+            fake.count("fault:500")
+            self._send(500, b"Internal Server Error", "text/plain")
+            return
+        fake.advance()
+        route(self, fake, path, query)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: dict) -> None:
+        self._send(200, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    @property
+    def base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{self.headers.get('Host') or f'{host}:{port}'}"
+
+
+def _route_summaries(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    players = []
+    for steamid in query.get("steamids", "").split(",")[:100]:
+        idx = fake.index_of(steamid)
+        if idx is not None:
+            player = fake.summary(idx)
+            player["avatarfull"] = player["avatarfull"].format(base=handler.base)
+            players.append(player)
+    handler._send_json({"response": {"players": players}})
+
+
+def _route_owned_games(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    idx = fake.index_of(query.get("steamid", ""))
+    if idx is None:
+        handler._send_json({"response": {}})
+        return
+    rng = random.Random(idx)
+    games = [
+        {"appid": appid, "name": name, "playtime_forever": rng.randrange(0, 50000)}
+        for appid, name, _ in APPS
+        if rng.random() < 0.7
+    ]
+    handler._send_json({"response": {"game_count": len(games), "games": games}})
+
+
+def _route_achievements(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    idx = fake.index_of(query.get("steamid", ""))
+    appid = query.get("appid", "")
+    if idx is None or not appid.isdigit():
+        handler._send_json({"playerstats": {"success": False, "error": "Requested app has no stats"}})
+        return
+    # 随节拍缓慢增加已解锁数量，用于验证“本次解锁 N 个成就”
+    unlocked = min(ACHIEVEMENTS_PER_APP, (idx + int(appid)) % 20 + fake.ticks // 2)
+    achievements = [
+        {"apiname": f"ACH_{n:03d}", "achieved": 1 if n < unlocked else 0, "unlocktime": 0}
+        for n in range(ACHIEVEMENTS_PER_APP)
+    ]
+    handler._send_json({"playerstats": {"steamID": query["steamid"], "success": True, "achievements": achievements}})
+
+
+def _route_vanity(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    vanity = query.get("vanityurl", "")
+    number = vanity[len("player"):] if vanity.startswith("player") else ""
+    if number.isdigit() and 1 <= int(number) <= fake.players:
+        handler._send_json({"response": {"steamid": str(STEAMID64_BASE + int(number)), "success": 1}})
+    else:
+        handler._send_json({"response": {"success": 42, "message": "No match"}})
+
+
+def _route_server_info(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    handler._send_json({"servertime": int(time.time()), "servertimestring": time.ctime()})
+
+
+def _route_appdetails(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    result = {}
+    chinese = query.get("l", "") == "schinese"
+    for appid in query.get("appids", "").split(","):
+        match = next((app for app in APPS if str(app[0]) == appid), None)
+        if match is None:
+            result[appid] = {"success": False}
+        else:
+            result[appid] = {"success": True, "data": {"steam_appid": match[0], "name": match[2] if chinese else match[1]}}
+    handler._send_json(result)
+
+
+def _route_app_image(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    appid = path.split("/")[3] if path.count("/") >= 4 else "0"
+    handler._send(200, fake.image(int(appid) if appid.isdigit() else 0, 460, 215), "image/jpeg")
+
+
+def _route_avatar(handler: _Handler, fake: FakeSteam, path: str, query: dict) -> None:
+    digest = path.rsplit("/", 1)[-1][:8]
+    seed = int(digest, 16) if all(c in "0123456789abcdef" for c in digest) and digest else 0
+    handler._send(200, fake.image(seed, 184, 184), "image/jpeg")
+
+
+_ROUTES = {
+    "/ISteamUser/GetPlayerSummaries/v0002/": _route_summaries,
+    "/IPlayerService/GetOwnedGames/v0001/": _route_owned_games,
+    "/ISteamUserStats/GetPlayerAchievements/v0001/": _route_achievements,
+    "/ISteamUser/ResolveVanityURL/v0001/": _route_vanity,
+    "/ISteamWebAPIUtil/GetServerInfo/v1/": _route_server_info,
+    "/api/appdetails": _route_appdetails,
+}
+_PREFIX_ROUTES = (("/steam/apps/", _route_app_image), ("/avatars/", _route_avatar))
+
+
+class _FakeSteamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], fake: FakeSteam):
+        super().__init__(address, _Handler)
+        self.fake = fake
+
+
+def serve_in_thread(fake: FakeSteam, host: str = "127.0.0.1", port: int = 0) -> Tuple[_FakeSteamServer, str]:
+    """在后台线程启动服务，返回 (server, base_url)；用完调用 server.shutdown()。"""
+    server = _FakeSteamServer((host, port), fake)
+    threading.Thread(target=server.serve_forever, name="fake-steam", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 Steam Web API 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--players", type=int, default=1000, help="模拟玩家数")
+    parser.add_argument("--churn", type=float, default=0.02, help="每个节拍切换游戏状态的玩家比例")
+    parser.add_argument("--playing-ratio", type=float, default=0.2, help="初始在游戏中的玩家比例")
+    parser.add_argument("--tick-sec", type=float, default=30.0, help="状态变化节拍（秒，0 为静止）")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="平均响应延迟（毫秒）")
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "exp", "lognormal"), default="fixed")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="挂起不响应的概率")
+    parser.add_argument("--timeout-sec", type=float, default=60.0, help="挂起时长（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    fake = FakeSteam(
+        players=args.players,
+        churn=args.churn,
+        playing_ratio=args.playing_ratio,
+        tick_sec=args.tick_sec,
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_timeout=args.rate_timeout,
+        timeout_sec=args.timeout_sec,
+        seed=args.seed,
+    )
+    server = _FakeSteamServer((args.host, args.port), fake)
+    print(f"fake steam: http://{args.host}:{args.port}  players={args.players}  churn={args.churn}/{args.tick_sec}s")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(fake.stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
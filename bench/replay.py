@@ -0,0 +1,176 @@
+"""回放 capture_file 录制的 Steam 响应，重现某段时间的轮询与通知。
+
+插件配置 capture_file 后，每轮轮询前写入一条 cycle 标记，随后记录该轮所有 Steam API 响应
+（不含 API Key）。本脚本按轮次把录制的响应喂回 _poll_once：
+
+    python bench/replay.py capture.jsonl.gz                # 按录制时的间隔回放
+    python bench/replay.py capture.jsonl.gz --speed 0      # 不等待，尽快回放
+    python bench/replay.py capture.jsonl.gz --speed 10 --latency --print
+
+同一请求在一轮内按录制顺序依次返回（重试会拿到下一条），用完后重复最后一条；
+录制中没有的请求返回 404。监控列表取自录制的 GetPlayerSummaries 请求。
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import tempfile
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from _support import BenchContext, make_plugin
+
+SUMMARIES_PATH = "/ISteamUser/GetPlayerSummaries/v0002/"
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Cycle:
+    def __init__(self, seq: int, at: float):
+        self.seq = seq
+        self.at = at
+        self.responses: Dict[Key, List[dict]] = {}
+
+
+class ReplayContext(BenchContext):
+    """记录发出的通知文本，便于核对重现结果。"""
+
+    def __init__(self, echo: bool = False):
+        super().__init__()
+        self.echo = echo
+
+    async def send_message(self, target, message):
+        self.sent += 1
+        if self.echo:
+            parts = getattr(message, "chain", [message])
+            print(f"  → {target}: {' '.join(str(part) for part in parts)}")
+        return True
+
+
+def _key(path: str, params: dict) -> Key:
+    return path, tuple(sorted((name, str(value)) for name, value in params.items() if name != "key"))
+
+
+def load_capture(path: str) -> List[_Cycle]:
+    cycles: List[_Cycle] = []
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        try:
+            for line in fp:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("kind") == "cycle":
+                    cycles.append(_Cycle(record.get("seq", len(cycles) + 1), record["t"]))
+                elif record.get("kind") == "response" and cycles:
+                    key = _key(record["path"], record.get("params", {}))
+                    cycles[-1].responses.setdefault(key, []).append(record)
+        except (EOFError, zlib.error):
+            # 进程被终止时最后一个 gzip 成员可能不完整，保留已读到的部分
+            pass
+    return cycles
+
+
+def watched_steamids(cycles: List[_Cycle]) -> List[str]:
+    seen: Dict[str, None] = {}
+    for cycle in cycles:
+        for (path, params), _ in cycle.responses.items():
+            if path == SUMMARIES_PATH:
+                for name, value in params:
+                    if name == "steamids":
+                        seen.update(dict.fromkeys(value.split(",")))
+    return list(seen)
+
+
+def make_transport(state: dict, latency: bool) -> httpx.MockTransport:
+    served: Dict[Key, int] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        cycle: _Cycle = state["cycle"]
+        key = _key(request.url.path, dict(request.url.params))
+        records = cycle.responses.get(key)
+        if not records:
+            return httpx.Response(404, text="not captured")
+        index = served.get(key, 0)
+        served[key] = index + 1
+        record = records[min(index, len(records) - 1)]
+        if latency and record.get("elapsed"):
+            await asyncio.sleep(record["elapsed"])
+        if record.get("error"):
+            raise httpx.ConnectError(record["error"], request=request)
+        return httpx.Response(record["status"], text=record.get("body", ""))
+
+    state["served"] = served
+    return httpx.MockTransport(handler)
+
+
+async def replay(args) -> None:
+    cycles = load_capture(args.capture)
+    if not cycles:
+        print("录制文件中没有轮询记录。")
+        return
+    steamids = watched_steamids(cycles)
+    context = ReplayContext(echo=args.print)
+    plugin = await make_plugin(
+        {
+            "steam_web_api_key": "replay",
+            "steamids": steamids,
+            "notify_targets": ["replay:GroupMessage:1"],
+            "notify_on_stop": not args.no_stop,
+            "render_as_image": args.render,
+            "image_auto_download_font": False,
+            "use_localized_game_name": True,
+            "request_retry_delay_sec": 0,
+            "send_queue_size": 100000,
+            # 保留合并窗口（每轮结束时立即合并送出），限流与回放倍速无关，关闭
+            "send_rate_limits": [],
+            "data_dir": tempfile.mkdtemp(),
+        },
+        context,
+    )
+    state: Dict[str, object] = {"cycle": cycles[0]}
+    transport = make_transport(state, args.latency)
+    plugin._create_http_client = lambda *a, **kw: httpx.AsyncClient(transport=transport, follow_redirects=True)
+    print(f"回放 {len(cycles)} 轮，{len(steamids)} 个账号，速度 {'不等待' if args.speed <= 0 else f'{args.speed:g}x'}")
+    previous: Optional[_Cycle] = None
+    total_started = time.perf_counter()
+    try:
+        for cycle in cycles:
+            if previous is not None and args.speed > 0:
+                await asyncio.sleep(max(0.0, (cycle.at - previous.at) / args.speed))
+            state["cycle"] = cycle
+            state["served"].clear()
+            sent_before = context.sent
+            started = time.perf_counter()
+            await plugin._poll_once()
+            elapsed = time.perf_counter() - started
+            # 通知由发送队列异步送出，等队列清空后再统计本轮通知数
+            await plugin._flush_send_queue(60)
+            print(
+                f"#{cycle.seq:<5} {time.strftime('%m-%d %H:%M:%S', time.localtime(cycle.at))}  "
+                f"{elapsed * 1000:8.1f} ms  通知 {context.sent - sent_before}"
+            )
+            previous = cycle
+    finally:
+        await plugin.terminate()
+    print(f"合计 {(time.perf_counter() - total_started):.1f}s，通知 {context.sent} 条")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="回放录制的 Steam 响应")
+    parser.add_argument("capture", help="capture_file 录制的 .jsonl.gz 文件")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示轮次之间不等待")
+    parser.add_argument("--latency", action="store_true", help="按录制的耗时延迟每个响应")
+    parser.add_argument("--render", action="store_true", help="通知同时出图（计入耗时）")
+    parser.add_argument("--no-stop", action="store_true", help="不发送停止游戏通知")
+    parser.add_argument("--print", action="store_true", help="打印每条通知")
+    asyncio.run(replay(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""轮询、出图、通知与配置读取热路径的基准套件。
+
+在 AstrBot 之外运行插件（见 _support.py），Steam 响应由进程内的 httpx.MockTransport 生成，
+不访问网络；需要端到端压测时改用 fake_steam.py。
+
+    python bench/run_bench.py                      # 运行全部用例，结果写入 bench/results/
+    python bench/run_bench.py --quick --only poll  # 只跑较小规模的轮询用例
+    python bench/run_bench.py --compare bench/results/old.json           # 运行后与旧结果对比
+    python bench/run_bench.py --compare old.json new.json --threshold 0.2  # 只对比两份结果
+
+对比时中位数变慢超过阈值（默认 15%）的用例记为回退，进程以状态码 1 退出，便于在 CI 中使用。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from _support import ROOT, BenchContext, load_plugin, make_plugin, summarize, timeit_async
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BASE_CONFIG = {
+    "steam_web_api_key": "bench",
+    "render_as_image": False,
+    "image_auto_download_font": False,
+    "image_default_bg_url": "",
+    "image_prefer_game_bg": False,
+    "image_show_avatar": False,
+    "notify_on_stop": True,
+    "notify_targets": ["aiocqhttp:GroupMessage:1"],
+    "request_retry_delay_sec": 0,
+    "mirror_probe_interval_sec": 0,
+    "perf_trace_cycles": 0,
+    "send_queue_size": 100000,
+    # 只测出图与入队本身：不合并、不限流
+    "send_coalesce_sec": 0,
+    "send_rate_limits": [],
+}
+SAMPLE_LINE = "Alice 正在玩 Counter-Strike 2！本次游玩 128 分钟，评价：肝帝本帝，Steam 都替你心疼电费了。"
+
+Case = Tuple[str, Callable[[], Awaitable[object]], int]
+
+
+def _summaries_transport(state: Dict[str, int]) -> httpx.MockTransport:
+    """按 state["cycle"] 生成玩家摘要：每轮约 10% 的账号在游戏中，且整体轮换，产生开始/停止通知。"""
+    cache: Dict[Tuple[str, int], bytes] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        steamids = request.url.params.get("steamids", "")
+        phase = state["cycle"] % 10
+        body = cache.get((steamids, phase))
+        if body is None:
+            players = []
+            for sid in steamids.split(","):
+                player = {"steamid": sid, "personaname": f"p{sid[-5:]}"}
+                if (int(sid) + phase) % 10 == 0:
+                    player["gameid"] = "730"
+                    player["gameextrainfo"] = "Counter-Strike 2"
+                players.append(player)
+            body = cache[(steamids, phase)] = json.dumps({"response": {"players": players}}).encode()
+        return httpx.Response(200, content=body, headers={"Content-Type": "application/json"})
+
+    return httpx.MockTransport(handler)
+
+
+async def poll_cases(sizes: List[int], repeat: int, plugins: list) -> List[Case]:
+    main = load_plugin()
+    cases: List[Case] = []
+    for size in sizes:
+        state = {"cycle": 0}
+        steamids = [str(main.STEAMID64_BASE + 1 + idx) for idx in range(size)]
+        plugin = await make_plugin({**BASE_CONFIG, "steamids": steamids, "data_dir": tempfile.mkdtemp()})
+        transport = _summaries_transport(state)
+        plugin._create_http_client = lambda *args, _t=transport, **kwargs: httpx.AsyncClient(transport=_t)
+        plugins.append(plugin)
+
+        async def cycle(plugin=plugin, state=state):
+            state["cycle"] += 1
+            await plugin._poll_once()
+
+        # 第一轮只建立基线状态，不产生通知
+        await plugin._poll_once()
+        cases.append((f"poll_once[{size}]", cycle, repeat))
+    return cases
+
+
+async def render_cases(repeat: int, plugins: list, fonts: List[str]) -> List[Case]:
+    texts = {
+        "short": SAMPLE_LINE,
+        "medium": "\n".join([SAMPLE_LINE] * 6),
+        "long": "\n".join([SAMPLE_LINE] * 30),
+    }
+    cases: List[Case] = []
+    for font in fonts:
+        plugin = await make_plugin(
+            {**BASE_CONFIG, "render_as_image": True, "image_font_path": font, "data_dir": tempfile.mkdtemp()}
+        )
+        plugins.append(plugin)
+        label = Path(font).stem if font else "default"
+        for name, text in texts.items():
+
+            async def render(plugin=plugin, text=text):
+                await plugin._render_text_image(text, appid=None, avatar_url="", is_playing=False)
+
+            cases.append((f"render[{label},{name}]", render, repeat))
+    return cases
+
+
+async def wrap_cases(repeat: int, plugins: list, fonts: List[str]) -> List[Case]:
+    from PIL import Image, ImageDraw
+
+    text = "\n".join([SAMPLE_LINE * 3] * 20)
+    cases: List[Case] = []
+    for font in fonts:
+        plugin = await make_plugin({**BASE_CONFIG, "image_font_path": font, "data_dir": tempfile.mkdtemp()})
+        plugins.append(plugin)
+        image_font = plugin._load_image_font()
+        draw = ImageDraw.Draw(Image.new("RGB", (16, 16)))
+        label = Path(font).stem if font else "default"
+
+        async def wrap(plugin=plugin, image_font=image_font, draw=draw):
+            plugin._wrap_text(draw, image_font, text, 900)
+
+        cases.append((f"wrap_text[{label},20x3]", wrap, repeat))
+    return cases
+
+
+async def fanout_cases(repeat: int, plugins: list) -> List[Case]:
+    cases: List[Case] = []
+    for groups, per_group in ((10, 5), (200, 5)):
+        steamid = "76561197960265729"
+        context = BenchContext()
+        plugin = await make_plugin(
+            {
+                **BASE_CONFIG,
+                "data_dir": tempfile.mkdtemp(),
+                "notify_group_enabled": True,
+                "notify_groups": [
+                    f"g{g}:aiocqhttp:GroupMessage:{g * per_group + t}" for g in range(groups) for t in range(per_group)
+                ],
+                "steamid_groups": [f"{steamid}:g{g}" for g in range(groups)],
+            },
+            context,
+        )
+        plugins.append(plugin)
+
+        async def notify(plugin=plugin, steamid=steamid):
+            await plugin._notify_by_steamid(steamid, SAMPLE_LINE, appid=730, is_playing=True)
+            # 计入发送队列把全部会话发完的时间
+            await plugin._flush_send_queue(60)
+
+        cases.append((f"notify_fanout[{groups}x{per_group}]", notify, repeat))
+    return cases
+
+
+async def config_cases(repeat: int, plugins: list) -> List[Case]:
+    main = load_plugin()
+    steamids = [str(main.STEAMID64_BASE + 1 + idx) for idx in range(10000)]
+    config = {
+        **BASE_CONFIG,
+        "data_dir": tempfile.mkdtemp(),
+        "steamids": steamids,
+        "notify_groups": [f"g{g}:aiocqhttp:GroupMessage:{g}" for g in range(200)],
+        "steamid_groups": [f"{sid}:g{idx % 200}" for idx, sid in enumerate(steamids[:2000])],
+    }
+    plugin = await make_plugin(config)
+    plugins.append(plugin)
+    calls = 10000
+
+    def loop(func: Callable[[], object], count: int = calls) -> Callable[[], Awaitable[None]]:
+        async def run():
+            for _ in range(count):
+                func()
+
+        return run
+
+    return [
+        (f"settings_cached[x{calls}]", loop(plugin._settings), repeat),
+        (f"settings_refresh_unchanged[x{calls}]", loop(plugin._refresh_settings), repeat),
+        ("settings_build[x100]", loop(lambda: main._build_settings(plugin.config, 1), 100), repeat),
+        (f"pool_index[10000,x{calls}]", loop(plugin._get_pool_index), repeat),
+        ("notify_groups[200,x100]", loop(plugin._get_notify_groups, 100), repeat),
+        ("steamid_groups[2000,x100]", loop(plugin._get_steamid_groups, 100), repeat),
+    ]
+
+
+def _find_fonts(extra: Optional[str]) -> List[str]:
+    """默认只测插件的字体回退；仓库不附带字体文件，中文字体用 --font 指定外部路径。"""
+    fonts = [""]
+    if extra:
+        if Path(extra).exists():
+            fonts.append(extra)
+        else:
+            print(f"字体文件不存在，已跳过：{extra}", file=sys.stderr)
+    return fonts
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+async def run_suite(args) -> Dict[str, dict]:
+    groups = set(args.only.split(",")) if args.only else {"poll", "render", "wrap", "fanout", "config"}
+    sizes = [100, 1000] if args.quick else [100, 1000, 10000]
+    fonts = _find_fonts(args.font)
+    plugins: list = []
+    cases: List[Case] = []
+    try:
+        if "poll" in groups:
+            cases += await poll_cases(sizes, args.repeat, plugins)
+        if "render" in groups:
+            cases += await render_cases(args.repeat, plugins, fonts)
+        if "wrap" in groups:
+            cases += await wrap_cases(args.repeat, plugins, fonts)
+        if "fanout" in groups:
+            cases += await fanout_cases(args.repeat, plugins)
+        if "config" in groups:
+            cases += await config_cases(args.repeat, plugins)
+        results: Dict[str, dict] = {}
+        for name, func, repeat in cases:
+            results[name] = summarize(await timeit_async(func, repeat=repeat))
+            print(f"{name:<40} 中位 {results[name]['median'] * 1000:10.3f} ms  最快 {results[name]['best'] * 1000:10.3f} ms")
+        return results
+    finally:
+        for plugin in plugins:
+            await plugin.terminate()
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """打印两份结果的中位数对比，返回回退的用例数。"""
+    regressions = 0
+    print(f"对比：{old['meta'].get('revision') or '?'} → {new['meta'].get('revision') or '?'}（阈值 {threshold:.0%}）")
+    for name, current in new["cases"].items():
+        previous = old["cases"].get(name)
+        if previous is None:
+            print(f"{name:<40} 新增")
+            continue
+        ratio = current["median"] / previous["median"] if previous["median"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ← 回退"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  ← 提升"
+        print(
+            f"{name:<40} {previous['median'] * 1000:10.3f} → {current['median'] * 1000:10.3f} ms  "
+            f"{(ratio - 1) * 100:+6.1f}%{flag}"
+        )
+    for name in old["cases"]:
+        if name not in new["cases"]:
+            print(f"{name:<40} 本次未运行")
+    return regressions
+
+
+def _load_results(path: str) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SteamWatch 基准套件")
+    parser.add_argument("--only", default="", help="只运行指定分组，逗号分隔：poll,render,wrap,fanout,config")
+    parser.add_argument("--quick", action="store_true", help="轮询只测 100 / 1000 个账号")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--font", default="", help="额外测试的字体文件（外部路径，例如系统中的 Noto Sans CJK）")
+    parser.add_argument("--out", default="", help="结果 JSON 路径（默认 bench/results/<时间>.json）")
+    parser.add_argument("--compare", nargs="+", default=[], metavar="JSON", help="旧结果；给出两份时只对比不运行")
+    parser.add_argument("--threshold", type=float, default=0.15, help="中位数变慢超过该比例记为回退")
+    args = parser.parse_args()
+
+    if len(args.compare) >= 2:
+        sys.exit(1 if compare(_load_results(args.compare[0]), _load_results(args.compare[1]), args.threshold) else 0)
+
+    cases = asyncio.run(run_suite(args))
+    result = {
+        "meta": {
+            "revision": _git_revision(),
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "httpx": httpx.__version__,
+            "repeat": args.repeat,
+        },
+        "cases": cases,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已写入 {out}")
+    if args.compare:
+        sys.exit(1 if compare(_load_results(args.compare[0]), result, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
 import asyncio
 import contextlib
+import cProfile
+import contextvars
+import copy
+import csv
+import gzip
 import hashlib
+import heapq
+import io
+import json
+import pstats
+import random
 from datetime import datetime
 import tempfile
+import threading
 from pathlib import Path
 import re
 import shlex
+import sqlite3
 import time
-from typing import Dict, List, Optional, Tuple
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import httpx
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
@@ -22,6 +40,9 @@ STEAMID64_BASE_HEX = 0x110000100000000
 PROFILE_ID_RE = re.compile(r"steamcommunity\.com/profiles/(\d{17})", re.I)
 VANITY_ID_RE = re.compile(r"steamcommunity\.com/id/([^/]+)/?", re.I)
 CSGO_FRIEND_CODE_RE = re.compile(r"^[A-Z0-9]{5}-[A-Z0-9]{4}$")
+STEAM2_ID_RE = re.compile(r"^STEAM_[0-5]:([01]):(\d{1,10})$", re.I)
+STEAM3_ID_RE = re.compile(r"^\[?U:1:(\d{1,10})\]?$", re.I)
+_LEADING_TOKEN_RE = re.compile(r"^\s*\S+\s*")
 PERSONA_STATE_TEXT = {
     0: "离线",
     1: "在线",
@@ -33,7 +54,19 @@ PERSONA_STATE_TEXT = {
 }
 
 DEFAULT_POLL_INTERVAL_SEC = 60
+DEFAULT_STOP_CONFIRM_CYCLES = 2
 MIN_POLL_INTERVAL_SEC = 30
+POLL_OVERRUN_POLICIES = ("skip", "coalesce", "shrink")
+DEFAULT_POLL_WATCHDOG_SEC = 300
+POLL_SHRINK_HEADROOM = 0.8
+SEND_QUEUE_POLICIES = ("drop_oldest", "drop_newest", "block")
+DEFAULT_SEND_WORKERS = 4
+DEFAULT_SEND_QUEUE_SIZE = 1000
+DEFAULT_SEND_TIMEOUT_SEC = 15
+SEND_SHUTDOWN_GRACE_SEC = 3
+DEFAULT_SEND_COALESCE_SEC = 3
+SEND_COALESCE_MAX_ITEMS = 8
+DEFAULT_SEND_RATE_LIMITS = ("*=20/5",)
 DEFAULT_REQUEST_TIMEOUT_SEC = 10
 DEFAULT_REQUEST_RETRIES = 2
 DEFAULT_REQUEST_RETRY_DELAY_SEC = 2.0
@@ -43,26 +76,131 @@ DEFAULT_BG_COLOR = "#10141A"
 DEFAULT_TEXT_COLOR = "#F2F5F8"
 DEFAULT_STEAM_BG_URL = "https://cdn.cloudflare.steamstatic.com/store/home/store_home_share.jpg"
 DEFAULT_FONT_URL = "https://github.com/notofonts/noto-cjk/raw/main/Sans/Variable/TTF/NotoSansCJKsc-VF.ttf"
+DEFAULT_DATA_DIR = "data/plugin_data/astrbot_plugin_steamwatch"
+RESOLVE_CONCURRENCY = 8
+RESOLVE_RATE_PER_SEC = 5.0
+IMPORT_ERROR_PREVIEW = 20
+RESOLVE_BATCH_MAX = 100
+EXPORT_INLINE_MAX_ROWS = 30
+EXPORT_FIELDS = ["target", "groups", "user_id", "nickname"]
+LIST_PAGE_SIZE = 30
+NICKNAME_CANDIDATE_LIMIT = 5
+NICKNAME_FUZZY_MIN_SCORE = 0.4
+RESOLVER_CACHE_FILE = "resolver_cache.json"
+RESOLVER_CACHE_MAX_ENTRIES = 20000
+CACHE_FLUSH_INTERVAL_SEC = 30
+OWNED_GAMES_CACHE_TTL_SEC = 3600
+OWNED_GAMES_CACHE_MAX_USERS = 2000
+TOP_GAMES_DEFAULT = 10
+TOP_GAMES_MAX = 30
+ACHIEVEMENT_CACHE_TTL_SEC = 300
+ACHIEVEMENT_CACHE_MAX_ENTRIES = 2000
+ACHIEVEMENT_SCHEMA_CACHE_SIZE = 256
+DEFAULT_ACHIEVEMENT_REFRESH_SEC = 300
+DEFAULT_INFO_DEADLINE_SEC = 8
+STEAMID_CODE_CACHE_SIZE = 16384
+DEFAULT_AVATAR_SIZE = 128
+STEAM_HOSTS = {
+    "api": "https://api.steampowered.com",
+    "store": "https://store.steampowered.com",
+    "cdn": "https://cdn.cloudflare.steamstatic.com",
+}
+MIRROR_PROBE_PATHS = {
+    "api": "/ISteamWebAPIUtil/GetServerInfo/v1/",
+    "store": "/api/appdetails?appids=10&filters=basic",
+    "cdn": "/steam/apps/10/header.jpg",
+}
+DEFAULT_MIRROR_PROBE_INTERVAL_SEC = 300
+MIRROR_FAILURE_THRESHOLD = 2
+MIRROR_LATENCY_ALPHA = 0.3
+ROUTE_EXTRA_HOSTS = {
+    "cdn": ("avatars.steamstatic.com", "avatars.cloudflare.steamstatic.com", "avatars.akamai.steamstatic.com"),
+    "community": ("steamcommunity.com", "s.team"),
+}
+ROUTE_CLASSES = ("api", "store", "cdn", "community", "other")
+PROXY_EJECT_SEC = 120
+PROXY_UNKNOWN_LATENCY_SEC = 0.5
+PROXY_CHECK_URL = "https://api.ipify.org?format=json"
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_FILE = "metrics.prom"
+PERF_TRACE_FILE = "perf_traces.jsonl"
+DEFAULT_PERF_TRACE_CYCLES = 50
+PERF_TREE_MAX_LINES = 40
+PROFILE_DIR = "profiles"
+PROFILE_MAX_CYCLES = 20
+PROFILE_MAX_SECONDS = 600
+PROFILE_TOP_N = 8
+AVATAR_MEMORY_CACHE_SIZE = 128
+AVATAR_HASH_RE = re.compile(r"([0-9a-f]{40})", re.I)
+APP_CATALOG_FILE = "app_catalog.sqlite3"
+APP_CATALOG_BATCH_SIZE = 5000
 
 
 @register(
     "astrbot_plugin_steamwatch",
     "Chinachani",
     "通过astrbot视奸你的steam好友！",
-    "1.2.5",
+    "1.3.0",
     "https://github.com/Chinachani/astrbot_plugin_steamwatch",
 )
 class SteamWatchPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.config = config
+        self._config_txn_depth = 0
+        self._config_dirty = False
+        # 号池/绑定/昵称索引各自的版本号，只由对应的 _set_* 递增，其他配置写入不会让索引重建
+        self._index_versions: Dict[str, int] = {}
+        self._settings_cache: Optional[_Settings] = None
+        self._settings_fingerprint: Optional[tuple] = None
+        self._settings_version = 0
         self._normalize_notify_config()
         self._stop_event = asyncio.Event()
+        self._metrics = _Metrics()
+        self._traces: "deque[_CycleTrace]" = deque(maxlen=self._settings().perf_trace_cycles)
+        self._trace_seq = 0
+        self._poll_limit: Optional[int] = None
+        self._poll_cursor = 0
+        self._poll_targets = 0
+        self._poll_targets_total = 0
+        self._profile: Optional[_ProfileSession] = None
+        self._profile_task: Optional[asyncio.Task] = None
+        self._last_profile_report = ""
+        self._capture: Optional[_CaptureWriter] = None
+        self._capture_seq = 0
+        self._send_shards: List[_SendShard] = []
+        self._send_workers: List[asyncio.Task] = []
+        self._sends_in_flight = 0
+        self._send_drop_warned_at = float("-inf")
+        self._send_idle = asyncio.Event()
+        self._send_idle.set()
+        self._send_buckets: Dict[str, _TokenBucket] = {}
+        self._coalesce_pending: Dict[str, List[_Notice]] = {}
+        self._coalesce_task: Optional[asyncio.Task] = None
         self._task = asyncio.create_task(self._poll_loop())
+        self._mirror_sets: Dict[str, _MirrorSet] = {}
+        self._mirror_sets_version = -1
+        self._proxy_pool = _ProxyPool(())
+        self._probe_task = asyncio.create_task(self._mirror_probe_loop())
         self._last_state: Dict[str, Tuple[bool, Optional[str], Optional[str]]] = {}
         self._session_start: Dict[str, float] = {}
+        self._pending_stops: Dict[str, _PendingStop] = {}
         self._app_name_cache: Dict[str, Tuple[str, float]] = {}
+        self._owned_games: Dict[str, _OwnedLibrary] = {}
+        self._achievements: Dict[Tuple[str, int], _AchievementState] = {}
+        self._achievement_schemas: Dict[int, Tuple[str, ...]] = {}
+        self._achievement_baseline: Dict[str, Tuple[int, _AchievementState]] = {}
         self._font_download_task: Optional[asyncio.Task] = None
+        self._resolve_limiter = _RateLimiter(RESOLVE_RATE_PER_SEC)
+        self._pool_cache: Optional[Tuple[list, int, Dict[str, None]]] = None
+        self._binding_index_cache: Optional[Tuple[list, int, Dict[str, List[str]]]] = None
+        self._nickname_index_cache: Optional[Tuple[list, int, _NicknameIndex]] = None
+        self._steamid_group_cache: Optional[Tuple[list, int, Dict[str, List[str]]]] = None
+        self._resolver_cache: Optional[_PersistentTTLCache] = None
+        self._app_catalog: Optional[_AppCatalog] = None
+        self._avatar_thumbs: Dict[str, Image.Image] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self._sw_routes = self._build_sw_routes()
 
     # ------------------------
     # Short command入口
@@ -70,132 +208,104 @@ class SteamWatchPlugin(Star):
     @filter.command("sw")
     async def short_cmd(self, event: AstrMessageEvent, args: str = ""):
         """简化指令入口（/sw）"""
-        debug_log = bool(self.config.get("debug_log", False))
-        raw_text = self._get_event_text(event)
-        extracted = self._extract_args_from_event(event, "sw")
-        if not args or (extracted and len(extracted) > len(args)):
-            args = extracted
-        if debug_log:
-            logger.info("steamwatch sw raw: %s", raw_text or "<empty>")
-            logger.info("steamwatch sw args extracted: %s", args or "<empty>")
-        tokens = self._split_args(args)
-        if not tokens:
+        self._refresh_settings()
+        parsed = self._parse_command_args(event, "sw", args)
+        if self._settings().debug_log:
+            logger.info("steamwatch sw raw: %s", parsed.raw_text or "<empty>")
+            logger.info("steamwatch sw args extracted: %s", parsed.payload or "<empty>")
+        if not parsed:
             async for item in self._menu_text(event):
                 yield item
             return
 
-        action = tokens[0].lower()
-        rest = tokens[1:]
-
-        if action in {"menu", "help"}:
-            async for item in self._menu_text(event):
-                yield item
+        action = parsed[0].lower()
+        route = self._sw_routes.get(action)
+        if route is None:
+            yield event.plain_result("未知子命令。输入 /sw menu 查看菜单。")
             return
-        if action in {"style", "menustyle", "menu_style"}:
-            async for item in self._cmd_menu_style(event, rest):
+        name, handler = route
+        started = time.perf_counter()
+        try:
+            async for item in handler(event, parsed.shift()):
                 yield item
-            return
-        if action in {"manage"}:
-            yield event.plain_result(self._menu_manage())
-            return
-        if action in {"notify"}:
-            yield event.plain_result(self._menu_notify())
-            return
-        if action in {"query"} and not rest:
+        finally:
+            self._record_command_timing(name, time.perf_counter() - started)
+
+    def _build_sw_routes(self) -> Dict[str, Tuple[str, Callable]]:
+        """子命令分发表：别名 -> (统计名, handler(event, args))。"""
+
+        def plain(builder: Callable[[], str]) -> Callable:
+            async def handler(event: AstrMessageEvent, args: "_CommandArgs"):
+                yield event.plain_result(builder())
+
+            return handler
+
+        def no_args(func: Callable) -> Callable:
+            return lambda event, args: func(event)
+
+        table = [
+            (("menu", "help"), no_args(self._menu_text)),
+            (("style", "menustyle", "menu_style"), self._cmd_menu_style),
+            (("manage",), plain(self._menu_manage)),
+            (("notify",), plain(self._menu_notify)),
+            (("net",), self._route_net),
+            (("add",), self._cmd_add),
+            (("remove", "del", "rm"), self._cmd_remove),
+            (("list", "ls"), self._cmd_list),
+            (("interval", "int"), self._cmd_interval),
+            (("import",), self._cmd_import),
+            (("export",), self._cmd_export),
+            (("catalog", "apps"), self._cmd_catalog),
+            (("sub", "subscribe"), self._cmd_subscribe),
+            (("unsub", "unsubscribe"), self._cmd_unsubscribe),
+            (("subinfo", "sub_info"), no_args(self._cmd_subinfo)),
+            (("groupinfo", "group_info"), self._cmd_groupinfo),
+            (
+                ("grouplist", "group_list"),
+                lambda event, args: self._cmd_groupinfo(event, _CommandArgs([], raw_text=args.raw_text)),
+            ),
+            (("subclean", "sub_clean"), no_args(self._cmd_subclean)),
+            (("resolve",), self._cmd_resolve),
+            (("query",), self._route_query),
+            (("q",), self._cmd_query),
+            (("status",), self._cmd_status),
+            (("info", "i"), self._cmd_info),
+            (("top",), self._cmd_top),
+            (("test",), no_args(self._cmd_test)),
+            (("proxytest", "proxy"), no_args(self._cmd_proxytest)),
+            (("metrics", "stats"), self._cmd_metrics),
+            (("perf", "trace"), self._cmd_perf),
+            (("profile", "prof"), self._cmd_profile),
+            (("preset", "recommend", "recommended"), no_args(self._cmd_apply_recommended_preset)),
+            (("font", "fontdl", "fontset"), self._cmd_font),
+            (("bind",), self._route_bind),
+            (("unbind",), self._cmd_unbind),
+            (("me",), no_args(self._cmd_me)),
+        ]
+        routes: Dict[str, Tuple[str, Callable]] = {}
+        for aliases, handler in table:
+            for alias in aliases:
+                routes[alias] = (aliases[0], handler)
+        return routes
+
+    async def _route_query(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        if not args:
             yield event.plain_result(self._menu_query())
             return
-        if action in {"bind"} and not rest:
+        async for item in self._cmd_query(event, args):
+            yield item
+
+    async def _route_bind(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        if not args:
             yield event.plain_result(self._menu_bind())
             return
-        if action in {"net"}:
-            yield event.plain_result(self._menu_net())
-            return
-        if action in {"add"}:
-            async for item in self._cmd_add(event, rest):
-                yield item
-            return
-        if action in {"del", "rm", "remove"}:
-            async for item in self._cmd_remove(event, rest):
-                yield item
-            return
-        if action in {"list", "ls"}:
-            async for item in self._cmd_list(event):
-                yield item
-            return
-        if action in {"interval", "int"}:
-            async for item in self._cmd_interval(event, rest):
-                yield item
-            return
-        if action in {"sub", "subscribe"}:
-            async for item in self._cmd_subscribe(event):
-                yield item
-            return
-        if action in {"subinfo", "sub_info"}:
-            async for item in self._cmd_subinfo(event):
-                yield item
-            return
-        if action in {"groupinfo", "group_info"}:
-            async for item in self._cmd_groupinfo(event, rest):
-                yield item
-            return
-        if action in {"grouplist", "group_list"}:
-            async for item in self._cmd_groupinfo(event, []):
-                yield item
-            return
-        if action in {"subclean", "sub_clean"}:
-            async for item in self._cmd_subclean(event):
-                yield item
-            return
-        if action in {"unsub", "unsubscribe"}:
-            async for item in self._cmd_unsubscribe(event):
-                yield item
-            return
-        if action in {"resolve"}:
-            async for item in self._cmd_resolve(event, rest):
-                yield item
-            return
-        if action in {"query", "q"}:
-            async for item in self._cmd_query(event, rest):
-                yield item
-            return
-        if action in {"status"}:
-            async for item in self._cmd_status(event, rest):
-                yield item
-            return
-        if action in {"info", "i"}:
-            async for item in self._cmd_info(event, rest):
-                yield item
-            return
-        if action in {"test"}:
-            async for item in self._cmd_test(event):
-                yield item
-            return
-        if action in {"proxytest", "proxy"}:
-            async for item in self._cmd_proxytest(event):
-                yield item
-            return
-        if action in {"preset", "recommend", "recommended"}:
-            async for item in self._cmd_apply_recommended_preset(event):
-                yield item
-            return
-        if action in {"font", "fontdl", "fontset"}:
-            async for item in self._cmd_font(event, rest):
-                yield item
-            return
-        if action in {"bind"}:
-            async for item in self._cmd_bind(event, rest):
-                yield item
-            return
-        if action in {"unbind"}:
-            async for item in self._cmd_unbind(event, rest):
-                yield item
-            return
-        if action in {"me"}:
-            async for item in self._cmd_me(event):
-                yield item
-            return
+        async for item in self._cmd_bind(event, args):
+            yield item
 
-        yield event.plain_result("未知子命令。输入 /sw menu 查看菜单。")
+    def _record_command_timing(self, name: str, elapsed: float) -> None:
+        self._metrics.observe("command_seconds", elapsed, command=name)
+        if self._settings().debug_log:
+            logger.info("steamwatch command %s took %.1fms", name, elapsed * 1000)
 
     # ------------------------
     # 原始命令（兼容）
@@ -203,39 +313,55 @@ class SteamWatchPlugin(Star):
     @filter.command("steamwatch_add")
     async def add_watch(self, event: AstrMessageEvent, args: str = ""):
         """添加监控目标（支持 SteamID/链接/好友码/me/@QQ）。"""
-        tokens = self._split_args(args or self._extract_args_from_event(event, "steamwatch_add"))
-        async for item in self._cmd_add(event, tokens):
+        async for item in self._cmd_add(event, self._parse_command_args(event, "steamwatch_add", args)):
             yield item
 
     @filter.command("steamwatch_remove")
     async def remove_watch(self, event: AstrMessageEvent, args: str = ""):
         """移除监控目标。"""
-        tokens = self._split_args(args or self._extract_args_from_event(event, "steamwatch_remove"))
-        async for item in self._cmd_remove(event, tokens):
+        async for item in self._cmd_remove(event, self._parse_command_args(event, "steamwatch_remove", args)):
             yield item
 
     @filter.command("steamwatch_list")
-    async def list_watch(self, event: AstrMessageEvent):
-        """查看当前监控列表。"""
-        async for item in self._cmd_list(event):
+    async def list_watch(self, event: AstrMessageEvent, args: str = ""):
+        """查看当前监控列表（支持分页与过滤）。"""
+        async for item in self._cmd_list(event, self._parse_command_args(event, "steamwatch_list", args)):
             yield item
 
     @filter.command("steamwatch_interval")
     async def set_interval(self, event: AstrMessageEvent, seconds: str = ""):
         """设置轮询间隔（秒）。"""
-        async for item in self._cmd_interval(event, [seconds] if seconds else []):
+        async for item in self._cmd_interval(event, self._parse_command_args(event, "steamwatch_interval", seconds)):
+            yield item
+
+    @filter.command("steamwatch_import")
+    async def import_watch(self, event: AstrMessageEvent, args: str = ""):
+        """批量导入监控目标（CSV/JSON 文本或文件路径）。"""
+        async for item in self._cmd_import(event, self._parse_command_args(event, "steamwatch_import", args)):
+            yield item
+
+    @filter.command("steamwatch_export")
+    async def export_watch(self, event: AstrMessageEvent, fmt: str = ""):
+        """导出监控号池、分组与绑定。"""
+        async for item in self._cmd_export(event, self._parse_command_args(event, "steamwatch_export", fmt)):
+            yield item
+
+    @filter.command("steamwatch_catalog")
+    async def app_catalog(self, event: AstrMessageEvent, action: str = ""):
+        """管理本地游戏名目录。"""
+        async for item in self._cmd_catalog(event, self._parse_command_args(event, "steamwatch_catalog", action)):
             yield item
 
     @filter.command("steamwatch_subscribe")
-    async def subscribe(self, event: AstrMessageEvent):
+    async def subscribe(self, event: AstrMessageEvent, group: str = ""):
         """订阅当前会话通知。"""
-        async for item in self._cmd_subscribe(event):
+        async for item in self._cmd_subscribe(event, self._parse_command_args(event, "steamwatch_subscribe", group)):
             yield item
 
     @filter.command("steamwatch_unsubscribe")
-    async def unsubscribe(self, event: AstrMessageEvent):
+    async def unsubscribe(self, event: AstrMessageEvent, group: str = ""):
         """取消订阅当前会话通知。"""
-        async for item in self._cmd_unsubscribe(event):
+        async for item in self._cmd_unsubscribe(event, self._parse_command_args(event, "steamwatch_unsubscribe", group)):
             yield item
 
     @filter.command("steamwatch_subinfo")
@@ -247,19 +373,19 @@ class SteamWatchPlugin(Star):
     @filter.command("steamwatch_groupinfo")
     async def groupinfo(self, event: AstrMessageEvent, group: str = ""):
         """查看订阅分组信息。"""
-        async for item in self._cmd_groupinfo(event, [group] if group else []):
+        async for item in self._cmd_groupinfo(event, self._parse_command_args(event, "steamwatch_groupinfo", group)):
             yield item
 
     @filter.command("steamwatch_grouplist")
     async def grouplist(self, event: AstrMessageEvent):
         """列出所有订阅分组。"""
-        async for item in self._cmd_groupinfo(event, []):
+        async for item in self._cmd_groupinfo(event, _CommandArgs([], raw_text=self._get_event_text(event))):
             yield item
 
     @filter.command("steamwatch_resolve")
     async def resolve_friend_code(self, event: AstrMessageEvent, target: str = ""):
         """解析目标到 SteamID64。"""
-        async for item in self._cmd_resolve(event, [target] if target else []):
+        async for item in self._cmd_resolve(event, self._parse_command_args(event, "steamwatch_resolve", target)):
             yield item
 
     @filter.command("steamwatch_menu")
@@ -271,20 +397,25 @@ class SteamWatchPlugin(Star):
     @filter.command("steamwatch_menustyle")
     async def menu_style(self, event: AstrMessageEvent, args: str = ""):
         """查看或切换菜单风格。"""
-        tokens = self._split_args(args or self._extract_args_from_event(event, "steamwatch_menustyle"))
-        async for item in self._cmd_menu_style(event, tokens):
+        async for item in self._cmd_menu_style(event, self._parse_command_args(event, "steamwatch_menustyle", args)):
             yield item
 
     @filter.command("steamwatch_query")
     async def query_once(self, event: AstrMessageEvent, target: str = ""):
         """查询目标当前在线/游戏状态。"""
-        async for item in self._cmd_query(event, [target] if target else []):
+        async for item in self._cmd_query(event, self._parse_command_args(event, "steamwatch_query", target)):
             yield item
 
     @filter.command("steamwatch_info")
     async def info(self, event: AstrMessageEvent, target: str = ""):
         """查询目标详细资料。"""
-        async for item in self._cmd_info(event, [target] if target else []):
+        async for item in self._cmd_info(event, self._parse_command_args(event, "steamwatch_info", target)):
+            yield item
+
+    @filter.command("steamwatch_top")
+    async def top_games(self, event: AstrMessageEvent, target: str = ""):
+        """查询目标游戏时长排行。"""
+        async for item in self._cmd_top(event, self._parse_command_args(event, "steamwatch_top", target)):
             yield item
 
     @filter.command("steamwatch_test")
@@ -293,6 +424,31 @@ class SteamWatchPlugin(Star):
         async for item in self._cmd_test(event):
             yield item
 
+    @filter.command("steamwatch_net")
+    async def net_report(self, event: AstrMessageEvent, action: str = ""):
+        """查看或刷新 Steam 镜像线路选择。"""
+        args = self._parse_command_args(event, "steamwatch_net", action)
+        async for item in self._route_net(event, args if args else _CommandArgs(["status"])):
+            yield item
+
+    @filter.command("steamwatch_metrics")
+    async def metrics(self, event: AstrMessageEvent, action: str = ""):
+        """查看运行指标或导出 Prometheus 文本。"""
+        async for item in self._cmd_metrics(event, self._parse_command_args(event, "steamwatch_metrics", action)):
+            yield item
+
+    @filter.command("steamwatch_perf")
+    async def perf(self, event: AstrMessageEvent, action: str = ""):
+        """查看最近轮询的阶段耗时或导出追踪记录。"""
+        async for item in self._cmd_perf(event, self._parse_command_args(event, "steamwatch_perf", action)):
+            yield item
+
+    @filter.command("steamwatch_profile")
+    async def profile(self, event: AstrMessageEvent, action: str = ""):
+        """对接下来的轮询或一段时间开启性能剖析。"""
+        async for item in self._cmd_profile(event, self._parse_command_args(event, "steamwatch_profile", action)):
+            yield item
+
     @filter.command("steamwatch_proxytest")
     async def proxy_test(self, event: AstrMessageEvent):
         """测试当前代理连通性。"""
@@ -308,26 +464,25 @@ class SteamWatchPlugin(Star):
     @filter.command("steamwatch_font")
     async def font_manage(self, event: AstrMessageEvent, args: str = ""):
         """字体管理（下载/设置/状态）。"""
-        tokens = self._split_args(args or self._extract_args_from_event(event, "steamwatch_font"))
-        async for item in self._cmd_font(event, tokens):
+        async for item in self._cmd_font(event, self._parse_command_args(event, "steamwatch_font", args)):
             yield item
 
     @filter.command("steamwatch_status")
     async def push_status(self, event: AstrMessageEvent, target: str = ""):
         """手动推送一次状态消息。"""
-        async for item in self._cmd_status(event, [target] if target else []):
+        async for item in self._cmd_status(event, self._parse_command_args(event, "steamwatch_status", target)):
             yield item
 
     @filter.command("steamwatch_bind")
     async def bind_user(self, event: AstrMessageEvent, target: str = ""):
         """绑定当前用户到 SteamID。"""
-        async for item in self._cmd_bind(event, [target] if target else []):
+        async for item in self._cmd_bind(event, self._parse_command_args(event, "steamwatch_bind", target)):
             yield item
 
     @filter.command("steamwatch_unbind")
     async def unbind_user(self, event: AstrMessageEvent, user_id: str = ""):
         """解绑用户 Steam 绑定关系。"""
-        async for item in self._cmd_unbind(event, [user_id] if user_id else []):
+        async for item in self._cmd_unbind(event, self._parse_command_args(event, "steamwatch_unbind", user_id)):
             yield item
 
     @filter.command("steamwatch_me")
@@ -340,7 +495,7 @@ class SteamWatchPlugin(Star):
     # Command handlers
     # ------------------------
     def _require_admin(self, event: AstrMessageEvent) -> Optional[str]:
-        admins = [str(x).strip() for x in self.config.get("admin_user_ids", []) if str(x).strip()]
+        admins = self._settings().admin_user_ids
         if not admins:
             return None
         user_key = self._get_user_key(event)
@@ -348,12 +503,12 @@ class SteamWatchPlugin(Star):
             return None
         return "权限不足：该指令仅管理员可用。"
 
-    async def _cmd_add(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_add(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
             return
-        raw_text = self._get_event_text(event)
+        raw_text = args.raw_text
         target = args[0] if args else ""
 
         # 支持 /sw add @123456 或 /sw add [At:123456] 或 CQ at
@@ -361,9 +516,7 @@ class SteamWatchPlugin(Star):
 
         # 支持 /sw add @昵称（从绑定昵称反查）
         if not bind_user and target.startswith("@") and len(target) > 1:
-            name = target[1:]
-            meta = self._get_binding_meta()
-            matches = [uid for uid, nick in meta.items() if nick == name]
+            matches = self._get_nickname_index().exact(target[1:])
             if len(matches) == 1:
                 bind_user = matches[0]
 
@@ -383,11 +536,10 @@ class SteamWatchPlugin(Star):
             yield event.plain_result(error or "无法解析 SteamID。")
             return
 
-        steamids = self._get_steamids()
         group = args[1] if len(args) > 1 else ""
         if not group and self._group_enabled():
             group = self._get_current_sub_group(event)
-        if steamid in steamids:
+        if steamid in self._get_pool_index():
             if group:
                 groups = self._get_steamid_groups()
                 if self._add_steamid_group(groups, steamid, group):
@@ -400,6 +552,7 @@ class SteamWatchPlugin(Star):
                 yield event.plain_result(f"{steamid} 已在监控号池中。")
             return
 
+        steamids = self._get_steamids()
         steamids.append(steamid)
         self._set_steamids(steamids)
         if group:
@@ -410,12 +563,12 @@ class SteamWatchPlugin(Star):
         else:
             yield event.plain_result(f"已添加 {steamid} 到监控号池。")
 
-    async def _cmd_remove(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_remove(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
             return
-        target = self._extract_target_or_at(event, args)
+        target = self._extract_target_or_at(args)
         if not target:
             yield event.plain_result("用法：/sw remove <steamid64|profile_url|vanity|friend_code|me> [group]")
             return
@@ -425,8 +578,7 @@ class SteamWatchPlugin(Star):
             yield event.plain_result(error or "无法解析 SteamID。")
             return
 
-        steamids = self._get_steamids()
-        if steamid not in steamids:
+        if steamid not in self._get_pool_index():
             yield event.plain_result(f"{steamid} 不在监控列表中。")
             return
 
@@ -445,9 +597,11 @@ class SteamWatchPlugin(Star):
             groups.pop(steamid, None)
             self._set_steamid_groups(groups)
 
-        steamids.remove(steamid)
-        self._set_steamids(steamids)
+        pool = dict(self._get_pool_index())
+        pool.pop(steamid, None)
+        self._set_steamids(list(pool))
         self._last_state.pop(steamid, None)
+        self._pending_stops.pop(steamid, None)
         self._session_start.pop(steamid, None)
         groups = self._get_steamid_groups()
         if steamid in groups:
@@ -458,23 +612,65 @@ class SteamWatchPlugin(Star):
         else:
             yield event.plain_result(f"已从监控号池移除 {steamid}。")
 
-    async def _cmd_list(self, event: AstrMessageEvent):
+    async def _cmd_list(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
             return
-        steamids = self._get_steamids()
-        if not steamids:
+        pool = self._get_pool_index()
+        if not pool:
             yield event.plain_result("监控列表为空。")
             return
-        bindings = self._get_bindings()
-        meta = self._get_binding_meta()
+        page = 1
+        group_filter = ""
+        playing_only = False
+        idx = 0
+        while idx < len(args):
+            token = args[idx]
+            lowered = token.lower()
+            if token.isdigit():
+                page = max(1, int(token))
+            elif lowered in {"playing", "play", "在玩"}:
+                playing_only = True
+            elif lowered in {"group", "g"} and idx + 1 < len(args):
+                idx += 1
+                group_filter = args[idx]
+            elif lowered.startswith("group=") or lowered.startswith("g="):
+                group_filter = token.split("=", 1)[1]
+            else:
+                yield event.plain_result("用法：/sw list [页码] [group <分组>] [playing]")
+                return
+            idx += 1
+
         groups = self._get_steamid_groups()
-        lines = ["监控列表："]
-        for sid in steamids:
-            users = [u for u, s in bindings.items() if s == sid]
-            group_names = groups.get(sid, [])
-            group_text = "、".join(group_names)
+        selected: List[str] = []
+        for sid in pool:
+            if group_filter and group_filter not in groups.get(sid, ()):
+                continue
+            if playing_only:
+                state = self._last_state.get(sid)
+                if not state or not state[0]:
+                    continue
+            selected.append(sid)
+        if not selected:
+            yield event.plain_result("没有符合条件的监控账号。")
+            return
+        pages = (len(selected) + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE
+        page = min(page, pages)
+        start = (page - 1) * LIST_PAGE_SIZE
+
+        binding_index = self._get_binding_index()
+        meta = self._get_binding_meta()
+        filters = []
+        if group_filter:
+            filters.append(f"分组 {group_filter}")
+        if playing_only:
+            filters.append("游戏中")
+        filter_text = f"，筛选：{'、'.join(filters)}" if filters else ""
+        lines = [f"监控列表（第 {page}/{pages} 页，共 {len(selected)} 个{filter_text}）："]
+        for sid in selected[start : start + LIST_PAGE_SIZE]:
+            users = binding_index.get(sid, [])
+            group_text = "、".join(groups.get(sid, []))
             if users:
                 # 仅展示第一个绑定用户
                 uid = users[0]
@@ -492,9 +688,11 @@ class SteamWatchPlugin(Star):
                     lines.append(f"- {sid}  (分组：{group_text})")
                 else:
                     lines.append(f"- {sid}")
+        if page < pages:
+            lines.append(f"下一页：/sw list {page + 1}")
         yield event.plain_result("\n".join(lines))
 
-    async def _cmd_interval(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_interval(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
@@ -510,14 +708,194 @@ class SteamWatchPlugin(Star):
         self._save_config_safe()
         yield event.plain_result(f"轮询间隔已设置为 {value} 秒。")
 
-    async def _cmd_subscribe(self, event: AstrMessageEvent):
+    async def _cmd_import(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        payload = args.payload.strip()
+        if not payload:
+            yield event.plain_result(
+                "用法：/sw import <CSV/JSON 文本|文件路径>\n"
+                "CSV 列：target,groups,user_id,nickname（groups 多个用 | 分隔）"
+            )
+            return
+        if "\n" not in payload:
+            path = Path(payload.strip("\"'")).expanduser()
+            if path.suffix.lower() in {".csv", ".json", ".txt"}:
+                if not path.exists():
+                    yield event.plain_result(f"导入文件不存在：{path}")
+                    return
+                try:
+                    payload = path.read_text(encoding="utf-8-sig")
+                except OSError as exc:
+                    yield event.plain_result(f"读取导入文件失败：{self._format_net_error(exc)}")
+                    return
+        rows, errors = _parse_import_rows(payload)
+        if not rows and not errors:
+            yield event.plain_result("导入内容为空。")
+            return
+
+        resolved = await self._resolve_many(event, [row["target"] for row in rows])
+        steamids = self._get_steamids()
+        known = set(steamids)
+        groups = self._get_steamid_groups()
+        bindings = self._get_bindings()
+        meta = self._get_binding_meta()
+        bound_steamids = set(bindings.values())
+        added = grouped = bound = 0
+        for row in rows:
+            steamid, error = resolved.get(row["target"], (None, None))
+            if not steamid:
+                errors.append(f"第 {row['line']} 行 {row['target']}：{error or '无法解析 SteamID。'}")
+                continue
+            if steamid not in known:
+                known.add(steamid)
+                steamids.append(steamid)
+                added += 1
+            for group in row["groups"]:
+                if self._add_steamid_group(groups, steamid, group):
+                    grouped += 1
+            user_id = row["user_id"]
+            if not user_id:
+                continue
+            current = bindings.get(user_id)
+            if current == steamid:
+                continue
+            if current:
+                errors.append(f"第 {row['line']} 行 {row['target']}：用户 {user_id} 已绑定其他 SteamID。")
+                continue
+            if steamid in bound_steamids:
+                errors.append(f"第 {row['line']} 行 {row['target']}：该 SteamID 已被其他用户绑定。")
+                continue
+            bindings[user_id] = steamid
+            bound_steamids.add(steamid)
+            if row["nickname"]:
+                meta[user_id] = row["nickname"]
+            bound += 1
+
+        with self._config_transaction():
+            self._set_steamids(steamids)
+            self._set_steamid_groups(groups)
+            self._set_bindings(bindings)
+            self._set_binding_meta(meta)
+
+        lines = [
+            f"导入完成：共 {len(rows)} 行，新增 {added} 个账号，新增 {grouped} 条分组关系，新增 {bound} 条绑定。",
+        ]
+        if errors:
+            lines.append(f"失败 {len(errors)} 条：")
+            lines.extend(f"- {err}" for err in errors[:IMPORT_ERROR_PREVIEW])
+            if len(errors) > IMPORT_ERROR_PREVIEW:
+                lines.append(f"- ……其余 {len(errors) - IMPORT_ERROR_PREVIEW} 条省略")
+        yield event.plain_result("\n".join(lines))
+
+    async def _cmd_export(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        fmt = args[0].lower() if args else "csv"
+        if fmt not in {"csv", "json"}:
+            yield event.plain_result("用法：/sw export [csv|json]")
+            return
+        steamids = self._get_steamids()
+        if not steamids:
+            yield event.plain_result("监控列表为空。")
+            return
+        groups = self._get_steamid_groups()
+        meta = self._get_binding_meta()
+        users_by_sid: Dict[str, str] = {}
+        for uid, sid in self._get_bindings().items():
+            users_by_sid.setdefault(sid, uid)
+        rows = []
+        for sid in steamids:
+            uid = users_by_sid.get(sid, "")
+            rows.append(
+                {
+                    "target": sid,
+                    "groups": groups.get(sid, []),
+                    "user_id": uid,
+                    "nickname": meta.get(uid, "") if uid else "",
+                }
+            )
+        text = _format_export_rows(rows, fmt)
+        out_dir = self._get_data_dir() / "exports"
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out_path = out_dir / f"steamwatch_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+            out_path.write_text(text, encoding="utf-8")
+        except OSError as exc:
+            yield event.plain_result(f"导出失败：{self._format_net_error(exc)}")
+            return
+        reply = f"已导出 {len(rows)} 个账号：{out_path.resolve()}"
+        if len(rows) <= EXPORT_INLINE_MAX_ROWS:
+            reply += "\n" + text.rstrip()
+        yield event.plain_result(reply)
+
+    async def _cmd_catalog(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        catalog = self._get_app_catalog()
+        action = args[0].lower() if args else ""
+        if not action or action in {"info", "stat", "stats"}:
+            counts = await asyncio.to_thread(catalog.stats)
+            if not counts:
+                yield event.plain_result(
+                    "本地游戏名目录为空。\n"
+                    "用法：/sw catalog import <文件路径> [语言]（GetAppList JSON 或 appid,name[,lang] CSV）"
+                )
+                return
+            lines = [f"本地游戏名目录：{catalog.path.resolve()}"]
+            for lang, count in counts:
+                lines.append(f"- {lang or '默认'}：{count} 条")
+            yield event.plain_result("\n".join(lines))
+            return
+        if action.isdigit() or action in {"get", "lookup"}:
+            raw = action if action.isdigit() else (args[1] if len(args) > 1 else "")
+            if not raw.isdigit():
+                yield event.plain_result("用法：/sw catalog <appid>")
+                return
+            names = await asyncio.to_thread(catalog.names, int(raw))
+            if not names:
+                yield event.plain_result(f"目录中没有 appid {raw}。")
+                return
+            yield event.plain_result("\n".join(f"{lang or '默认'}：{name}" for lang, name in names))
+            return
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        if action == "clear":
+            await asyncio.to_thread(catalog.clear)
+            self._app_name_cache.clear()
+            yield event.plain_result("本地游戏名目录已清空。")
+            return
+        if action != "import" or len(args) < 2:
+            yield event.plain_result("用法：/sw catalog [appid|import <文件路径> [语言]|clear]")
+            return
+        path = Path(args[1].strip("\"'")).expanduser()
+        lang = args[2].strip() if len(args) > 2 else ""
+        if not path.exists():
+            yield event.plain_result(f"导入文件不存在：{path}")
+            return
+        try:
+            imported, skipped = await asyncio.to_thread(catalog.import_file, path, lang)
+        except (OSError, ValueError, sqlite3.Error) as exc:
+            yield event.plain_result(f"导入游戏名目录失败：{self._format_net_error(exc)}")
+            return
+        self._app_name_cache.clear()
+        reply = f"已导入 {imported} 条游戏名（语言：{lang or '按文件/默认'}）。"
+        if skipped:
+            reply += f"跳过 {skipped} 条无效记录。"
+        yield event.plain_result(reply)
+
+    async def _cmd_subscribe(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
             return
         target = event.unified_msg_origin
         if self._group_enabled():
-            group = self._extract_group_arg(event, "sub")
+            group = args[0] if args else ""
             if group:
                 groups = self._get_notify_groups()
                 targets = groups.get(group, [])
@@ -537,14 +915,14 @@ class SteamWatchPlugin(Star):
         self._set_notify_targets(targets)
         yield event.plain_result("已订阅当前会话通知。")
 
-    async def _cmd_unsubscribe(self, event: AstrMessageEvent):
+    async def _cmd_unsubscribe(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
             return
         target = event.unified_msg_origin
         if self._group_enabled():
-            group = self._extract_group_arg(event, "unsub")
+            group = args[0] if args else ""
             if group:
                 groups = self._get_notify_groups()
                 targets = groups.get(group, [])
@@ -585,7 +963,7 @@ class SteamWatchPlugin(Star):
         lines.append("- 全局订阅：已订阅" if target in targets else "- 全局订阅：未订阅")
         yield event.plain_result("\n".join(lines))
 
-    async def _cmd_groupinfo(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_groupinfo(self, event: AstrMessageEvent, args: "_CommandArgs"):
         deny = self._require_admin(event)
         if deny:
             yield event.plain_result(deny)
@@ -647,23 +1025,58 @@ class SteamWatchPlugin(Star):
             lines.append("提示：分群订阅启用时，仅推送已分组目标，不再回退到全局通知")
         yield event.plain_result("\n".join(lines))
 
-    async def _cmd_resolve(self, event: AstrMessageEvent, args: List[str]):
-        target = self._extract_target_or_at(event, args)
-        if not target:
-            yield event.plain_result("用法：/sw resolve <steamid64|profile_url|vanity|friend_code|me>")
+    async def _cmd_resolve(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        targets = list(dict.fromkeys(a for a in args if a.strip()))
+        mentioned = {_extract_at_user_id(t) for t in targets}
+        for uid in _extract_all_at_user_ids(args.raw_text):
+            if uid not in mentioned:
+                mentioned.add(uid)
+                targets.append(f"@{uid}")
+        if not targets:
+            yield event.plain_result("用法：/sw resolve <steamid64|profile_url|vanity|friend_code|me> [更多目标...]")
             return
-        steamid, error = await self._resolve_to_steamid64(event, target)
-        if steamid:
-            friend_code = _account_id_from_steamid64(int(steamid))
-            lines = [f"SteamID64：{steamid}", f"好友码：{friend_code}"]
-            if bool(self.config.get("show_csgo_friend_code", False)):
-                lines.append(f"CS:GO 好友码：{_encode_csgo_friend_code(int(steamid))}")
-            yield event.plain_result("\n".join(lines))
-        else:
-            yield event.plain_result(error or "无法解析 SteamID。")
+        show_csgo = self._settings().show_csgo_friend_code
+        if len(targets) == 1:
+            steamid, error = await self._resolve_to_steamid64(event, targets[0])
+            if steamid:
+                forms = _steamid_forms(int(steamid), show_csgo)
+                lines = [
+                    f"SteamID64：{steamid}",
+                    f"好友码：{forms.account_id}",
+                    f"Steam2：{forms.steam2}",
+                    f"Steam3：{forms.steam3}",
+                ]
+                if show_csgo:
+                    lines.append(f"CS:GO 好友码：{forms.csgo_code}")
+                yield event.plain_result("\n".join(lines))
+            else:
+                yield event.plain_result(error or "无法解析 SteamID。")
+            return
+        if len(targets) > RESOLVE_BATCH_MAX:
+            yield event.plain_result(f"单次最多解析 {RESOLVE_BATCH_MAX} 个目标。")
+            return
+        results = await self._resolve_many(event, targets)
+        header = "输入 | SteamID64 | 好友码" + (" | CS:GO 好友码" if show_csgo else "")
+        lines = [f"解析结果（{len(targets)} 个）：", header]
+        failed = 0
+        converted = _convert_steamids((sid for sid, _ in results.values() if sid), with_csgo=show_csgo)
+        for target in targets:
+            steamid, error = results.get(target.strip(), (None, None))
+            forms = converted.get(steamid) if steamid else None
+            if not forms:
+                failed += 1
+                lines.append(f"{target} | 失败：{error or '无法解析 SteamID。'}")
+                continue
+            row = f"{target} | {steamid} | {forms.account_id}"
+            if show_csgo:
+                row += f" | {forms.csgo_code}"
+            lines.append(row)
+        if failed:
+            lines.append(f"失败 {failed} 个。")
+        yield event.plain_result("\n".join(lines))
 
-    async def _cmd_query(self, event: AstrMessageEvent, args: List[str]):
-        target = self._extract_target_or_at(event, args)
+    async def _cmd_query(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        target = self._extract_target_or_at(args)
         if not target:
             yield event.plain_result("用法：/sw query <steamid64|profile_url|vanity|friend_code|me>")
             return
@@ -671,7 +1084,7 @@ class SteamWatchPlugin(Star):
         if not steamid:
             yield event.plain_result(error or "无法解析 SteamID。")
             return
-        api_key = self.config.get("steam_web_api_key", "")
+        api_key = self._settings().steam_web_api_key
         if not api_key:
             yield event.plain_result("未配置 Steam Web API Key。")
             return
@@ -705,20 +1118,26 @@ class SteamWatchPlugin(Star):
                 is_playing=False,
             )
 
-    async def _cmd_info(self, event: AstrMessageEvent, args: List[str]):
-        target = self._extract_target_or_at(event, args)
+    async def _cmd_info(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        target = self._extract_target_or_at(args)
         if not target:
             yield event.plain_result("用法：/sw info <steamid64|profile_url|vanity|friend_code|me>")
             return
-        steamid, error = await self._resolve_to_steamid64(event, target)
+        # 总时限覆盖整条指令：解析、玩家摘要、补充信息与出图时的下载
+        deadline = time.monotonic() + self._settings().info_deadline_sec
+        resolved = await self._within_deadline(self._resolve_to_steamid64(event, target), deadline)
+        if resolved is None:
+            yield event.plain_result("解析 SteamID 超时，请稍后再试。")
+            return
+        steamid, error = resolved
         if not steamid:
             yield event.plain_result(error or "无法解析 SteamID。")
             return
-        api_key = self.config.get("steam_web_api_key", "")
+        api_key = self._settings().steam_web_api_key
         if not api_key:
             yield event.plain_result("未配置 Steam Web API Key。")
             return
-        summaries = await self._fetch_player_summaries(api_key, [steamid])
+        summaries = await self._fetch_player_summaries(api_key, [steamid], deadline=deadline)
         if not summaries:
             yield event.plain_result("未获取到该 SteamID 信息。")
             return
@@ -730,7 +1149,28 @@ class SteamWatchPlugin(Star):
         playing = "gameid" in player or "gameextrainfo" in player
         game_name = player.get("gameextrainfo")
         appid = _safe_int(player.get("gameid"))
-        display_name = await self._get_localized_game_name(appid, game_name or "某个游戏")
+        display_name = game_name or "某个游戏"
+        timeout_sec = self._settings().request_timeout_sec
+        async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
+            # 游戏名、时长、成就互不依赖，并发获取；超过总时限后用已返回的部分出图。
+            # 时长与成就走 single-flight，请求自带 client：本函数的 client 退出时不能关掉别人共享的请求
+            jobs: Dict[str, asyncio.Task] = {
+                "name": asyncio.create_task(self._get_localized_game_name(appid, display_name, client=client)),
+            }
+            if appid is not None:
+                jobs["playtime"] = asyncio.create_task(self._fetch_game_playtime(api_key, steamid, int(appid)))
+                jobs["achv"] = asyncio.create_task(self._fetch_achievements(api_key, steamid, int(appid)))
+            done, pending = await asyncio.wait(jobs.values(), timeout=max(0.0, deadline - time.monotonic()))
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                if self._settings().debug_log:
+                    logger.info("steamwatch info deadline reached, %s lookups dropped", len(pending))
+            results = {key: task.result() for key, task in jobs.items() if task in done and not task.exception()}
+        display_name = results.get("name") or display_name
+        playtime = results.get("playtime")
+        achv = results.get("achv")
         friend_code = _account_id_from_steamid64(int(steamid))
         lines = [f"昵称：{name}", f"好友码：{friend_code}", f"SteamID64：{steamid}"]
         persona_state = PERSONA_STATE_TEXT.get(player.get("personastate"))
@@ -759,23 +1199,51 @@ class SteamWatchPlugin(Star):
             lines.append(f"正在玩：{display_name} (appid: {appid_text})！")
         else:
             lines.append("当前未在游戏中。")
-        if appid is not None:
-            playtime = await self._fetch_game_playtime(api_key, steamid, int(appid))
-            if playtime is not None:
-                lines.append(f"游戏总时长：{playtime} 小时")
-            achv = await self._fetch_achievements(api_key, steamid, int(appid))
-            if achv:
-                lines.append(f"成就进度：{achv}")
+        if playtime is not None:
+            lines.append(f"游戏总时长：{playtime} 小时")
+        if achv:
+            lines.append(f"成就进度：{achv}")
         yield await self._build_event_result(
             event,
             "\n".join(lines),
             appid=appid,
             avatar_url=str(player.get("avatarfull", "")),
             is_playing=playing,
+            deadline=deadline,
         )
 
-    async def _cmd_status(self, event: AstrMessageEvent, args: List[str]):
-        target = self._extract_target_or_at(event, args)
+    async def _cmd_top(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        count = TOP_GAMES_DEFAULT
+        tokens = list(args)
+        if len(tokens) > 1 and tokens[-1].isdigit() and len(tokens[-1]) <= 3:
+            count = max(1, min(TOP_GAMES_MAX, int(tokens.pop())))
+        target = self._extract_target_or_at(_CommandArgs(tokens, raw_text=args.raw_text))
+        if not target:
+            yield event.plain_result("用法：/sw top <steamid64|profile_url|vanity|friend_code|me> [数量]")
+            return
+        steamid, error = await self._resolve_to_steamid64(event, target)
+        if not steamid:
+            yield event.plain_result(error or "无法解析 SteamID。")
+            return
+        api_key = self._settings().steam_web_api_key
+        if not api_key:
+            yield event.plain_result("未配置 Steam Web API Key。")
+            return
+        library = await self._get_owned_library(api_key, steamid)
+        if library is None:
+            yield event.plain_result("未获取到游戏库（可能未公开游戏详情）。")
+            return
+        top = library.top(count)
+        if not top:
+            yield event.plain_result("该账号暂无游玩记录。")
+            return
+        lines = [f"{steamid} 游戏时长排行（共 {len(library)} 款，总计 {library.total_minutes() // 60} 小时）："]
+        for rank, (appid, minutes, name) in enumerate(top, start=1):
+            lines.append(f"{rank}. {name or appid} — {minutes / 60:.1f} 小时")
+        yield event.plain_result("\n".join(lines))
+
+    async def _cmd_status(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        target = self._extract_target_or_at(args)
         if not target:
             yield event.plain_result("用法：/sw status <steamid64|profile_url|vanity|friend_code|me>")
             return
@@ -783,7 +1251,7 @@ class SteamWatchPlugin(Star):
         if not steamid:
             yield event.plain_result(error or "无法解析 SteamID。")
             return
-        api_key = self.config.get("steam_web_api_key", "")
+        api_key = self._settings().steam_web_api_key
         if not api_key:
             yield event.plain_result("未配置 Steam Web API Key。")
             return
@@ -819,9 +1287,8 @@ class SteamWatchPlugin(Star):
         yield event.plain_result("已推送当前状态。")
 
     async def _cmd_test(self, event: AstrMessageEvent):
-        timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
+        timeout_sec = self._settings().request_timeout_sec
         results = []
-        proxy_url = self._get_proxy_url()
         async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
             try:
                 resp = await client.get("https://steamcommunity.com")
@@ -833,31 +1300,410 @@ class SteamWatchPlugin(Star):
                 results.append(f"api.steampowered.com: {resp.status_code}")
             except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
                 results.append(f"api.steampowered.com: 失败（{self._format_net_error(exc)}）")
-        results.append(f"代理：{proxy_url or '未配置'}")
+        pool = self._get_proxy_pool()
+        if pool.proxies:
+            results.append("代理池：")
+            results.extend(self._proxy_health_lines(pool))
+        else:
+            results.append("代理：未配置")
         yield event.plain_result("连通性测试结果：\n" + "\n".join(results))
 
     async def _cmd_proxytest(self, event: AstrMessageEvent):
-        proxy_url = self._get_proxy_url()
-        if not proxy_url:
-            yield event.plain_result("未配置代理（proxy_url）。")
+        pool = self._get_proxy_pool()
+        if not pool.proxies:
+            yield event.plain_result("未配置代理（proxy_url / proxy_pool）。")
             return
-        timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
+        timeout_sec = self._settings().request_timeout_sec
         results = []
         try:
             async with httpx.AsyncClient(timeout=timeout_sec, follow_redirects=True) as client:
-                resp = await client.get("https://api.ipify.org?format=json")
+                resp = await client.get(PROXY_CHECK_URL)
                 results.append(f"直连IP：{resp.json().get('ip', '未知')}")
         except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
             results.append(f"直连IP：失败（{self._format_net_error(exc)}）")
-        try:
-            async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
-                resp = await client.get("https://api.ipify.org?format=json")
-                results.append(f"代理IP：{resp.json().get('ip', '未知')}")
-        except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
-            results.append(f"代理IP：失败（{self._format_net_error(exc)}）")
-        results.append(f"代理地址：{proxy_url}")
+
+        async def check(proxy: str) -> str:
+            start = time.monotonic()
+            try:
+                async with self._create_http_client(timeout_sec, follow_redirects=True, proxy=proxy) as client:
+                    resp = await client.get(PROXY_CHECK_URL)
+                    ip = resp.json().get("ip", "未知")
+            except (httpx.HTTPError, ValueError) as exc:
+                pool.record(proxy, False, error=self._format_net_error(exc))
+                return f"失败（{self._format_net_error(exc)}）"
+            pool.record(proxy, True, latency=time.monotonic() - start)
+            return f"出口IP {ip}"
+
+        exits = await asyncio.gather(*(check(proxy) for proxy in pool.proxies))
+        pool.probed_at = time.time()
+        modes = self._route_modes()
+        results.append("路由：" + "，".join(f"{name}={'代理' if modes[name] == 'proxy' else '直连'}" for name in ROUTE_CLASSES))
+        results.append("代理池：")
+        results.extend(self._proxy_health_lines(pool, exits))
         yield event.plain_result("代理测试结果：\n" + "\n".join(results))
 
+    def _proxy_health_lines(self, pool: "_ProxyPool", exits: Optional[List[str]] = None) -> List[str]:
+        """代理池每个代理一行：状态、延迟与请求/失败次数；剔除中的代理附上最近一次错误。"""
+        lines = []
+        now = time.time()
+        for idx, proxy in enumerate(pool.proxies):
+            stats = pool.stats[proxy]
+            latency = f"{stats.latency * 1000:.0f}ms" if stats.latency is not None else "未测速"
+            state = "正常" if stats.ejected_until <= now else f"已剔除（{int(stats.ejected_until - now)} 秒后恢复）"
+            line = f"- {proxy}  {state}  延迟 {latency}  请求 {stats.requests}  失败 {stats.errors}"
+            lines.append(f"{line}  {exits[idx]}" if exits else line)
+            if stats.last_error and stats.ejected_until > now:
+                lines.append(f"  最近错误：{stats.last_error}")
+        return lines
+
+    async def _cmd_metrics(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        action = args[0].lower() if args else ""
+        if action in {"prom", "prometheus", "dump"}:
+            path = self._dump_metrics()
+            if path is None:
+                yield event.plain_result("导出指标失败，详见日志。")
+                return
+            yield event.plain_result(f"已导出 Prometheus 格式指标：{path.resolve()}")
+            return
+        if action == "reset":
+            self._metrics = _Metrics()
+            # 每轮账号上限是调度状态而非统计量，清零后继续如实显示
+            self._metrics.set("poll_account_limit", self._poll_limit or 0)
+            yield event.plain_result("指标已清零。")
+            return
+        if action:
+            yield event.plain_result("用法：/sw metrics [prom|reset]")
+            return
+        yield event.plain_result(self._format_metrics_summary())
+
+    def _format_metrics_summary(self) -> str:
+        metrics = self._metrics
+        uptime_min = int((time.time() - metrics.started_at) // 60)
+        lines = [f"SteamWatch 运行指标（统计 {uptime_min} 分钟）"]
+
+        poll = metrics.histogram("poll_cycle_seconds")
+        if poll is not None and poll.count:
+            lines.append(
+                f"轮询：{poll.count} 次，平均 {poll.mean() * 1000:.0f}ms，P95≈{poll.quantile(0.95) * 1000:.0f}ms，"
+                f"最大 {poll.max * 1000:.0f}ms；最近 {int(metrics.gauge('poll_targets'))} 个账号 / "
+                f"{int(metrics.gauge('poll_batches'))} 批"
+            )
+            overruns = metrics.counter_total("poll_overruns_total")
+            restarts = metrics.counter_total("poll_watchdog_restarts_total")
+            deadlines = metrics.counter_total("poll_deadline_exceeded_total")
+            limit = int(metrics.gauge("poll_account_limit"))
+            if overruns or restarts or deadlines or limit:
+                lines.append(
+                    f"- 超时 {int(overruns)} 次，跳过 {int(metrics.counter_total('poll_skipped_slots_total'))} 个时刻，"
+                    f"看门狗重启 {int(restarts)} 次，批量查询截止 {int(deadlines)} 次"
+                    + (f"；当前每轮限 {limit} 个账号" if limit else "")
+                )
+            restarts_merged = metrics.counter_total("transitions_suppressed_total")
+            pending_stops = int(metrics.gauge("pending_stops"))
+            if restarts_merged or pending_stops:
+                lines.append(f"- 防抖：合并快速重开 {int(restarts_merged)} 次，待确认停止 {pending_stops} 个")
+
+        http_rows = metrics.histograms_named("http_request_seconds")
+        if http_rows:
+            lines.append("HTTP：")
+            for labels, hist in sorted(http_rows, key=lambda row: -row[1].count):
+                statuses = [
+                    f"{row_labels['status']}×{int(value)}"
+                    for row_labels, value in metrics.counters_named("http_responses_total")
+                    if row_labels.get("endpoint") == labels.get("endpoint")
+                    and row_labels.get("host_class") == labels.get("host_class")
+                ]
+                lines.append(
+                    f"- {labels.get('host_class')} {labels.get('endpoint')}：{hist.count} 次，"
+                    f"平均 {hist.mean() * 1000:.0f}ms，P95≈{hist.quantile(0.95) * 1000:.0f}ms（{' '.join(statuses)}）"
+                )
+            retries = metrics.counter_total("http_retries_total")
+            if retries:
+                lines.append(f"- 重试 {int(retries)} 次")
+
+        render_rows = metrics.histograms_named("render_stage_seconds")
+        if render_rows:
+            stages = "，".join(
+                f"{labels.get('stage')} {hist.mean() * 1000:.0f}ms"
+                for labels, hist in sorted(render_rows, key=lambda row: row[0].get("stage", ""))
+            )
+            lines.append(f"渲染（平均）：{stages}")
+
+        send_rows = metrics.histograms_named("send_seconds")
+        if send_rows:
+            sent = metrics.counter_total("sends_total")
+            failed = sum(value for labels, value in metrics.counters_named("sends_total") if labels.get("result") != "ok")
+            lines.append(f"发送：{int(sent)} 次，失败 {int(failed)} 次")
+            self._update_send_queue_gauges()
+            wait = metrics.histogram("send_queue_wait_seconds")
+            lines.append(
+                f"- 队列：当前 {int(metrics.gauge('send_queue_depth'))} 条，最久等待 "
+                f"{metrics.gauge('send_queue_oldest_seconds'):.1f}s，"
+                f"平均排队 {(wait.mean() if wait else 0.0) * 1000:.0f}ms，"
+                f"丢弃 {int(metrics.counter_total('send_dropped_total'))} 条"
+            )
+            lines.append(
+                f"- 限流：合并 {int(metrics.counter_total('send_coalesced_total'))} 条，"
+                f"因配额延后 {int(metrics.counter_total('send_delayed_total'))} 条"
+            )
+            for labels, hist in sorted(send_rows, key=lambda row: -row[1].count)[:5]:
+                lines.append(f"- {labels.get('target')}：{hist.count} 次，平均 {hist.mean() * 1000:.0f}ms")
+
+        cache_stats: Dict[str, List[float]] = {}
+        for labels, value in metrics.counters_named("cache_requests_total"):
+            entry = cache_stats.setdefault(labels.get("cache", ""), [0.0, 0.0])
+            entry[0 if labels.get("result") == "hit" else 1] += value
+        if cache_stats:
+            lines.append(
+                "缓存命中率："
+                + "，".join(
+                    f"{name} {hit / max(1.0, hit + miss):.0%}（{int(hit)}/{int(hit + miss)}）"
+                    for name, (hit, miss) in sorted(cache_stats.items())
+                )
+            )
+
+        command_rows = metrics.histograms_named("command_seconds")
+        if command_rows:
+            lines.append("指令：")
+            for labels, hist in sorted(command_rows, key=lambda row: -row[1].count)[:10]:
+                lines.append(
+                    f"- {labels.get('command')}：{hist.count} 次，平均 {hist.mean() * 1000:.0f}ms，最大 {hist.max * 1000:.0f}ms"
+                )
+        if len(lines) == 1:
+            lines.append("暂无数据。")
+        return "\n".join(lines)
+
+    def _dump_metrics(self) -> Optional[Path]:
+        target = self._settings().metrics_file
+        path = Path(target).expanduser() if target else self._get_data_dir() / METRICS_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(self._metrics.render_prometheus(), encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError:
+            logger.exception("steamwatch metrics dump failed: %s", path)
+            return None
+        return path
+
+    @contextlib.contextmanager
+    def _timed_stage(self, name: str, stage: str):
+        """同时记录直方图与追踪子阶段。"""
+        with self._metrics.timer(name, stage=stage), _trace_span(stage):
+            yield
+
+    async def _cmd_perf(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        action = args[0].lower() if args else ""
+        if action in {"dump", "json", "jsonl"}:
+            if not self._traces:
+                yield event.plain_result("暂无追踪记录。")
+                return
+            path = self._dump_traces()
+            if path is None:
+                yield event.plain_result("导出追踪记录失败，详见日志。")
+                return
+            yield event.plain_result(f"已导出 {len(self._traces)} 轮追踪记录：{path.resolve()}")
+            return
+        if action == "clear":
+            self._traces.clear()
+            yield event.plain_result("追踪记录已清空。")
+            return
+        if action:
+            yield event.plain_result("用法：/sw perf [dump|clear]")
+            return
+        yield event.plain_result(self._format_perf_report())
+
+    def _record_trace(self, root: "_Span") -> None:
+        limit = self._settings().perf_trace_cycles
+        if self._traces.maxlen != limit:
+            self._traces = deque(self._traces, maxlen=limit)
+        self._trace_seq += 1
+        self._traces.append(_CycleTrace(self._trace_seq, time.time(), root))
+
+    def _format_perf_report(self) -> str:
+        limit = self._settings().perf_trace_cycles
+        if not limit:
+            return "轮询追踪已关闭（perf_trace_cycles=0）。"
+        traces = list(self._traces)
+        if not traces:
+            return "暂无追踪记录，等待下一轮轮询。"
+        lines = [f"SteamWatch 轮询追踪（最近 {len(traces)} 轮，最多保留 {limit} 轮）"]
+        slowest = sorted(traces, key=lambda trace: -trace.root.duration)
+        lines.append("最慢轮次：")
+        for trace in slowest[:5]:
+            transitions = sum(1 for _, span in trace.root.walk() if span.name == "transition")
+            lines.append(
+                f"- #{trace.seq} {datetime.fromtimestamp(trace.at).strftime('%m-%d %H:%M:%S')}  "
+                f"{trace.root.duration * 1000:.0f}ms  账号 {trace.root.attrs.get('targets', 0)} / 状态变化 {transitions}"
+            )
+        stages: Dict[str, List[float]] = {}
+        for trace in traces:
+            for depth, span in trace.root.walk():
+                if depth == 0:
+                    continue
+                entry = stages.setdefault(span.name, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += span.duration
+                entry[2] = max(entry[2], span.duration)
+        if stages:
+            lines.append("阶段耗时（按累计排序）：")
+            for name, (count, total, peak) in sorted(stages.items(), key=lambda item: -item[1][1])[:10]:
+                lines.append(
+                    f"- {name}：{count} 次，平均 {total / count * 1000:.0f}ms，最大 {peak * 1000:.0f}ms，"
+                    f"累计 {total * 1000:.0f}ms"
+                )
+        worst = slowest[0]
+        lines.append(f"最慢一轮 #{worst.seq} 明细：")
+        tree = list(worst.root.walk())
+        for depth, span in tree[:PERF_TREE_MAX_LINES]:
+            attrs = " ".join(f"{key}={value}" for key, value in span.attrs.items())
+            lines.append(f"{'  ' * depth}{span.name} {span.duration * 1000:.0f}ms{'  ' + attrs if attrs else ''}")
+        if len(tree) > PERF_TREE_MAX_LINES:
+            lines.append(f"……另有 {len(tree) - PERF_TREE_MAX_LINES} 个阶段，使用 /sw perf dump 查看完整记录")
+        return "\n".join(lines)
+
+    def _dump_traces(self) -> Optional[Path]:
+        path = self._get_data_dir() / PERF_TRACE_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as fp:
+                for trace in self._traces:
+                    record = {
+                        "seq": trace.seq,
+                        "at": datetime.fromtimestamp(trace.at).isoformat(timespec="seconds"),
+                        "ms": round(trace.root.duration * 1000, 3),
+                        "span": trace.root.to_dict(trace.root.started),
+                    }
+                    fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+            tmp_path.replace(path)
+        except OSError:
+            logger.exception("steamwatch trace dump failed: %s", path)
+            return None
+        return path
+
+    async def _cmd_profile(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        deny = self._require_admin(event)
+        if deny:
+            yield event.plain_result(deny)
+            return
+        usage = (
+            "用法：/sw profile [轮数|秒数s|stop]\n"
+            f"例如 /sw profile 3 剖析接下来 3 轮轮询（最多 {PROFILE_MAX_CYCLES}），"
+            f"/sw profile 60s 剖析接下来 60 秒内的全部处理（最多 {PROFILE_MAX_SECONDS}）"
+        )
+        action = " ".join(args).strip().lower()
+        if action in {"", "status"}:
+            session = self._profile
+            if session is not None:
+                unit = "轮轮询" if session.mode == "cycles" else "秒"
+                remaining = (
+                    session.remaining
+                    if session.mode == "cycles"
+                    else max(0, int(session.started_at + session.amount - time.time()))
+                )
+                yield event.plain_result(f"性能剖析进行中：共 {session.amount} {unit}，剩余 {remaining}。")
+            elif self._last_profile_report:
+                yield event.plain_result(self._last_profile_report)
+            else:
+                yield event.plain_result(usage)
+            return
+        if action == "stop":
+            if self._profile is None:
+                yield event.plain_result("当前没有进行中的性能剖析。")
+                return
+            if self._profile_task and not self._profile_task.done():
+                self._profile_task.cancel()
+            yield event.plain_result(await self._finish_profile(notify=False))
+            return
+        match = re.fullmatch(r"(?:(cycles?|seconds?)\s+)?(\d+)\s*(s|sec|秒)?", action)
+        if not match:
+            yield event.plain_result(usage)
+            return
+        amount = int(match.group(2))
+        mode = "seconds" if match.group(3) or (match.group(1) or "").startswith("second") else "cycles"
+        limit = PROFILE_MAX_SECONDS if mode == "seconds" else PROFILE_MAX_CYCLES
+        if not 1 <= amount <= limit:
+            yield event.plain_result(usage)
+            return
+        if self._profile is not None:
+            yield event.plain_result("已有性能剖析在进行中，可使用 /sw profile stop 提前结束。")
+            return
+        session = _ProfileSession(mode, amount, event.unified_msg_origin)
+        if mode == "seconds":
+            try:
+                session.profiler.enable()
+            except ValueError as exc:
+                # 同一线程已有其他 profiler（如调试器）时 cProfile 无法启用
+                yield event.plain_result(f"无法开启性能剖析：{exc}")
+                return
+            self._profile_task = asyncio.create_task(self._profile_timer(session))
+            self._profile = session
+            yield event.plain_result(f"已开始性能剖析，{amount} 秒后输出结果。")
+            return
+        self._profile = session
+        yield event.plain_result(f"已开始性能剖析，将覆盖接下来 {amount} 轮轮询，结束后输出结果。")
+
+    async def _profile_timer(self, session: "_ProfileSession") -> None:
+        await asyncio.sleep(session.amount)
+        if self._profile is session:
+            await self._finish_profile()
+
+    async def _finish_profile(self, notify: bool = True) -> str:
+        """停止当前剖析，写入 pstats 与文本报告；notify 时把摘要发回发起会话。"""
+        session = self._profile
+        if session is None:
+            return ""
+        self._profile = None
+        session.profiler.disable()
+        elapsed = time.time() - session.started_at
+        scope = f"{session.amount} 轮轮询" if session.mode == "cycles" else f"{session.amount} 秒"
+        try:
+            stats = pstats.Stats(session.profiler)
+        except TypeError:
+            # 剖析期间没有任何调用被记录（例如轮询未运行）
+            report = f"性能剖析结束（{scope}，实际 {elapsed:.1f}s）：没有采集到数据。"
+        else:
+            path = self._dump_profile(stats)
+            location = f"：{path.resolve()}" if path is not None else "（写入文件失败，详见日志）"
+            report = "\n".join(
+                [f"性能剖析结束（{scope}，实际 {elapsed:.1f}s）{location}"] + _format_profile_top(stats)
+            )
+        self._last_profile_report = report
+        if notify and session.origin:
+            try:
+                await self.context.send_message(session.origin, MessageChain().message(report))
+            except Exception:
+                logger.exception("Failed to send steamwatch profile report")
+        return report
+
+    def _dump_profile(self, stats: "pstats.Stats") -> Optional[Path]:
+        directory = self._get_data_dir() / PROFILE_DIR
+        stem = f"steamwatch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{stem}.pstats"
+            stats.dump_stats(str(path))
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats("cumulative").print_stats(60)
+            (directory / f"{stem}.txt").write_text(buffer.getvalue(), encoding="utf-8")
+        except OSError:
+            logger.exception("steamwatch profile dump failed: %s", directory)
+            return None
+        return path
+
+    def _count_cache(self, cache: str, hit: bool) -> None:
+        self._metrics.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
     async def _cmd_apply_recommended_preset(self, event: AstrMessageEvent):
         deny = self._require_admin(event)
         if deny:
@@ -876,13 +1722,14 @@ class SteamWatchPlugin(Star):
         self.config["image_card_blur"] = 12
         self.config["image_card_padding"] = 28
         self.config["image_card_margin"] = 44
+        self.config["image_show_avatar"] = True
         self.config["image_auto_download_font"] = True
         self._save_config_safe()
         yield event.plain_result(
             "已应用推荐配置：图片输出、游戏头图优先、磨砂卡片与中文字体自动下载。"
         )
 
-    async def _cmd_menu_style(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_menu_style(self, event: AstrMessageEvent, args: "_CommandArgs"):
         current = self._get_menu_style()
         if not args:
             yield event.plain_result(
@@ -908,9 +1755,9 @@ class SteamWatchPlugin(Star):
         self._save_config_safe()
         yield event.plain_result(f"菜单风格已切换为 {style}。输入 /sw 查看效果。")
 
-    async def _cmd_font(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_font(self, event: AstrMessageEvent, args: "_CommandArgs"):
         if not args:
-            current = str(self.config.get("image_font_path", "")).strip() or "未设置（自动选择系统字体）"
+            current = self._settings().image_font_path or "未设置（自动选择系统字体）"
             yield event.plain_result(
                 "\n".join(
                     [
@@ -966,7 +1813,7 @@ class SteamWatchPlugin(Star):
             return
         yield event.plain_result("未知参数。用法：/sw font dl [url] [filename] | /sw font set <path> | /sw font clear")
 
-    async def _cmd_bind(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_bind(self, event: AstrMessageEvent, args: "_CommandArgs"):
         if not args:
             yield event.plain_result("用法：/sw bind <steamid64|profile_url|vanity|friend_code>")
             return
@@ -980,7 +1827,7 @@ class SteamWatchPlugin(Star):
         if user_key in bindings:
             yield event.plain_result("你已绑定过 SteamID，如需更换请先 /sw unbind。")
             return
-        if steamid in bindings.values():
+        if self._get_binding_index().get(steamid):
             yield event.plain_result("该 SteamID 已被其他用户绑定。")
             return
         bindings[user_key] = steamid
@@ -994,14 +1841,13 @@ class SteamWatchPlugin(Star):
             meta[user_key] = nickname
             self._set_binding_meta(meta)
         friend_code = _account_id_from_steamid64(int(steamid))
-        csgo_code = _encode_csgo_friend_code(int(steamid))
         extra = ""
-        if bool(self.config.get("show_csgo_friend_code", False)):
-            extra = f"（CS:GO 好友码：{csgo_code}）"
+        if self._settings().show_csgo_friend_code:
+            extra = f"（CS:GO 好友码：{_encode_csgo_friend_code(int(steamid))}）"
         # 可选：当未设置管理员列表时，绑定即自动加入监控
         if self._auto_add_on_bind():
-            steamids = self._get_steamids()
-            if steamid not in steamids:
+            if steamid not in self._get_pool_index():
+                steamids = self._get_steamids()
                 steamids.append(steamid)
                 self._set_steamids(steamids)
             if self._group_enabled():
@@ -1012,7 +1858,7 @@ class SteamWatchPlugin(Star):
                     self._set_steamid_groups(groups)
         yield event.plain_result(f"已绑定：{user_key} -> {friend_code}（64ID：{steamid}）{extra}")
 
-    async def _cmd_unbind(self, event: AstrMessageEvent, args: List[str]):
+    async def _cmd_unbind(self, event: AstrMessageEvent, args: "_CommandArgs"):
         user_key = self._get_user_key(event)
         target_user = user_key
         if args:
@@ -1041,16 +1887,15 @@ class SteamWatchPlugin(Star):
             yield event.plain_result("你还未绑定 SteamID。使用 /sw bind 进行绑定。")
             return
         friend_code = _account_id_from_steamid64(int(steamid))
-        csgo_code = _encode_csgo_friend_code(int(steamid))
         extra = ""
-        if bool(self.config.get("show_csgo_friend_code", False)):
-            extra = f"（CS:GO 好友码：{csgo_code}）"
+        if self._settings().show_csgo_friend_code:
+            extra = f"（CS:GO 好友码：{_encode_csgo_friend_code(int(steamid))}）"
         yield event.plain_result(f"当前绑定：{friend_code}（64ID：{steamid}）{extra}")
 
     async def _menu_text(self, event: AstrMessageEvent):
         if self._get_menu_style() == 2:
             lines = [
-                "╭─ SteamWatch v1.2.5 ─╮",
+                "╭─ SteamWatch v1.3.0 ─╮",
                 "│ 入口：/sw <模块>     │",
                 "╰────────────────────╯",
                 "",
@@ -1098,8 +1943,11 @@ class SteamWatchPlugin(Star):
                 "管理",
                 "  /steamwatch_add <目标> [分组]",
                 "  /steamwatch_remove <目标> [分组]",
-                "  /steamwatch_list",
+                "  /steamwatch_list [页码] [group <分组>] [playing]",
                 "  /steamwatch_interval <seconds>",
+                "  /steamwatch_import <CSV/JSON|文件>",
+                "  /steamwatch_export [csv|json]",
+                "  /steamwatch_catalog [appid|import <文件> [语言]|clear]",
                 "",
                 "通知",
                 "  /steamwatch_subscribe [group]",
@@ -1112,6 +1960,7 @@ class SteamWatchPlugin(Star):
                 "查询",
                 "  /steamwatch_query <目标>",
                 "  /steamwatch_info <目标>",
+                "  /steamwatch_top <目标> [数量]",
                 "  /steamwatch_status <目标>",
                 "  /steamwatch_resolve <目标>",
                 "",
@@ -1123,6 +1972,10 @@ class SteamWatchPlugin(Star):
                 "网络与显示",
                 "  /steamwatch_test",
                 "  /steamwatch_proxytest",
+                "  /steamwatch_net [status|probe]",
+                "  /steamwatch_metrics [prom|reset]",
+                "  /steamwatch_perf [dump|clear]",
+                "  /steamwatch_profile [轮数|秒数s|stop]",
                 "  /steamwatch_font",
                 "  /steamwatch_preset",
                 "  /steamwatch_menustyle [1|2]",
@@ -1136,8 +1989,11 @@ class SteamWatchPlugin(Star):
             "管理（管理员）：",
             "/steamwatch_add <steamid64|profile_url|vanity|friend_code|me> [group]",
             "/steamwatch_remove <steamid64|profile_url|vanity|friend_code|me> [group]",
-            "/steamwatch_list",
+            "/steamwatch_list [page] [group <group>] [playing]",
             "/steamwatch_interval <seconds>",
+            "/steamwatch_import <csv|json|file>",
+            "/steamwatch_export [csv|json]",
+            "/steamwatch_catalog [appid|import <file> [lang]|clear]",
             "/steamwatch_subscribe [group]",
             "/steamwatch_unsubscribe [group]",
             "/steamwatch_subinfo",
@@ -1147,6 +2003,7 @@ class SteamWatchPlugin(Star):
             "查询：",
             "/steamwatch_query <steamid64|profile_url|vanity|friend_code|me>",
             "/steamwatch_info <steamid64|profile_url|vanity|friend_code|me>",
+            "/steamwatch_top <steamid64|profile_url|vanity|friend_code|me> [n]",
             "/steamwatch_status <steamid64|profile_url|vanity|friend_code|me>",
             "/steamwatch_resolve <steamid64|profile_url|vanity|friend_code|me>",
             "",
@@ -1158,6 +2015,10 @@ class SteamWatchPlugin(Star):
             "网络：",
             "/steamwatch_test",
             "/steamwatch_proxytest",
+            "/steamwatch_net [status|probe]",
+            "/steamwatch_metrics [prom|reset]",
+            "/steamwatch_perf [dump|clear]",
+            "/steamwatch_profile [轮数|秒数s|stop]",
             "",
             "菜单：",
             "/steamwatch_menu",
@@ -1179,12 +2040,21 @@ class SteamWatchPlugin(Star):
                 "  不填分组：移出监控号池",
                 "  填写分组：仅移出该分组",
                 "",
-                "/sw list",
-                "  查看监控号池与账号分组",
+                "/sw list [页码] [group <分组>] [playing]",
+                "  分页查看监控号池，可按分组/游戏中筛选",
                 "",
                 "/sw interval <秒>",
                 "  设置轮询间隔，最低 30 秒",
                 "",
+                "/sw import <CSV/JSON|文件路径>",
+                "  批量导入账号、分组与绑定",
+                "",
+                "/sw export [csv|json]",
+                "  导出监控号池、分组与绑定",
+                "",
+                "/sw catalog [appid|import <文件路径> [语言]|clear]",
+                "  本地游戏名目录，离线解析游戏名",
+                "",
                 "目标支持：steamid / profile / vanity / friend_code / me / @用户",
             ])
         return "\n".join([
@@ -1192,8 +2062,11 @@ class SteamWatchPlugin(Star):
             "----------------------",
             "/sw add <steamid|profile|vanity|friend_code|me> [group]  添加监控",
             "/sw remove <steamid|profile|vanity|friend_code|me> [group] 移除监控",
-            "/sw list                                       查看监控列表",
+            "/sw list [page] [group <g>] [playing]          查看监控列表",
             "/sw interval <seconds>  (>=30)                 设置轮询间隔",
+            "/sw import <csv|json|file>                     批量导入",
+            "/sw export [csv|json]                          导出号池",
+            "/sw catalog [appid|import <file> [lang]|clear] 本地游戏名目录",
         ])
 
     def _menu_notify(self) -> str:
@@ -1248,11 +2121,14 @@ class SteamWatchPlugin(Star):
                 "/sw info <目标>",
                 "  查看昵称、状态、时长、成就等信息",
                 "",
+                "/sw top <目标> [数量]",
+                "  查看游戏时长排行",
+                "",
                 "/sw status <目标>",
                 "  手动推送一次当前状态",
                 "",
-                "/sw resolve <目标>",
-                "  解析为 SteamID64 和好友码",
+                "/sw resolve <目标> [更多目标...]",
+                "  解析为 SteamID64 和好友码，支持一次解析多个",
                 "",
                 "目标支持：steamid / profile / vanity / friend_code / me / @用户",
             ])
@@ -1261,8 +2137,9 @@ class SteamWatchPlugin(Star):
             "----------------------",
             "/sw query <steamid|profile|vanity|friend_code|me>   快速查询",
             "/sw info  <steamid|profile|vanity|friend_code|me>   详细信息",
+            "/sw top <steamid|profile|vanity|friend_code|me> [n] 游戏时长排行",
             "/sw status <steamid|profile|vanity|friend_code|me>  推送当前状态",
-            "/sw resolve <steamid|profile|vanity|friend_code|me> 解析为 SteamID64",
+            "/sw resolve <steamid|profile|vanity|friend_code|me> ... 批量解析为 SteamID64",
         ])
 
     def _menu_bind(self) -> str:
@@ -1304,6 +2181,18 @@ class SteamWatchPlugin(Star):
                 "/sw proxytest",
                 "  测试代理出口是否生效",
                 "",
+                "/sw net status | probe",
+                "  查看镜像线路选择 / 立即测速",
+                "",
+                "/sw metrics [prom|reset]",
+                "  查看运行指标 / 导出 Prometheus 文本，管理员可用",
+                "",
+                "/sw perf [dump|clear]",
+                "  查看最近轮询中最慢的轮次与阶段 / 导出 JSONL，管理员可用",
+                "",
+                "/sw profile [轮数|秒数s|stop]",
+                "  剖析接下来几轮轮询或若干秒，输出热点函数，管理员可用",
+                "",
                 "/sw font",
                 "  查看字体配置",
                 "",
@@ -1327,6 +2216,10 @@ class SteamWatchPlugin(Star):
             "----------------------",
             "/sw test       测试 Steam API 连通性",
             "/sw proxytest  测试代理是否生效",
+            "/sw net status|probe  查看镜像线路/立即测速",
+            "/sw metrics [prom|reset] 运行指标(管理员)",
+            "/sw perf [dump|clear] 轮询阶段追踪(管理员)",
+            "/sw profile [轮数|秒数s|stop] 性能剖析(管理员)",
             "/sw font ...   下载/切换图片字体",
             "/sw preset     一键应用推荐图片配置(管理员)",
             "/sw style <1|2> 切换菜单风格(管理员)",
@@ -1337,200 +2230,518 @@ class SteamWatchPlugin(Star):
     # ------------------------
     async def terminate(self):
         self._stop_event.set()
-        if self._task:
-            self._task.cancel()
+        for task in (self._task, self._probe_task):
+            if task:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        if self._coalesce_task and not self._coalesce_task.done():
+            self._coalesce_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
-                await self._task
+                await self._coalesce_task
+        if self._send_workers or self._coalesce_pending:
+            # 给队列中的通知一点时间发完，剩余的计为丢弃
+            await self._flush_send_queue(SEND_SHUTDOWN_GRACE_SEC)
+            pending = self._send_queue_depth()
+            if pending:
+                self._metrics.inc("send_dropped_total", pending, reason="shutdown")
+                logger.warning("steamwatch dropped %s queued notifications on shutdown", pending)
+            for task in self._send_workers:
+                task.cancel()
+            await asyncio.gather(*self._send_workers, return_exceptions=True)
+            self._send_workers = []
+        if self._profile_task and not self._profile_task.done():
+            self._profile_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._profile_task
+        if self._profile is not None:
+            self._profile.profiler.disable()
+            self._profile = None
         if self._font_download_task and not self._font_download_task.done():
             self._font_download_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await self._font_download_task
+        if self._resolver_cache is not None:
+            await self._resolver_cache.close()
+        if self._app_catalog is not None:
+            self._app_catalog.close()
+        if self._capture is not None:
+            self._capture.close()
 
     async def _poll_loop(self):
+        """固定频率调度：按单调时钟对齐到 poll_interval_sec 的整数倍，轮询耗时不再累加到周期上。"""
+        next_due = time.monotonic()
         while not self._stop_event.is_set():
+            started = time.monotonic()
+            self._metrics.set("poll_lag_seconds", max(0.0, started - next_due))
             try:
-                await self._poll_once()
+                await self._poll_once_guarded()
             except asyncio.CancelledError:
                 break
             except Exception:
                 logger.exception("steamwatch poll loop error")
-            interval = max(MIN_POLL_INTERVAL_SEC, int(self.config.get("poll_interval_sec", DEFAULT_POLL_INTERVAL_SEC)))
+            next_due = self._schedule_next_poll(next_due, started)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=max(0.0, next_due - time.monotonic()))
+            except asyncio.TimeoutError:
+                continue
+
+    async def _poll_once_guarded(self):
+        """看门狗：单轮超过 poll_watchdog_sec 仍未结束时取消该轮，下一轮重新开始。"""
+        timeout = self._settings().poll_watchdog_sec
+        if not timeout:
+            await self._poll_once()
+            return
+        try:
+            await asyncio.wait_for(self._poll_once(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._metrics.inc("poll_watchdog_restarts_total")
+            logger.warning("steamwatch poll cycle stuck for more than %ss, cancelled by watchdog", timeout)
+
+    def _schedule_next_poll(self, next_due: float, started: float) -> float:
+        """计算下一轮的开始时刻；本轮结束时已错过下一时刻即为超时，按 poll_overrun_policy 处理。"""
+        settings = self._settings()
+        interval = settings.poll_interval_sec
+        policy = settings.poll_overrun_policy
+        now = time.monotonic()
+        elapsed = now - started
+        next_due += interval
+        if policy == "shrink":
+            self._adjust_poll_limit(elapsed, interval)
+        elif self._poll_limit is not None:
+            self._poll_limit = None
+            self._metrics.set("poll_account_limit", 0)
+        if now <= next_due:
+            return next_due
+        self._metrics.inc("poll_overruns_total", policy=policy)
+        logger.warning(
+            "steamwatch poll cycle overran: took %.1fs, interval %ss, policy=%s", elapsed, interval, policy
+        )
+        if policy == "coalesce":
+            # 错过的所有时刻合并为立即执行的一轮，之后以当前时间为新的基准
+            return now
+        missed = int((now - next_due) // interval) + 1
+        self._metrics.inc("poll_skipped_slots_total", missed)
+        return next_due + missed * interval
+
+    def _adjust_poll_limit(self, elapsed: float, interval: int) -> None:
+        """shrink 策略：超时后按耗时比例减少每轮查询的账号数（轮流覆盖），耗时充裕时逐步恢复。"""
+        polled = self._poll_targets
+        total = self._poll_targets_total
+        if not polled or not elapsed:
+            return
+        limit = self._poll_limit
+        if elapsed > interval:
+            budget = int(polled * interval / elapsed * POLL_SHRINK_HEADROOM)
+            limit = max(STEAM_SUMMARY_BATCH_SIZE, budget // STEAM_SUMMARY_BATCH_SIZE * STEAM_SUMMARY_BATCH_SIZE)
+            if limit >= polled:
+                limit = max(STEAM_SUMMARY_BATCH_SIZE, polled - STEAM_SUMMARY_BATCH_SIZE)
+            if limit >= total:
+                # 账号数不足两批时无法再缩小
+                limit = None
+            else:
+                logger.warning("steamwatch poll shrinking to %s of %s targets per cycle", limit, total)
+        elif limit is not None and elapsed < interval / 2:
+            limit *= 2
+            if limit >= total:
+                limit = None
+        self._poll_limit = limit
+        self._metrics.set("poll_account_limit", limit or 0)
+
+    async def _mirror_probe_loop(self):
+        while not self._stop_event.is_set():
+            interval = self._settings().mirror_probe_interval_sec
+            try:
+                # 只有配置了镜像（候选多于一个）的主机类才需要后台测速
+                classes = [name for name in STEAM_HOSTS if len(self._get_mirror_set(name).bases) > 1]
+                if interval and classes:
+                    await self._probe_mirrors(classes)
+                if interval and self._get_proxy_pool().proxies:
+                    await self._probe_proxies()
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                logger.exception("steamwatch mirror probe error")
             try:
-                await asyncio.wait_for(self._stop_event.wait(), timeout=interval)
+                await asyncio.wait_for(self._stop_event.wait(), timeout=max(interval, MIN_POLL_INTERVAL_SEC))
             except asyncio.TimeoutError:
                 continue
 
     async def _poll_once(self):
-        steamids = self._get_steamids()
+        started = time.perf_counter()
+        capture = self._get_capture()
+        if capture is not None:
+            self._capture_seq += 1
+            self._write_capture({"kind": "cycle", "t": time.time(), "seq": self._capture_seq})
+        root = _Span("poll") if self._settings().perf_trace_cycles else None
+        token = _TRACE_SPAN.set(root)
+        profile = self._profile if self._profile is not None and self._profile.mode == "cycles" else None
+        if profile is not None:
+            try:
+                profile.profiler.enable()
+            except ValueError:
+                logger.warning("steamwatch profiler could not be enabled; another profiler is active")
+                self._profile = profile = None
+        try:
+            await self._poll_cycle()
+        finally:
+            _TRACE_SPAN.reset(token)
+            if profile is not None:
+                profile.profiler.disable()
+                profile.remaining -= 1
+                if profile.remaining <= 0 and self._profile is profile:
+                    await self._finish_profile()
+            self._metrics.observe("poll_cycle_seconds", time.perf_counter() - started)
+            if root is not None:
+                root.finish()
+                self._record_trace(root)
+            if self._settings().metrics_file:
+                self._update_send_queue_gauges()
+                self._dump_metrics()
+            if capture is not None:
+                capture.flush()
+
+    def _get_capture(self) -> Optional["_CaptureWriter"]:
+        target = self._settings().capture_file
+        path = Path(target).expanduser() if target else None
+        if self._capture is not None and self._capture.path != path:
+            self._capture.close()
+            self._capture = None
+        if path is not None and self._capture is None:
+            self._capture = _CaptureWriter(path)
+        return self._capture
+
+    def _write_capture(self, record: dict) -> None:
+        capture = self._get_capture()
+        if capture is None:
+            return
+        try:
+            capture.write(record)
+        except OSError:
+            logger.exception("steamwatch capture write failed: %s", capture.path)
+            capture.close()
+
+    async def _poll_cycle(self):
+        self._refresh_settings()
+        steamids = list(self._get_pool_index())
+        self._poll_targets_total = len(steamids)
+        self._metrics.set("poll_targets_total", len(steamids))
+        limit = self._poll_limit
+        if limit and len(steamids) > limit:
+            # 轮流覆盖：每轮从上次结束的位置继续取 limit 个账号
+            start = self._poll_cursor % len(steamids)
+            steamids = (steamids[start:] + steamids[:start])[:limit]
+            self._poll_cursor = start + limit
+        self._poll_targets = len(steamids)
+        self._metrics.set("poll_targets", len(steamids))
+        _trace_annotate(targets=len(steamids))
         if not steamids:
             return
-        api_key = self.config.get("steam_web_api_key", "")
+        api_key = self._settings().steam_web_api_key
         if not api_key:
             logger.warning("steam_web_api_key not configured")
             return
-        summaries = await self._fetch_player_summaries(api_key, steamids)
+        with _trace_span("fetch_summaries"):
+            summaries = await self._fetch_player_summaries(api_key, steamids)
         if summaries is None:
             return
-        notify_on_stop = bool(self.config.get("notify_on_stop", False))
-        for steamid in steamids:
-            try:
-                player = summaries.get(steamid)
-                if not player:
-                    continue
-                playing = "gameid" in player or "gameextrainfo" in player
-                game_name = player.get("gameextrainfo")
-                appid = _safe_int(player.get("gameid"))
-                display_name = await self._get_localized_game_name(appid, game_name or "某个游戏")
-                if steamid not in self._last_state:
-                    self._last_state[steamid] = (playing, game_name, str(appid) if appid is not None else None)
-                    if playing:
+        track_achievements = self._settings().achievement_tracking
+        achievement_due: List[Tuple[str, int]] = []
+        with _trace_span("diff"):
+            for steamid in steamids:
+                try:
+                    player = summaries.get(steamid)
+                    if not player:
+                        continue
+                    playing = "gameid" in player or "gameextrainfo" in player
+                    game_name = player.get("gameextrainfo")
+                    appid = _safe_int(player.get("gameid"))
+                    display_name = await self._get_localized_game_name(appid, game_name or "某个游戏")
+                    if steamid not in self._last_state:
+                        self._last_state[steamid] = (playing, game_name, str(appid) if appid is not None else None)
+                        if playing:
+                            self._session_start[steamid] = time.time()
+                        continue
+                    last_playing, last_game, last_appid = self._last_state[steamid]
+                    current_appid = str(appid) if appid is not None else None
+                    pending = self._pending_stops.pop(steamid, None) if playing else None
+                    if pending is not None:
+                        if current_appid == last_appid:
+                            # 退出后很快重开同一游戏：视为同一会话继续，停止与开始提醒都不发
+                            self._metrics.inc("transitions_suppressed_total", kind="restart")
+                        else:
+                            # 换了游戏：先结算上一局，再按新开局处理
+                            await self._announce_stop(api_key, steamid, player, last_game, last_appid, pending.since)
+                            last_playing = False
+                    if playing and not last_playing:
                         self._session_start[steamid] = time.time()
-                    continue
-                last_playing, last_game, last_appid = self._last_state[steamid]
-                if playing and not last_playing:
-                    self._session_start[steamid] = time.time()
-                    await self._notify_by_steamid(
-                        steamid,
-                        f"{player.get('personaname', steamid)} 正在玩 {display_name}！",
-                        appid=appid,
-                        avatar_url=str(player.get("avatarfull", "")),
-                        is_playing=True,
-                    )
-                elif notify_on_stop and last_playing and not playing:
-                    duration_min = self._consume_session_minutes(steamid)
-                    taunt = _playtime_taunt(duration_min)
-                    last_appid_int = _safe_int(last_appid)
-                    last_display = await self._get_localized_game_name(last_appid_int, last_game or "某个游戏")
-                    await self._notify_by_steamid(
-                        steamid,
-                        (
-                            f"{player.get('personaname', steamid)} 已停止游戏 {last_display}。"
-                            f"本次游玩 {duration_min} 分钟。\n"
-                            f"评价：{taunt}"
-                        ),
-                        appid=last_appid_int,
-                        avatar_url=str(player.get("avatarfull", "")),
-                        is_playing=False,
-                    )
-                self._last_state[steamid] = (playing, game_name, str(appid) if appid is not None else None)
-            except Exception:
-                logger.exception("steamwatch poll target failed: steamid=%s", steamid)
+                        if track_achievements:
+                            self._begin_achievement_session(steamid, appid)
+                        await self._announce_start(steamid, player, appid, display_name)
+                    elif last_playing and not playing:
+                        pending = self._pending_stops.setdefault(steamid, _PendingStop(time.time()))
+                        pending.cycles += 1
+                        if not self._stop_confirmed(pending):
+                            # 确认前保留游戏中状态，下一轮继续比对
+                            continue
+                        del self._pending_stops[steamid]
+                        await self._announce_stop(api_key, steamid, player, last_game, last_appid, pending.since)
+                    self._last_state[steamid] = (playing, game_name, current_appid)
+                    if track_achievements and playing and appid is not None:
+                        if self._achievement_refresh_due(steamid, appid):
+                            achievement_due.append((steamid, appid))
+                except Exception:
+                    logger.exception("steamwatch poll target failed: steamid=%s", steamid)
+        self._metrics.set("pending_stops", len(self._pending_stops))
+        await self._refresh_playing_achievements(api_key, achievement_due)
+
+    def _stop_confirmed(self, pending: "_PendingStop") -> bool:
+        """停止状态连续出现 stop_confirm_cycles 轮，或持续 stop_confirm_sec 秒后才算真正结束。"""
+        settings = self._settings()
+        if pending.cycles >= settings.stop_confirm_cycles:
+            return True
+        return bool(settings.stop_confirm_sec) and time.time() - pending.since >= settings.stop_confirm_sec
+
+    async def _announce_start(self, steamid: str, player: dict, appid: Optional[int], display_name: str) -> None:
+        with _trace_span("transition", steamid=steamid, kind="start", appid=appid):
+            await self._notify_by_steamid(
+                steamid,
+                f"{player.get('personaname', steamid)} 正在玩 {display_name}！",
+                appid=appid,
+                avatar_url=str(player.get("avatarfull", "")),
+                is_playing=True,
+            )
+
+    async def _announce_stop(
+        self,
+        api_key: str,
+        steamid: str,
+        player: dict,
+        last_game: Optional[str],
+        last_appid: Optional[str],
+        ended_at: float,
+    ) -> None:
+        settings = self._settings()
+        last_appid_int = _safe_int(last_appid)
+        # 会话结束后时长已变化，下次查询时重新拉取游戏库；不公开的游戏库没有时长可更新，保留标记
+        owned = self._owned_games.get(steamid)
+        if owned is not None and not owned.private:
+            self._owned_games.pop(steamid, None)
+        if not settings.notify_on_stop or not settings.achievement_tracking:
+            self._achievement_baseline.pop(steamid, None)
+        try:
+            if not settings.notify_on_stop:
+                self._session_start.pop(steamid, None)
+                return
+            with _trace_span("transition", steamid=steamid, kind="stop", appid=last_appid_int):
+                duration_min = self._consume_session_minutes(steamid, ended_at)
+                taunt = _playtime_taunt(duration_min)
+                last_display = await self._get_localized_game_name(last_appid_int, last_game or "某个游戏")
+                achv_line = ""
+                if settings.achievement_tracking:
+                    unlocked = await self._consume_session_achievements(api_key, steamid, last_appid_int)
+                    if unlocked:
+                        achv_line = f"本次解锁 {unlocked} 个成就。\n"
+                await self._notify_by_steamid(
+                    steamid,
+                    (
+                        f"{player.get('personaname', steamid)} 已停止游戏 {last_display}。"
+                        f"本次游玩 {duration_min} 分钟。\n"
+                        f"{achv_line}"
+                        f"评价：{taunt}"
+                    ),
+                    appid=last_appid_int,
+                    avatar_url=str(player.get("avatarfull", "")),
+                    is_playing=False,
+                )
+        finally:
+            # 本局成就已结算；清掉后缓存中该游戏的状态必然取自本局之后，可直接作为下一局的基线
+            self._achievements.pop((steamid, last_appid_int), None)
 
-    async def _fetch_player_summaries(self, api_key: str, steamids: List[str]):
-        url = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
+    async def _fetch_player_summaries(self, api_key: str, steamids: List[str], deadline: Optional[float] = None):
+        """批量获取玩家摘要；deadline 为单调时钟时刻，默认一个轮询周期后。全部批次失败时返回 None。"""
+        url = "/ISteamUser/GetPlayerSummaries/v0002/"
         summaries: Dict[str, dict] = {}
-        timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
-        retries = int(self.config.get("request_retries", DEFAULT_REQUEST_RETRIES))
-        retry_delay = float(self.config.get("request_retry_delay_sec", DEFAULT_REQUEST_RETRY_DELAY_SEC))
-        debug_log = bool(self.config.get("debug_log", False))
+        settings = self._settings()
+        timeout_sec = settings.request_timeout_sec
+        retries = settings.request_retries
+        retry_delay = settings.request_retry_delay_sec
+        debug_log = settings.debug_log
         any_success = False
+        batches = 0
+        # 重试 × 镜像 × 超时会把单批的最坏耗时放大很多倍；整次调用有总时限，超时后跳过剩余批次
+        for_poll = deadline is None
+        if deadline is None:
+            deadline = time.monotonic() + settings.poll_interval_sec
+        chunks = list(_chunk_list(steamids, STEAM_SUMMARY_BATCH_SIZE))
         async with self._create_http_client(timeout_sec) as client:
-            for chunk in _chunk_list(steamids, STEAM_SUMMARY_BATCH_SIZE):
-                params = {
-                    "key": api_key,
-                    "steamids": ",".join(chunk),
-                }
-                if debug_log:
-                    logger.info(
-                        "steamwatch request: url=%s steamids=%s timeout=%s retries=%s proxy=%s",
-                        url,
-                        params["steamids"],
-                        timeout_sec,
-                        retries,
-                        self._get_proxy_url() or "none",
+            for index, chunk in enumerate(chunks):
+                if time.monotonic() >= deadline:
+                    if for_poll:
+                        self._metrics.inc("poll_deadline_exceeded_total")
+                    logger.warning(
+                        "steamwatch player summaries deadline reached, skipped %s of %s batches",
+                        len(chunks) - index,
+                        len(chunks),
                     )
-                resp = None
-                for attempt in range(retries + 1):
-                    try:
-                        resp = await client.get(url, params=params)
-                        resp.raise_for_status()
-                        any_success = True
-                        break
-                    except httpx.HTTPError as exc:
-                        if attempt >= retries:
-                            logger.warning(
-                                "steamwatch request failed after %s retries: %s: %r",
-                                retries,
-                                exc.__class__.__name__,
-                                exc,
-                            )
-                            resp = None
+                    break
+                batches += 1
+                self._metrics.set("poll_batches", batches)
+                with _trace_span("chunk", size=len(chunk)):
+                    params = {
+                        "key": api_key,
+                        "steamids": ",".join(chunk),
+                    }
+                    if debug_log:
+                        logger.info(
+                            "steamwatch request: url=%s steamids=%s timeout=%s retries=%s proxies=%s",
+                            url,
+                            params["steamids"],
+                            timeout_sec,
+                            retries,
+                            self._describe_proxies(),
+                        )
+                    resp = None
+                    for attempt in range(retries + 1):
+                        remaining = deadline - time.monotonic()
+                        try:
+                            if remaining <= 0:
+                                raise httpx.TimeoutException("player summaries deadline exceeded")
+                            try:
+                                resp = await asyncio.wait_for(
+                                    self._steam_get("api", url, client, params=params), remaining
+                                )
+                            except asyncio.TimeoutError:
+                                raise httpx.TimeoutException("player summaries deadline exceeded") from None
+                            resp.raise_for_status()
+                            any_success = True
                             break
-                        if debug_log:
-                            logger.info(
-                                "steamwatch retry %s/%s after error: %s: %r",
-                                attempt + 1,
-                                retries,
-                                exc.__class__.__name__,
-                                exc,
-                            )
-                        await asyncio.sleep(retry_delay)
-                if resp is None:
-                    continue
-                if debug_log:
-                    logger.info("steamwatch response status=%s", resp.status_code)
-                try:
-                    data = resp.json()
-                except ValueError as exc:
-                    logger.warning("steamwatch response json decode failed: %r", exc)
-                    continue
-                players = data.get("response", {}).get("players", [])
-                if debug_log:
-                    logger.info("steamwatch players=%s", len(players))
-                for player in players:
-                    sid = player.get("steamid")
-                    if sid:
-                        summaries[sid] = player
+                        except httpx.HTTPError as exc:
+                            if attempt >= retries or time.monotonic() >= deadline:
+                                logger.warning(
+                                    "steamwatch request failed after %s retries: %s: %r",
+                                    retries,
+                                    exc.__class__.__name__,
+                                    exc,
+                                )
+                                resp = None
+                                break
+                            self._metrics.inc("http_retries_total", endpoint=url)
+                            if debug_log:
+                                logger.info(
+                                    "steamwatch retry %s/%s after error: %s: %r",
+                                    attempt + 1,
+                                    retries,
+                                    exc.__class__.__name__,
+                                    exc,
+                                )
+                            await asyncio.sleep(min(retry_delay, max(0.0, deadline - time.monotonic())))
+                    _trace_annotate(attempts=attempt + 1, ok=resp is not None)
+                    if resp is None:
+                        continue
+                    if debug_log:
+                        logger.info("steamwatch response status=%s", resp.status_code)
+                    try:
+                        data = resp.json()
+                    except ValueError as exc:
+                        logger.warning("steamwatch response json decode failed: %r", exc)
+                        continue
+                    players = data.get("response", {}).get("players", [])
+                    if debug_log:
+                        logger.info("steamwatch players=%s", len(players))
+                    for player in players:
+                        sid = player.get("steamid")
+                        if sid:
+                            summaries[sid] = player
         if not any_success:
             return None
         return summaries
 
     async def _fetch_game_playtime(self, api_key: str, steamid: str, appid: int) -> Optional[int]:
-        url = "https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+        library = await self._get_owned_library(api_key, steamid)
+        if library is None:
+            return None
+        minutes = library.minutes_for(int(appid))
+        if minutes is None:
+            return None
+        return minutes // 60
+
+    async def _get_owned_library(self, api_key: str, steamid: str) -> Optional["_OwnedLibrary"]:
+        """整库缓存：一次 GetOwnedGames 覆盖该账号所有游戏的时长查询；游戏库不公开时返回 None。"""
+        library = self._owned_games.get(steamid)
+        hit = library is not None and time.time() - library.fetched_at < OWNED_GAMES_CACHE_TTL_SEC
+        self._count_cache("owned_games", hit)
+        if not hit:
+            library = await self._singleflight(
+                f"owned:{steamid}", lambda: self._fetch_owned_library(api_key, steamid)
+            )
+        if library is None or library.private:
+            return None
+        return library
+
+    async def _fetch_owned_library(self, api_key: str, steamid: str) -> Optional["_OwnedLibrary"]:
         params = {
             "key": api_key,
             "steamid": steamid,
-            "include_appinfo": 0,
+            "include_appinfo": 1,
             "include_played_free_games": 1,
-            "appids_filter[0]": appid,
         }
         try:
-            async with self._create_http_client(DEFAULT_REQUEST_TIMEOUT_SEC) as client:
-                resp = await client.get(url, params=params)
+            async with self._client_scope() as http:
+                resp = await self._steam_get("api", "/IPlayerService/GetOwnedGames/v0001/", http, params=params)
                 resp.raise_for_status()
                 data = resp.json()
         except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
-            if bool(self.config.get("debug_log", False)):
-                logger.info("steamwatch fetch playtime failed: %s", self._format_net_error(exc))
-            return None
-        games = data.get("response", {}).get("games", [])
-        if not games:
-            return None
-        minutes = games[0].get("playtime_forever", 0)
-        return max(0, int(minutes // 60))
-
-    async def _get_localized_game_name(self, appid: Optional[int], fallback: str) -> str:
+            if self._settings().debug_log:
+                logger.info("steamwatch fetch owned games failed: %s", self._format_net_error(exc))
+            return self._owned_games.get(steamid)
+        response = data.get("response", {})
+        # 游戏库不公开时返回空 response；同样缓存一个空库标记，TTL 内不再重复请求
+        library = _OwnedLibrary(response.get("games", []), private="games" not in response)
+        self._owned_games[steamid] = library
+        if len(self._owned_games) > OWNED_GAMES_CACHE_MAX_USERS:
+            oldest = min(self._owned_games, key=lambda sid: self._owned_games[sid].fetched_at)
+            self._owned_games.pop(oldest, None)
+        return library
+
+    async def _get_localized_game_name(
+        self, appid: Optional[int], fallback: str, client: Optional[httpx.AsyncClient] = None
+    ) -> str:
         if not appid:
             return fallback
-        if not bool(self.config.get("use_localized_game_name", False)):
-            return fallback
-        lang = str(self.config.get("game_name_language", "schinese")).strip() or "schinese"
-        ttl = int(self.config.get("game_name_cache_ttl_sec", 86400))
+        settings = self._settings()
+        lang = settings.game_name_language
+        ttl = settings.game_name_cache_ttl_sec
         now = time.time()
-        cache_key = f"{appid}:{lang}"
+        # 是否查询商店计入缓存键：切换该选项后不再沿用切换前缓存的结果
+        cache_key = f"{appid}:{lang}:{int(settings.use_localized_game_name)}"
         cached = self._app_name_cache.get(cache_key)
         if cached and now - cached[1] < ttl:
-            return cached[0]
-        url = "https://store.steampowered.com/api/appdetails"
+            self._count_cache("game_name", True)
+            # 空名称是未命中标记：目录和商店都没有该游戏，直接用调用方的回退名
+            return cached[0] or fallback
+        # 本地目录优先，未开启商店查询时也会使用；SQLite 查询放到线程里，避免在轮询比对中阻塞事件循环
+        catalog = self._get_app_catalog()
+        name = None
+        if catalog.available:
+            name = await asyncio.to_thread(catalog.lookup, appid, lang)
+            self._count_cache("app_catalog", bool(name))
+        if name:
+            self._app_name_cache[cache_key] = (name, now)
+            return name
+        if not settings.use_localized_game_name:
+            self._app_name_cache[cache_key] = ("", now)
+            return fallback
+        self._count_cache("game_name", False)
         params = {"appids": str(appid), "l": lang}
-        timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
         try:
-            async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
+            with _trace_span("localize", appid=appid):
+                async with self._client_scope(client, follow_redirects=True) as http:
+                    resp = await self._steam_get("store", "/api/appdetails", http, params=params)
+                    resp.raise_for_status()
+                    data = resp.json()
         except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
-            if bool(self.config.get("debug_log", False)):
+            if self._settings().debug_log:
                 logger.info("steamwatch fetch localized game name failed: %s", self._format_net_error(exc))
             return fallback
         item = data.get(str(appid), {})
@@ -1540,27 +2751,106 @@ class SteamWatchPlugin(Star):
             if isinstance(name, str) and name.strip():
                 self._app_name_cache[cache_key] = (name.strip(), now)
                 return name.strip()
+        self._app_name_cache[cache_key] = ("", now)
         return fallback
 
     async def _fetch_achievements(self, api_key: str, steamid: str, appid: int) -> Optional[str]:
-        url = "https://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v0001/"
+        state = self._achievements.get((steamid, int(appid)))
+        stale = state is None or time.time() - state.fetched_at >= ACHIEVEMENT_CACHE_TTL_SEC
+        self._count_cache("achievements", not stale)
+        if stale:
+            state = await self._refresh_achievement_state(api_key, steamid, int(appid))
+        if state is None or not state.total:
+            return None
+        return f"{state.achieved}/{state.total}"
+
+    async def _refresh_achievement_state(self, api_key: str, steamid: str, appid: int) -> Optional["_AchievementState"]:
+        return await self._singleflight(
+            f"achv:{steamid}:{appid}", lambda: self._fetch_achievement_state(api_key, steamid, appid)
+        )
+
+    async def _fetch_achievement_state(self, api_key: str, steamid: str, appid: int) -> Optional["_AchievementState"]:
+        """由 _refresh_achievement_state 经 single-flight 调用，请求自带 client。"""
         params = {"key": api_key, "steamid": steamid, "appid": appid}
         try:
-            async with self._create_http_client(DEFAULT_REQUEST_TIMEOUT_SEC) as client:
-                resp = await client.get(url, params=params)
+            async with self._client_scope() as http:
+                resp = await self._steam_get("api", "/ISteamUserStats/GetPlayerAchievements/v0001/", http, params=params)
                 resp.raise_for_status()
                 data = resp.json()
         except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPError, ValueError) as exc:
-            if bool(self.config.get("debug_log", False)):
+            if self._settings().debug_log:
                 logger.info("steamwatch fetch achievements failed: %s", self._format_net_error(exc))
-            return None
-        playerstats = data.get("playerstats", {})
-        achievements = playerstats.get("achievements", [])
+            return self._achievements.get((steamid, appid))
+        achievements = data.get("playerstats", {}).get("achievements", [])
         if not achievements:
             return None
-        total = len(achievements)
-        achieved = sum(1 for a in achievements if a.get("achieved") == 1)
-        return f"{achieved}/{total}"
+        names = tuple(str(a.get("apiname", idx)) for idx, a in enumerate(achievements))
+        # 同一游戏的成就名列表在所有账号间共享一份（LRU，只保留最近用到的游戏）
+        shared = self._achievement_schemas.pop(appid, None)
+        if shared == names:
+            names = shared
+        self._achievement_schemas[appid] = names
+        while len(self._achievement_schemas) > ACHIEVEMENT_SCHEMA_CACHE_SIZE:
+            self._achievement_schemas.pop(next(iter(self._achievement_schemas)))
+        bits = 0
+        for idx, achievement in enumerate(achievements):
+            if achievement.get("achieved") == 1:
+                bits |= 1 << idx
+        state = _AchievementState(names, bits)
+        self._store_achievement_state((steamid, appid), state)
+        baseline = self._achievement_baseline.get(steamid)
+        if baseline is None or baseline[0] != appid:
+            if self._last_state.get(steamid, (False, None, None))[2] == str(appid):
+                self._achievement_baseline[steamid] = (appid, state)
+        return state
+
+    async def _refresh_playing_achievements(self, api_key: str, targets: List[Tuple[str, int]]) -> None:
+        """仅刷新正在玩对应游戏的账号的成就状态，用于会话结束时计算新解锁数量。"""
+        if not targets:
+            return
+        semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+        async def refresh(steamid: str, appid: int) -> None:
+            async with semaphore:
+                await self._refresh_achievement_state(api_key, steamid, appid)
+
+        with _trace_span("achievements", targets=len(targets)):
+            await asyncio.gather(*(refresh(sid, appid) for sid, appid in targets), return_exceptions=True)
+
+    def _begin_achievement_session(self, steamid: str, appid: Optional[int]) -> None:
+        """开局时若缓存里已有该游戏的成就状态（例如来自 /sw info），直接作为本局基线。
+
+        上一局结束时会清掉对应状态，所以此时缓存里的状态必然取自上一局之后，不会把上一局的解锁算进来。
+        """
+        self._achievement_baseline.pop(steamid, None)
+        state = self._achievements.get((steamid, appid)) if appid is not None else None
+        if state is not None:
+            self._achievement_baseline[steamid] = (appid, state)
+
+    def _store_achievement_state(self, key: Tuple[str, int], state: "_AchievementState") -> None:
+        # 按最近写入淘汰，避免见过的每个 (账号, 游戏) 都常驻内存
+        self._achievements.pop(key, None)
+        self._achievements[key] = state
+        while len(self._achievements) > ACHIEVEMENT_CACHE_MAX_ENTRIES:
+            self._achievements.pop(next(iter(self._achievements)))
+
+    def _achievement_refresh_due(self, steamid: str, appid: int) -> bool:
+        state = self._achievements.get((steamid, appid))
+        if state is None:
+            return True
+        return time.time() - state.fetched_at >= self._settings().achievement_refresh_sec
+
+    async def _consume_session_achievements(self, api_key: str, steamid: str, appid: Optional[int]) -> Optional[int]:
+        baseline = self._achievement_baseline.get(steamid)
+        if appid is None or baseline is None or baseline[0] != appid:
+            self._achievement_baseline.pop(steamid, None)
+            return None
+        state = await self._refresh_achievement_state(api_key, steamid, appid)
+        # 此时 _last_state 仍是游戏中状态，抓取会写回基线，因此在抓取之后再清除
+        self._achievement_baseline.pop(steamid, None)
+        if state is None:
+            return None
+        return state.unlocked_since(baseline[1])
 
     async def _notify(
         self,
@@ -1591,7 +2881,7 @@ class SteamWatchPlugin(Star):
     ):
         if self._group_enabled():
             notify_groups = self._get_notify_groups()
-            steamid_groups = self._get_steamid_groups()
+            steamid_groups = self._get_steamid_group_index()
             fanout_targets: List[str] = []
             for group in steamid_groups.get(steamid, []):
                 for target in notify_groups.get(group, []):
@@ -1617,18 +2907,161 @@ class SteamWatchPlugin(Star):
         avatar_url: str = "",
         is_playing: bool = False,
     ):
+        notice = _Notice(text, appid, avatar_url, is_playing)
+        window = self._settings().send_coalesce_sec
+        if window:
+            # 合并窗口内发往同一会话的通知，窗口结束后合成一条再出图入队
+            with _trace_span("coalesce", targets=len(targets)):
+                for target in targets:
+                    self._coalesce_pending.setdefault(target, []).append(notice)
+            if self._coalesce_task is None or self._coalesce_task.done():
+                self._coalesce_task = asyncio.create_task(self._coalesce_timer(window))
+            return
+        await self._render_and_enqueue(notice, targets)
+
+    async def _render_and_enqueue(self, notice: "_Notice", targets: List[str]) -> None:
         message = await self._build_message_chain_for_text(
-            text,
-            appid=appid,
-            avatar_url=avatar_url,
-            is_playing=is_playing,
+            notice.text,
+            appid=notice.appid,
+            avatar_url=notice.avatar_url,
+            is_playing=notice.is_playing,
             for_notify=True,
         )
-        for target in targets:
+        with _trace_span("enqueue", targets=len(targets)):
+            for target in targets:
+                await self._enqueue_send(target, message)
+
+    async def _coalesce_timer(self, delay: float) -> None:
+        # 任务继承了创建时所在轮询的追踪上下文；合并出图发生在该轮结束之后，不再计入它
+        _TRACE_SPAN.set(None)
+        await asyncio.sleep(delay)
+        # 先让出任务槽位：合并出图期间产生的新通知会开启下一个窗口
+        self._coalesce_task = None
+        try:
+            await self._flush_coalesced()
+        except Exception:
+            logger.exception("steamwatch coalesced notify failed")
+
+    async def _flush_coalesced(self) -> None:
+        pending, self._coalesce_pending = self._coalesce_pending, {}
+        if not pending:
+            return
+        # 收到相同通知组合的会话共用一次出图
+        groups: Dict[Tuple[_Notice, ...], List[str]] = {}
+        for target, notices in pending.items():
+            for start in range(0, len(notices), SEND_COALESCE_MAX_ITEMS):
+                groups.setdefault(tuple(notices[start : start + SEND_COALESCE_MAX_ITEMS]), []).append(target)
+        for notices, targets in groups.items():
+            if len(notices) > 1:
+                self._metrics.inc("send_coalesced_total", (len(notices) - 1) * len(targets))
             try:
-                await self.context.send_message(target, message)
+                await self._render_and_enqueue(_merge_notices(notices), targets)
             except Exception:
-                logger.exception("Failed to send steamwatch notification")
+                logger.exception("steamwatch coalesced notify failed")
+
+    def _ensure_send_workers(self) -> List["_SendShard"]:
+        """首次发送时按当前配置创建分片队列与发送协程（数量与容量修改后需重载插件生效）。"""
+        if not self._send_shards:
+            settings = self._settings()
+            workers = settings.send_workers
+            capacity = max(1, settings.send_queue_size // workers)
+            self._send_shards = [_SendShard(capacity) for _ in range(workers)]
+            self._send_workers = [asyncio.create_task(self._send_worker(shard)) for shard in self._send_shards]
+        return self._send_shards
+
+    async def _enqueue_send(self, target: str, message) -> None:
+        shards = self._ensure_send_workers()
+        # 同一会话固定落在同一分片，保证通知按产生顺序送达
+        shard = shards[zlib.crc32(target.encode("utf-8")) % len(shards)]
+        settings = self._settings()
+        dropped = await shard.put(
+            _OutboundMessage(target, message, time.monotonic(), _TRACE_SPAN.get()),
+            settings.send_queue_policy,
+            settings.send_timeout_sec,
+        )
+        if len(shard):
+            self._send_idle.clear()
+        if dropped:
+            self._metrics.inc("send_dropped_total", reason=dropped)
+            now = time.monotonic()
+            if now - self._send_drop_warned_at >= 60:
+                # 队列持续满载时每分钟只提示一次，具体数量见 send_dropped_total
+                self._send_drop_warned_at = now
+                logger.warning(
+                    "steamwatch send queue full (policy=%s), dropping %s messages", settings.send_queue_policy, dropped
+                )
+        self._update_send_queue_gauges()
+
+    async def _send_worker(self, shard: "_SendShard") -> None:
+        while True:
+            item, delayed = await shard.get(self._send_delay)
+            self._sends_in_flight += 1
+            try:
+                if delayed:
+                    self._metrics.inc("send_delayed_total", platform=_target_platform(item.target))
+                self._send_bucket(item.target).take(time.monotonic())
+                self._metrics.observe("send_queue_wait_seconds", time.monotonic() - item.enqueued_at)
+                self._update_send_queue_gauges()
+                token = _TRACE_SPAN.set(item.span)
+                try:
+                    with _trace_span("send", target=item.target):
+                        await self._deliver(item.target, item.message)
+                finally:
+                    _TRACE_SPAN.reset(token)
+            except Exception:
+                logger.exception("steamwatch send worker error")
+            finally:
+                self._sends_in_flight -= 1
+                if not self._sends_in_flight and not self._send_queue_depth():
+                    self._send_idle.set()
+
+    async def _deliver(self, target: str, message) -> None:
+        timeout = self._settings().send_timeout_sec
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.context.send_message(target, message), timeout=timeout or None)
+            self._metrics.inc("sends_total", result="ok")
+        except asyncio.TimeoutError:
+            self._metrics.inc("sends_total", result="timeout")
+            logger.warning("steamwatch notification to %s timed out after %ss", target, timeout)
+        except Exception:
+            self._metrics.inc("sends_total", result="error")
+            logger.exception("Failed to send steamwatch notification")
+        finally:
+            self._metrics.observe("send_seconds", time.perf_counter() - started, target=target)
+
+    def _send_bucket(self, target: str) -> "_TokenBucket":
+        platform = _target_platform(target)
+        limits = dict(self._settings().send_rate_limits)
+        rate, burst = limits.get(platform) or limits.get("*") or (0.0, 0)
+        bucket = self._send_buckets.get(target)
+        if bucket is None or (bucket.rate, bucket.burst) != (rate, burst):
+            bucket = self._send_buckets[target] = _TokenBucket(rate, burst)
+        return bucket
+
+    def _send_delay(self, target: str) -> float:
+        """该会话还需等待多久才有发送配额（0 表示可以立即发送）。"""
+        return self._send_bucket(target).delay(time.monotonic())
+
+    def _send_queue_depth(self) -> int:
+        return sum(len(shard) for shard in self._send_shards)
+
+    def _update_send_queue_gauges(self) -> None:
+        now = time.monotonic()
+        self._metrics.set("send_queue_depth", self._send_queue_depth())
+        oldest = [at for at in (shard.oldest_enqueued_at() for shard in self._send_shards) if at is not None]
+        self._metrics.set("send_queue_oldest_seconds", now - min(oldest) if oldest else 0.0)
+
+    async def _flush_send_queue(self, timeout: float) -> bool:
+        """立即送出合并窗口中的通知，并等待队列清空且没有进行中的发送；超时返回 False。"""
+        await self._flush_coalesced()
+        if not self._send_queue_depth() and not self._sends_in_flight:
+            return True
+        try:
+            await asyncio.wait_for(self._send_idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
 
     async def _build_event_result(
         self,
@@ -1637,14 +3070,16 @@ class SteamWatchPlugin(Star):
         appid: Optional[int] = None,
         avatar_url: str = "",
         is_playing: bool = False,
+        deadline: Optional[float] = None,
     ):
-        if not bool(self.config.get("render_as_image", True)):
+        if not self._settings().render_as_image:
             return event.plain_result(text)
         path = await self._render_text_image(
             text=text,
             appid=appid,
             avatar_url=avatar_url,
             is_playing=is_playing,
+            deadline=deadline,
         )
         if not path:
             return event.plain_result(text)
@@ -1664,9 +3099,9 @@ class SteamWatchPlugin(Star):
         is_playing: bool = False,
         for_notify: bool = False,
     ) -> MessageChain:
-        if for_notify and not bool(self.config.get("render_image_in_notify", True)):
+        if for_notify and not self._settings().render_image_in_notify:
             return MessageChain().message(text)
-        if not bool(self.config.get("render_as_image", True)):
+        if not self._settings().render_as_image:
             return MessageChain().message(text)
         path = await self._render_text_image(
             text=text,
@@ -1678,32 +3113,69 @@ class SteamWatchPlugin(Star):
             return MessageChain().message(text)
         return MessageChain().file_image(path)
 
-    async def _render_text_image(
+    async def _render_text_image(
+        self,
+        text: str,
+        appid: Optional[int],
+        avatar_url: str,
+        is_playing: bool,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        with self._metrics.timer("render_seconds"), _trace_span("render"):
+            return await self._render_text_image_timed(text, appid, avatar_url, is_playing, deadline)
+
+    async def _render_text_image_timed(
         self,
         text: str,
         appid: Optional[int],
         avatar_url: str,
         is_playing: bool,
+        deadline: Optional[float] = None,
     ) -> Optional[str]:
+        """deadline 为单调时钟时刻；头像与背景下载超过时限时分别省略头像、改用纯色背景。"""
+        settings = self._settings()
+        timer = self._timed_stage
+        with timer("render_stage_seconds", stage="avatar"):
+            avatar = None
+            if settings.image_show_avatar:
+                avatar = await self._within_deadline(self._get_avatar_thumbnail(avatar_url), deadline)
         bg_url = self._pick_background_url(appid=appid, avatar_url=avatar_url, is_playing=is_playing)
-        image = await self._build_base_image(bg_url)
+        if avatar is not None and bg_url == avatar_url:
+            # 背景回退到头像时直接放大缓存的缩略图，不再下载原图
+            resampling = getattr(Image, "Resampling", None)
+            resize_filter = resampling.BICUBIC if resampling else Image.BICUBIC
+            image = avatar.convert("RGB").resize((settings.image_width, settings.image_height), resize_filter)
+            image = image.filter(ImageFilter.GaussianBlur(radius=max(1.0, settings.image_card_blur)))
+        else:
+            image = await self._within_deadline(self._build_base_image(bg_url), deadline)
         if image is None:
             image = Image.new("RGB", DEFAULT_IMAGE_SIZE, DEFAULT_BG_COLOR)
         image = image.convert("RGBA")
 
-        overlay_alpha = int(self.config.get("image_overlay_alpha", 120))
-        overlay = Image.new("RGBA", image.size, (0, 0, 0, max(0, min(255, overlay_alpha))))
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, settings.image_overlay_alpha))
         image.alpha_composite(overlay)
 
         font = self._load_image_font()
-        margin = int(self.config.get("image_padding", 44))
         draw = ImageDraw.Draw(image)
-        line_h = (font.getbbox("国")[3] - font.getbbox("国")[1]) + int(self.config.get("image_line_spacing", 10))
-        card_padding = int(self.config.get("image_card_padding", 28))
-        card_margin = int(self.config.get("image_card_margin", margin))
-        max_width = image.size[0] - card_margin * 2 - card_padding * 2
-        lines = self._wrap_text(draw, font, text, max_width)
+        line_h = (font.getbbox("国")[3] - font.getbbox("国")[1]) + settings.image_line_spacing
+        card_padding = settings.image_card_padding
+        card_margin = settings.image_card_margin
+        if avatar is not None:
+            # 卡片高度受画布限制时头像一起缩小，避免画出卡片底边
+            avatar_max = image.size[1] - card_margin * 2 - card_padding * 2
+            if avatar_max < 1:
+                avatar = None
+            elif avatar.size[1] > avatar_max:
+                resampling = getattr(Image, "Resampling", None)
+                resize_filter = resampling.LANCZOS if resampling else Image.LANCZOS
+                avatar = avatar.resize((avatar_max, avatar_max), resize_filter)
+        avatar_w = avatar.size[0] + card_padding if avatar is not None else 0
+        max_width = image.size[0] - card_margin * 2 - card_padding * 2 - avatar_w
+        with timer("render_stage_seconds", stage="wrap"):
+            lines = self._wrap_text(draw, font, text, max_width)
         text_height = min(len(lines), max(1, (image.size[1] - card_margin * 2) // max(1, line_h))) * line_h
+        if avatar is not None:
+            text_height = max(text_height, avatar.size[1])
         card_w = image.size[0] - card_margin * 2
         card_h = min(image.size[1] - card_margin * 2, text_height + card_padding * 2)
         card_x1 = card_margin
@@ -1712,32 +3184,91 @@ class SteamWatchPlugin(Star):
         card_y2 = card_y1 + card_h
 
         card_box = (card_x1, card_y1, card_x2, card_y2)
-        bg_crop = image.crop(card_box).filter(ImageFilter.GaussianBlur(radius=float(self.config.get("image_card_blur", 12))))
+        with timer("render_stage_seconds", stage="blur"):
+            bg_crop = image.crop(card_box).filter(ImageFilter.GaussianBlur(radius=settings.image_card_blur))
         image.paste(bg_crop, (card_x1, card_y1))
-        card_alpha = max(0, min(255, int(self.config.get("image_card_alpha", 160))))
-        card_fill = Image.new("RGBA", (card_w, card_h), (16, 20, 26, card_alpha))
+        card_fill = Image.new("RGBA", (card_w, card_h), (16, 20, 26, settings.image_card_alpha))
         image.paste(card_fill, (card_x1, card_y1), card_fill)
 
+        if avatar is not None:
+            image.alpha_composite(avatar, (card_x1 + card_padding, card_y1 + card_padding))
+
         draw = ImageDraw.Draw(image)
         y = card_y1 + card_padding
-        text_x = card_x1 + card_padding
+        text_x = card_x1 + card_padding + avatar_w
         text_max_y = card_y2 - card_padding
         for line in lines:
             if y + line_h > text_max_y:
                 break
-            draw.text((text_x, y), line, font=font, fill=str(self.config.get("image_text_color", DEFAULT_TEXT_COLOR)))
+            draw.text((text_x, y), line, font=font, fill=settings.image_text_color)
             y += line_h
 
         out_dir = Path(tempfile.gettempdir()) / "steamwatch"
         out_dir.mkdir(parents=True, exist_ok=True)
         out_path = out_dir / f"sw_{int(time.time() * 1000)}_{abs(hash(text))}.png"
-        image.convert("RGB").save(out_path, format="PNG")
+        with timer("render_stage_seconds", stage="encode"):
+            image.convert("RGB").save(out_path, format="PNG")
         return str(out_path)
 
+    async def _get_avatar_thumbnail(self, avatar_url: str) -> Optional[Image.Image]:
+        """按头像 hash 缓存缩放好的头像：内存 -> data_dir/avatars -> 下载；头像更换后 hash 变化才会重新下载。"""
+        if not avatar_url:
+            return None
+        size = self._settings().image_avatar_size
+        m = AVATAR_HASH_RE.search(avatar_url)
+        digest = m.group(1).lower() if m else hashlib.sha1(avatar_url.encode("utf-8")).hexdigest()
+        key = f"{digest}_{size}"
+        thumb = self._avatar_thumbs.pop(key, None)
+        self._count_cache("avatar", thumb is not None)
+        if thumb is None:
+            path = self._get_data_dir() / "avatars" / f"{key}.png"
+            if path.exists():
+                try:
+                    with Image.open(path) as cached:
+                        thumb = cached.convert("RGBA")
+                except OSError:
+                    thumb = None
+            if thumb is None:
+                thumb = await self._singleflight(f"avatar:{key}", lambda: self._fetch_avatar_thumbnail(avatar_url, size, path))
+            if thumb is None:
+                return None
+        # 重新插入到末尾，按插入顺序淘汰最久未用的
+        self._avatar_thumbs[key] = thumb
+        while len(self._avatar_thumbs) > AVATAR_MEMORY_CACHE_SIZE:
+            self._avatar_thumbs.pop(next(iter(self._avatar_thumbs)))
+        return thumb
+
+    async def _fetch_avatar_thumbnail(self, avatar_url: str, size: int, path: Path) -> Optional[Image.Image]:
+        try:
+            async with self._client_scope(follow_redirects=True) as client:
+                resp = await client.get(avatar_url)
+                resp.raise_for_status()
+            with Image.open(io.BytesIO(resp.content)) as raw:
+                img = raw.convert("RGBA")
+        except (httpx.HTTPError, OSError, ValueError) as exc:
+            if self._settings().debug_log:
+                logger.info("steamwatch fetch avatar failed: %s", self._format_net_error(exc))
+            return None
+        resampling = getattr(Image, "Resampling", None)
+        resize_filter = resampling.LANCZOS if resampling else Image.LANCZOS
+        thumb = img.resize((size, size), resize_filter)
+        mask = Image.new("L", (size, size), 0)
+        ImageDraw.Draw(mask).rounded_rectangle((0, 0, size - 1, size - 1), radius=max(4, size // 8), fill=255)
+        thumb.putalpha(mask)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            thumb.save(tmp_path, format="PNG")
+            tmp_path.replace(path)
+        except OSError:
+            logger.exception("steamwatch save avatar failed: %s", path)
+        return thumb
+
     def _pick_background_url(self, appid: Optional[int], avatar_url: str, is_playing: bool) -> str:
-        prefer_game = bool(self.config.get("image_prefer_game_bg", True))
-        default_bg = str(self.config.get("image_default_bg_url", DEFAULT_STEAM_BG_URL)).strip()
-        game_bg = f"https://cdn.cloudflare.steamstatic.com/steam/apps/{appid}/header.jpg" if appid else ""
+        settings = self._settings()
+        prefer_game = settings.image_prefer_game_bg
+        default_bg = self._rewrite_steam_url(settings.image_default_bg_url)
+        game_bg = self._steam_url("cdn", f"/steam/apps/{appid}/header.jpg") if appid else ""
         if prefer_game and game_bg:
             return game_bg
         if default_bg:
@@ -1747,31 +3278,35 @@ class SteamWatchPlugin(Star):
         return avatar_url
 
     async def _build_base_image(self, bg_url: str) -> Optional[Image.Image]:
-        width = int(self.config.get("image_width", DEFAULT_IMAGE_SIZE[0]))
-        height = int(self.config.get("image_height", DEFAULT_IMAGE_SIZE[1]))
+        settings = self._settings()
+        width = settings.image_width
+        height = settings.image_height
         if not bg_url:
             return Image.new("RGB", (width, height), DEFAULT_BG_COLOR)
         try:
-            timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
-            async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
-                resp = await client.get(bg_url)
-                resp.raise_for_status()
+            timeout_sec = self._settings().request_timeout_sec
+            with self._timed_stage("render_stage_seconds", stage="download"):
+                async with self._create_http_client(timeout_sec, follow_redirects=True) as client:
+                    resp = await client.get(bg_url)
+                    resp.raise_for_status()
             from io import BytesIO
 
-            img = Image.open(BytesIO(resp.content)).convert("RGB")
-            resampling = getattr(Image, "Resampling", None)
-            resize_filter = resampling.LANCZOS if resampling else Image.LANCZOS
-            return img.resize((width, height), resize_filter)
+            with self._timed_stage("render_stage_seconds", stage="resize"):
+                img = Image.open(BytesIO(resp.content)).convert("RGB")
+                resampling = getattr(Image, "Resampling", None)
+                resize_filter = resampling.LANCZOS if resampling else Image.LANCZOS
+                return img.resize((width, height), resize_filter)
         except Exception:
-            if bool(self.config.get("debug_log", False)):
+            if self._settings().debug_log:
                 logger.exception("steamwatch load background failed: %s", bg_url)
             return Image.new("RGB", (width, height), DEFAULT_BG_COLOR)
 
     async def _download_font(self, url: str, filename: str = "") -> Tuple[str, Optional[str]]:
-        timeout_sec = int(self.config.get("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC))
-        retries = int(self.config.get("request_retries", DEFAULT_REQUEST_RETRIES))
-        retry_delay = float(self.config.get("request_retry_delay_sec", DEFAULT_REQUEST_RETRY_DELAY_SEC))
-        font_dir = Path(str(self.config.get("image_font_dir", "fonts/steamwatch")).strip() or "fonts/steamwatch").expanduser()
+        settings = self._settings()
+        timeout_sec = settings.request_timeout_sec
+        retries = settings.request_retries
+        retry_delay = settings.request_retry_delay_sec
+        font_dir = Path(settings.image_font_dir).expanduser()
         font_dir.mkdir(parents=True, exist_ok=True)
         font_dir_resolved = font_dir.resolve()
         clean_name = filename.strip() if filename else ""
@@ -1804,10 +3339,11 @@ class SteamWatchPlugin(Star):
         return "", self._format_net_error(last_exc or RuntimeError("unknown font download error"))
 
     def _load_image_font(self) -> ImageFont.ImageFont:
-        font_size = int(self.config.get("image_font_size", 30))
-        font_path = str(self.config.get("image_font_path", "")).strip()
-        if not font_path and bool(self.config.get("image_auto_download_font", True)):
-            auto_path = Path(str(self.config.get("image_font_dir", "fonts/steamwatch")).strip() or "fonts/steamwatch") / "NotoSansCJKsc-VF.ttf"
+        settings = self._settings()
+        font_size = settings.image_font_size
+        font_path = settings.image_font_path
+        if not font_path and settings.image_auto_download_font:
+            auto_path = Path(settings.image_font_dir) / "NotoSansCJKsc-VF.ttf"
             if not auto_path.exists():
                 try:
                     # 不阻塞主逻辑：失败就回退系统字体
@@ -1860,11 +3396,60 @@ class SteamWatchPlugin(Star):
     # Helpers: config/bindings
     # ------------------------
     def _save_config_safe(self) -> None:
+        self._settings_cache = None
+        if self._config_txn_depth:
+            self._config_dirty = True
+            return
         try:
             self.config.save_config()
         except Exception:
             logger.exception("steamwatch save_config failed")
 
+    @contextlib.contextmanager
+    def _config_transaction(self):
+        """合并块内的多次配置写入为一次保存；块内异常时回滚配置。"""
+        snapshot = {key: copy.deepcopy(value) for key, value in self.config.items()}
+        self._config_txn_depth += 1
+        try:
+            yield
+        except Exception:
+            for key, value in snapshot.items():
+                self.config[key] = value
+            self._settings_cache = None
+            raise
+        finally:
+            self._config_txn_depth -= 1
+        if not self._config_txn_depth and self._config_dirty:
+            self._config_dirty = False
+            self._save_config_safe()
+
+    def _settings(self) -> "_Settings":
+        """当前配置的只读快照；热路径直接读属性，不再逐项 get + 类型转换。"""
+        settings = self._settings_cache
+        if settings is None:
+            settings = self._refresh_settings(force=True)
+        return settings
+
+    def _refresh_settings(self, force: bool = False) -> "_Settings":
+        """配置有变化时重建快照并递增 version（缓存可用它作失效键）。"""
+        fingerprint = _settings_fingerprint(self.config)
+        settings = self._settings_cache
+        if settings is not None and not force and fingerprint == self._settings_fingerprint:
+            return settings
+        if fingerprint != self._settings_fingerprint:
+            self._settings_version += 1
+        settings, problems = _build_settings(self.config, self._settings_version)
+        for problem in problems:
+            logger.warning("steamwatch config invalid: %s", problem)
+        self._settings_cache = settings
+        self._settings_fingerprint = fingerprint
+        return settings
+
+    def _get_data_dir(self) -> Path:
+        path = Path(self._settings().data_dir).expanduser()
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
     def _format_net_error(self, exc: Exception) -> str:
         detail = str(exc).strip()
         if not detail:
@@ -1874,11 +3459,7 @@ class SteamWatchPlugin(Star):
         return f"{exc.__class__.__name__}: {detail}"
 
     def _get_menu_style(self) -> int:
-        try:
-            style = int(self.config.get("menu_style", 1))
-        except Exception:
-            return 1
-        return style if style in {1, 2} else 1
+        return self._settings().menu_style
 
     def _normalize_message_type(self, value: str) -> str:
         text = (value or "").strip()
@@ -1907,10 +3488,9 @@ class SteamWatchPlugin(Star):
     def _normalize_target(self, target: str) -> Optional[str]:
         if not target:
             return None
-        default_platform = str(self.config.get("default_platform_id", "aiocqhttp")).strip()
-        default_msg_type = self._normalize_message_type(
-            str(self.config.get("default_message_type", "GroupMessage")).strip()
-        )
+        settings = self._settings()
+        default_platform = settings.default_platform_id
+        default_msg_type = self._normalize_message_type(settings.default_message_type)
         parts = target.split(":", 2)
         if len(parts) == 1:
             normalized = f"{default_platform}:{default_msg_type}:{parts[0]}"
@@ -1978,8 +3558,38 @@ class SteamWatchPlugin(Star):
 
     def _set_steamids(self, steamids: List[str]):
         self.config["steamids"] = steamids
+        self._bump_index_version("steamids")
         self._save_config_safe()
 
+    def _bump_index_version(self, key: str) -> int:
+        version = self._index_versions.get(key, 0) + 1
+        self._index_versions[key] = version
+        return version
+
+    def _get_pool_index(self) -> Dict[str, None]:
+        """监控号池的有序集合视图（dict 保序），仅在配置列表被替换或经 _set_steamids 修改后重建。"""
+        raw = self.config.get("steamids", [])
+        version = self._index_versions.get("steamids", 0)
+        cached = self._pool_cache
+        if cached is None or cached[0] is not raw or cached[1] != version:
+            index = dict.fromkeys(str(sid).strip() for sid in raw if str(sid).strip())
+            cached = (raw, version, index)
+            self._pool_cache = cached
+        return cached[2]
+
+    def _get_binding_index(self) -> Dict[str, List[str]]:
+        """SteamID -> 绑定用户列表的反向索引。"""
+        raw = self.config.get("bindings", [])
+        version = self._index_versions.get("bindings", 0)
+        cached = self._binding_index_cache
+        if cached is None or cached[0] is not raw or cached[1] != version:
+            index: Dict[str, List[str]] = {}
+            for user_id, steamid in self._get_bindings().items():
+                index.setdefault(steamid, []).append(user_id)
+            cached = (raw, version, index)
+            self._binding_index_cache = cached
+        return cached[2]
+
     def _get_notify_targets(self) -> List[str]:
         targets = list(self.config.get("notify_targets", []))
         cleaned: List[str] = []
@@ -2015,6 +3625,7 @@ class SteamWatchPlugin(Star):
     def _set_bindings(self, bindings: Dict[str, str]):
         items = [f"{user_id}:{steamid}" for user_id, steamid in bindings.items()]
         self.config["bindings"] = items
+        self._bump_index_version("bindings")
         self._save_config_safe()
 
     def _get_binding_meta(self) -> Dict[str, str]:
@@ -2029,12 +3640,45 @@ class SteamWatchPlugin(Star):
         return meta
 
     def _set_binding_meta(self, meta: Dict[str, str]):
+        cached = self._nickname_index_cache
+        index_valid = (
+            cached is not None
+            and cached[0] is self.config.get("binding_meta")
+            and cached[1] == self._index_versions.get("binding_meta", 0)
+        )
         items = [f"{user_id}:{name}" for user_id, name in meta.items()]
         self.config["binding_meta"] = items
+        version = self._bump_index_version("binding_meta")
         self._save_config_safe()
+        if index_valid:
+            # 增量同步昵称索引，避免每次绑定/解绑都全量重建
+            index = cached[2]
+            for user_id in [uid for uid in index.names if uid not in meta]:
+                index.remove(user_id)
+            for user_id, name in meta.items():
+                if index.names.get(user_id) != name:
+                    index.set(user_id, name)
+            self._nickname_index_cache = (items, version, index)
+        else:
+            self._nickname_index_cache = None
+
+    def _get_nickname_index(self) -> "_NicknameIndex":
+        raw = self.config.get("binding_meta", [])
+        version = self._index_versions.get("binding_meta", 0)
+        cached = self._nickname_index_cache
+        if cached is None or cached[0] is not raw or cached[1] != version:
+            index = _NicknameIndex()
+            for user_id, name in self._get_binding_meta().items():
+                index.set(user_id, name)
+            cached = (raw, version, index)
+            self._nickname_index_cache = cached
+        return cached[2]
+
+    def _format_nickname_candidates(self, index: "_NicknameIndex", user_ids: List[str]) -> str:
+        return "、".join(f"{index.names.get(uid, '')}（{uid}）" for uid in user_ids)
 
     def _group_enabled(self) -> bool:
-        return bool(self.config.get("notify_group_enabled", False))
+        return self._settings().notify_group_enabled
 
     def _get_notify_groups(self) -> Dict[str, List[str]]:
         raw = list(self.config.get("notify_groups", []))
@@ -2086,9 +3730,19 @@ class SteamWatchPlugin(Star):
                     groups[sid].append(group)
         return groups
 
+    def _get_steamid_group_index(self) -> Dict[str, List[str]]:
+        """SteamID -> 分组的只读缓存，供通知扇出使用；需要修改时仍用 _get_steamid_groups 取副本。"""
+        raw = self.config.get("steamid_groups", [])
+        version = self._index_versions.get("steamid_groups", 0)
+        cached = self._steamid_group_cache
+        if cached is None or cached[0] is not raw or cached[1] != version:
+            cached = (raw, version, self._get_steamid_groups())
+            self._steamid_group_cache = cached
+        return cached[2]
+
     def _auto_add_on_bind(self) -> bool:
-        admins = [str(x).strip() for x in self.config.get("admin_user_ids", []) if str(x).strip()]
-        return bool(self.config.get("auto_add_on_bind_when_no_admin", False)) and not admins
+        settings = self._settings()
+        return settings.auto_add_on_bind_when_no_admin and not settings.admin_user_ids
 
     def _set_steamid_groups(self, groups: Dict[str, List[str]]):
         items: List[str] = []
@@ -2106,6 +3760,7 @@ class SteamWatchPlugin(Star):
                 if group_text and item not in items:
                     items.append(item)
         self.config["steamid_groups"] = items
+        self._bump_index_version("steamid_groups")
         self._save_config_safe()
 
     def _add_steamid_group(self, groups: Dict[str, List[str]], steamid: str, group: str) -> bool:
@@ -2168,56 +3823,61 @@ class SteamWatchPlugin(Star):
                 return val_str
         return ""
 
-    def _extract_args_from_event(self, event: AstrMessageEvent, cmd_name: str) -> str:
-        """Try to extract raw args from event text when framework doesn't pass args."""
-        text = self._get_event_text(event)
-        if not text:
-            return ""
-        match = re.search(rf"(?:^|\s)/?{re.escape(cmd_name)}(?:@[\w\-]+)?\b(.*)$", text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        return ""
-
-    def _extract_group_arg(self, event: AstrMessageEvent, action: str) -> str:
-        text = self._get_event_text(event)
-        parts = self._split_args(text)
-        if not parts:
-            return ""
-        cmd0 = parts[0].lstrip("/").lower()
-        action = action.lower()
-        # /sw sub <group>
-        if cmd0 == "sw":
-            if len(parts) >= 3 and parts[1].lower() in {"sub", "subscribe", "unsub", "unsubscribe"}:
-                return parts[2]
-            return ""
-        # /steamwatch_subscribe <group>
-        if cmd0 in {"steamwatch_subscribe", "steamwatch_unsubscribe"}:
-            return parts[1] if len(parts) >= 2 else ""
-        # fallback: search for action token and return next
-        for idx, token in enumerate(parts):
-            if token.lstrip("/").lower() in {"sub", "subscribe", "unsub", "unsubscribe"}:
-                return parts[idx + 1] if idx + 1 < len(parts) else ""
-        return ""
+    def _parse_command_args(self, event: AstrMessageEvent, cmd_name: str, args: str = "") -> "_CommandArgs":
+        """每个事件只读取并解析一次消息文本，结果交给 handler 复用。"""
+        raw_text = self._get_event_text(event)
+        extracted = _extract_command_args(raw_text, cmd_name)
+        if not args or (extracted and len(extracted) > len(args)):
+            args = extracted
+        return _CommandArgs(self._split_args(args), raw_text=raw_text, payload=args.strip())
 
-    def _extract_target_or_at(self, event: AstrMessageEvent, args: List[str]) -> str:
+    def _extract_target_or_at(self, args: "_CommandArgs") -> str:
         if args:
             return args[0]
-        raw_text = self._get_event_text(event)
-        at_uid = _extract_at_user_id_from_text(raw_text)
+        at_uid = _extract_at_user_id_from_text(args.raw_text)
         if at_uid:
             return f"@{at_uid}"
         return ""
 
-    def _consume_session_minutes(self, steamid: str) -> int:
+    def _consume_session_minutes(self, steamid: str, ended_at: Optional[float] = None) -> int:
         start = self._session_start.pop(steamid, None)
         if not start:
             return 0
-        return max(1, int((time.time() - start) // 60))
+        return max(1, int(((ended_at or time.time()) - start) // 60))
 
     # ------------------------
     # Helpers: resolve/HTTP
     # ------------------------
-    async def _resolve_to_steamid64(self, event: AstrMessageEvent, raw: str) -> Tuple[Optional[str], Optional[str]]:
+    async def _resolve_many(
+        self, event: AstrMessageEvent, raws: List[str]
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """并发解析多个目标；本地可解析的直接返回，需要联网的受并发数与速率限制。"""
+        unique = list(dict.fromkeys(r.strip() for r in raws if r and r.strip()))
+        results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        pending: List[str] = []
+        for raw in unique:
+            local = self._resolve_local(event, raw)
+            if local is None:
+                pending.append(raw)
+            else:
+                results[raw] = local
+        if not pending:
+            return results
+        semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+        async def worker(raw: str) -> None:
+            async with semaphore:
+                await self._resolve_limiter.acquire()
+                try:
+                    results[raw] = await self._resolve_to_steamid64(event, raw)
+                except Exception as exc:
+                    results[raw] = (None, f"解析失败：{self._format_net_error(exc)}")
+
+        await asyncio.gather(*(worker(raw) for raw in pending))
+        return results
+
+    def _resolve_local(self, event: AstrMessageEvent, raw: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """不联网即可得出结论的解析；返回 None 表示需要走网络解析。"""
         raw = raw.strip()
         at_uid = _extract_at_user_id(raw) or _extract_at_user_id_from_text(raw)
         if at_uid:
@@ -2228,13 +3888,18 @@ class SteamWatchPlugin(Star):
             return None, f"未找到用户 {at_uid} 的绑定记录。"
         if raw.startswith("@") and len(raw) > 1:
             name = raw[1:]
-            meta = self._get_binding_meta()
-            matches = [uid for uid, nick in meta.items() if nick == name]
+            index = self._get_nickname_index()
+            matches = index.exact(name)
             if len(matches) == 1:
                 bindings = self._get_bindings()
                 steamid = bindings.get(matches[0])
                 if steamid:
                     return steamid, None
+            if len(matches) > 1:
+                return None, f"昵称 {name} 对应多个用户：{self._format_nickname_candidates(index, matches)}，请改用 @QQ。"
+            candidates = index.suggest(name, NICKNAME_CANDIDATE_LIMIT)
+            if candidates:
+                return None, f"未找到昵称 {name} 的绑定记录。你是不是要找：{self._format_nickname_candidates(index, candidates)}"
             return None, f"未找到昵称 {name} 的绑定记录。"
         if raw.lower() in {"me", "self", "我", "自己"}:
             bindings = self._get_bindings()
@@ -2251,14 +3916,21 @@ class SteamWatchPlugin(Star):
         if profile_match:
             return profile_match.group(1), None
 
-        if CSGO_FRIEND_CODE_RE.match(raw):
-            try:
-                return str(_decode_csgo_friend_code(raw)), None
-            except ValueError:
+        try:
+            steamid64 = _parse_steamid(raw)
+        except ValueError:
+            if CSGO_FRIEND_CODE_RE.match(raw):
                 return None, "CS:GO 好友码无效。"
+            return None, "账号 ID 超出范围。"
+        if steamid64 is not None:
+            return str(steamid64), None
+        return None
 
-        if raw.isdigit() and len(raw) <= 10:
-            return str(int(raw) + STEAMID64_BASE), None
+    async def _resolve_to_steamid64(self, event: AstrMessageEvent, raw: str) -> Tuple[Optional[str], Optional[str]]:
+        raw = raw.strip()
+        local = self._resolve_local(event, raw)
+        if local is not None:
+            return local
 
         vanity_match = VANITY_ID_RE.search(raw)
         if vanity_match:
@@ -2273,53 +3945,1586 @@ class SteamWatchPlugin(Star):
         return await self._resolve_vanity(raw)
 
     async def _resolve_vanity(self, vanity: str) -> Tuple[Optional[str], Optional[str]]:
-        api_key = self.config.get("steam_web_api_key", "")
+        key = f"vanity:{vanity.strip().lower()}"
+        cache = self._get_resolver_cache()
+        await cache.load()
+        cached = cache.get(key)
+        self._count_cache("resolver", cached is not None)
+        if cached is not None:
+            return cached[0], cached[1]
+        return await self._singleflight(key, lambda: self._resolve_vanity_remote(vanity, key))
+
+    async def _resolve_vanity_remote(self, vanity: str, cache_key: str) -> Tuple[Optional[str], Optional[str]]:
+        api_key = self._settings().steam_web_api_key
         if not api_key:
             return None, "解析自定义链接需要 Steam Web API Key。"
-        url = "https://api.steampowered.com/ISteamUser/ResolveVanityURL/v0001/"
         try:
-            async with self._create_http_client(10) as client:
-                resp = await client.get(url, params={"key": api_key, "vanityurl": vanity})
+            async with self._client_scope() as client:
+                resp = await self._steam_get(
+                    "api", "/ISteamUser/ResolveVanityURL/v0001/", client, params={"key": api_key, "vanityurl": vanity}
+                )
                 resp.raise_for_status()
                 data = resp.json().get("response", {})
-                if data.get("success") == 1:
-                    return data.get("steamid"), None
         except (httpx.HTTPError, ValueError) as exc:
             return None, f"解析自定义链接失败：{self._format_net_error(exc)}"
-        return None, "无法解析自定义链接。"
+        if data.get("success") == 1 and data.get("steamid"):
+            result = (str(data.get("steamid")), None)
+        else:
+            result = (None, "无法解析自定义链接。")
+        self._store_resolved(cache_key, result)
+        return result
 
     async def _resolve_short_url(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        key = f"url:{url.strip()}"
+        cache = self._get_resolver_cache()
+        await cache.load()
+        cached = cache.get(key)
+        self._count_cache("resolver", cached is not None)
+        if cached is not None:
+            return cached[0], cached[1]
+        return await self._singleflight(key, lambda: self._resolve_short_url_remote(url, key))
+
+    async def _resolve_short_url_remote(self, url: str, cache_key: str) -> Tuple[Optional[str], Optional[str]]:
         try:
-            async with self._create_http_client(10, follow_redirects=True) as client:
+            async with self._client_scope(follow_redirects=True) as client:
                 resp = await client.get(url)
                 final_url = str(resp.url)
         except Exception:
             return None, "短链接解析失败。"
         profile_match = PROFILE_ID_RE.search(final_url)
         if profile_match:
-            return profile_match.group(1), None
-        vanity_match = VANITY_ID_RE.search(final_url)
-        if vanity_match:
-            return await self._resolve_vanity(vanity_match.group(1))
-        return None, "短链接未解析到 Steam 个人主页。"
+            result: Tuple[Optional[str], Optional[str]] = (profile_match.group(1), None)
+        else:
+            vanity_match = VANITY_ID_RE.search(final_url)
+            if not vanity_match:
+                result = (None, "短链接未解析到 Steam 个人主页。")
+            else:
+                result = await self._resolve_vanity(vanity_match.group(1))
+                if not result[0]:
+                    # 自定义链接解析失败可能是临时网络问题，短链接本身不做负缓存
+                    return result
+        self._store_resolved(cache_key, result)
+        return result
+
+    def _get_resolver_cache(self) -> "_PersistentTTLCache":
+        if self._resolver_cache is None:
+            self._resolver_cache = _PersistentTTLCache(
+                self._get_data_dir() / RESOLVER_CACHE_FILE,
+                max_entries=RESOLVER_CACHE_MAX_ENTRIES,
+            )
+        return self._resolver_cache
+
+    def _get_app_catalog(self) -> "_AppCatalog":
+        if self._app_catalog is None:
+            self._app_catalog = _AppCatalog(self._get_data_dir() / APP_CATALOG_FILE)
+        return self._app_catalog
+
+    def _store_resolved(self, key: str, result: Tuple[Optional[str], Optional[str]]) -> None:
+        settings = self._settings()
+        ttl = settings.resolver_cache_ttl_sec if result[0] else settings.resolver_negative_ttl_sec
+        if ttl > 0:
+            self._get_resolver_cache().set(key, [result[0], result[1]], ttl)
+
+    async def _singleflight(self, key: str, factory: Callable):
+        """同一 key 的并发请求只发起一次，其余等待同一结果。
+
+        factory 必须自行管理 HTTP client（不能借用调用方的 client）：单个等待方被取消时请求仍会继续，
+        供其他等待方使用；所有等待方都放弃后才取消请求。
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(
+                lambda _t: self._inflight.pop(key, None) if self._inflight.get(key) is flight else None
+            )
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # 例如 /sw info 超过总时限：没有人再需要这个结果，不让它在后台继续占用请求
+                if self._inflight.get(key) is flight:
+                    self._inflight.pop(key, None)
+                flight.task.cancel()
+
+    def _get_mirror_set(self, host_class: str) -> "_MirrorSet":
+        settings = self._settings()
+        if self._mirror_sets_version != settings.version:
+            configured = {
+                "api": settings.steam_api_mirrors,
+                "store": settings.steam_store_mirrors,
+                "cdn": settings.steam_cdn_mirrors,
+            }
+            sets: Dict[str, _MirrorSet] = {}
+            for name, official in STEAM_HOSTS.items():
+                bases = list(configured[name])
+                if official not in bases and not (settings.steam_mirrors_only and bases):
+                    # 官方地址始终作为最后的候选（仅用镜像时除外，例如指向本地压测服务）
+                    bases.append(official)
+                sets[name] = _MirrorSet(bases, previous=self._mirror_sets.get(name))
+            self._mirror_sets = sets
+            self._mirror_sets_version = settings.version
+        return self._mirror_sets[host_class]
+
+    def _steam_url(self, host_class: str, path: str) -> str:
+        return self._get_mirror_set(host_class).best() + path
+
+    def _rewrite_steam_url(self, url: str) -> str:
+        """把指向官方 Steam 主机的完整 URL 改写到当前选中的镜像。"""
+        for name, official in STEAM_HOSTS.items():
+            if url.startswith(official + "/"):
+                return self._steam_url(name, url[len(official):])
+        return url
+
+    async def _steam_get(
+        self, host_class: str, path: str, client: httpx.AsyncClient, params: Optional[dict] = None
+    ) -> httpx.Response:
+        """按健康度与延迟依次尝试各镜像；网络错误或 5xx 时切换到下一个，全部失败时抛出最后一个异常。"""
+        mirrors = self._get_mirror_set(host_class)
+        last_exc: Optional[Exception] = None
+        for base in mirrors.ordered():
+            start = time.monotonic()
+            try:
+                resp = await client.get(base + path, params=params)
+                elapsed = time.monotonic() - start
+                self._metrics.observe("http_request_seconds", elapsed, host_class=host_class, endpoint=path)
+                self._metrics.inc("http_responses_total", host_class=host_class, endpoint=path, status=resp.status_code)
+                if self._capture is not None:
+                    self._capture_response(host_class, path, params, resp.status_code, elapsed, resp.text)
+                if resp.status_code >= 500:
+                    resp.raise_for_status()
+            except httpx.HTTPError as exc:
+                if not isinstance(exc, httpx.HTTPStatusError):
+                    self._metrics.inc("http_responses_total", host_class=host_class, endpoint=path, status="error")
+                    if self._capture is not None:
+                        self._capture_response(
+                            host_class, path, params, None, time.monotonic() - start, "", error=self._format_net_error(exc)
+                        )
+                mirrors.record(base, False, error=self._format_net_error(exc))
+                last_exc = exc
+                if self._settings().debug_log:
+                    logger.info("steamwatch mirror %s failed: %s", base, self._format_net_error(exc))
+                continue
+            mirrors.record(base, True, latency=elapsed)
+            return resp
+        raise last_exc or httpx.ConnectError(f"no mirror available for {host_class}")
+
+    def _capture_response(
+        self,
+        host_class: str,
+        path: str,
+        params: Optional[dict],
+        status: Optional[int],
+        elapsed: float,
+        body: str,
+        error: str = "",
+    ) -> None:
+        record = {
+            "kind": "response",
+            "t": time.time(),
+            "host": host_class,
+            "path": path,
+            # API Key 不落盘
+            "params": {key: str(value) for key, value in (params or {}).items() if key != "key"},
+            "status": status,
+            "elapsed": round(elapsed, 4),
+            "body": body,
+        }
+        if error:
+            record["error"] = error
+        self._write_capture(record)
+
+    async def _probe_mirrors(self, classes: Optional[List[str]] = None) -> None:
+        targets = [(name, base) for name in (classes or list(STEAM_HOSTS)) for base in self._get_mirror_set(name).bases]
+        if not targets:
+            return
+
+        async def probe(name: str, base: str) -> None:
+            mirrors = self._get_mirror_set(name)
+            start = time.monotonic()
+            try:
+                resp = await client.get(base + MIRROR_PROBE_PATHS[name])
+            except httpx.HTTPError as exc:
+                mirrors.record(base, False, error=self._format_net_error(exc))
+                return
+            if resp.status_code >= 500:
+                mirrors.record(base, False, error=f"HTTP {resp.status_code}")
+            else:
+                mirrors.record(base, True, latency=time.monotonic() - start)
+
+        async with self._create_http_client(self._settings().request_timeout_sec) as client:
+            await asyncio.gather(*(probe(name, base) for name, base in targets), return_exceptions=True)
+        now = time.time()
+        for name in classes or list(STEAM_HOSTS):
+            self._get_mirror_set(name).probed_at = now
+
+    def _format_mirror_report(self, detailed: bool = True) -> str:
+        lines = []
+        for name in STEAM_HOSTS:
+            mirrors = self._get_mirror_set(name)
+            lines.append(f"{name}：当前 {mirrors.best()}")
+            if not detailed:
+                continue
+            for base in mirrors.ordered():
+                latency = mirrors.latency[base]
+                latency_text = f"{latency * 1000:.0f}ms" if latency is not None else "未测速"
+                state = "正常" if mirrors.healthy(base) else f"异常（{mirrors.last_error[base] or '连续失败'}）"
+                lines.append(f"  - {base}  {latency_text}  {state}")
+            if mirrors.probed_at:
+                lines.append(f"  上次测速：{_format_ts(int(mirrors.probed_at))}")
+        return "\n".join(lines)
+
+    async def _route_net(self, event: AstrMessageEvent, args: "_CommandArgs"):
+        action = args[0].lower() if args else ""
+        if not action:
+            yield event.plain_result(self._menu_net() + "\n\n当前线路：\n" + self._format_mirror_report(detailed=False))
+            return
+        if action in {"probe", "test"}:
+            await self._probe_mirrors()
+            yield event.plain_result("镜像测速结果：\n" + self._format_mirror_report())
+            return
+        if action in {"status", "report", "mirrors"}:
+            yield event.plain_result("镜像状态：\n" + self._format_mirror_report())
+            return
+        yield event.plain_result("用法：/sw net [status|probe]")
+
+    @contextlib.asynccontextmanager
+    async def _client_scope(self, client: Optional[httpx.AsyncClient] = None, follow_redirects: bool = False):
+        """复用调用方传入的 client；未传入时按当前超时配置临时创建一个。"""
+        if client is not None:
+            yield client
+            return
+        timeout_sec = self._settings().request_timeout_sec
+        async with self._create_http_client(timeout_sec, follow_redirects=follow_redirects) as own:
+            yield own
+
+    async def _within_deadline(self, coro, deadline: Optional[float]):
+        """deadline（单调时钟）前完成则返回结果，否则取消并返回 None；deadline 为 None 时不限时。"""
+        if deadline is None:
+            return await coro
+        try:
+            return await asyncio.wait_for(coro, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            return None
 
-    def _get_proxy_url(self) -> str:
-        return str(self.config.get("proxy_url", "")).strip()
+    def _describe_proxies(self) -> str:
+        """调试日志用：各代理及其当前是否可用，未配置代理时为 none。"""
+        pool = self._get_proxy_pool()
+        if not pool.proxies:
+            return "none"
+        now = time.time()
+        return ", ".join(
+            f"{proxy}({'ok' if pool.stats[proxy].ejected_until <= now else 'ejected'})" for proxy in pool.proxies
+        )
 
-    def _create_http_client(self, timeout_sec: int, follow_redirects: bool = False) -> httpx.AsyncClient:
-        proxy_url = self._get_proxy_url()
-        verify_ssl = bool(self.config.get("verify_ssl", True))
+    def _get_proxy_pool(self) -> "_ProxyPool":
+        settings = self._settings()
+        if self._proxy_pool.version != settings.version:
+            self._proxy_pool = _ProxyPool(settings.proxy_pool, previous=self._proxy_pool, version=settings.version)
+        return self._proxy_pool
+
+    def _route_modes(self) -> Dict[str, str]:
+        modes = {name: "proxy" for name in ROUTE_CLASSES}
+        modes.update(self._settings().proxy_routes)
+        return modes
+
+    def _route_hosts(self) -> Dict[str, Set[str]]:
+        hosts: Dict[str, Set[str]] = {}
+        for name in STEAM_HOSTS:
+            hosts[name] = {httpx.URL(base).host for base in self._get_mirror_set(name).bases}
+        for name, extra in ROUTE_EXTRA_HOSTS.items():
+            hosts.setdefault(name, set()).update(extra)
+        return hosts
+
+    def _create_http_client(
+        self, timeout_sec: int, follow_redirects: bool = False, proxy: Optional[str] = None
+    ) -> httpx.AsyncClient:
+        """未配置代理时直连；配置了代理池时按主机类挂载直连或代理池传输层。proxy 指定时只走该代理（用于探测）。"""
+        verify_ssl = self._settings().verify_ssl
         kwargs = {
             "timeout": timeout_sec,
             "follow_redirects": follow_redirects,
             "verify": verify_ssl,
         }
-        if proxy_url:
+        if proxy:
             try:
-                return httpx.AsyncClient(proxy=proxy_url, **kwargs)
+                return httpx.AsyncClient(proxy=proxy, **kwargs)
             except TypeError:
-                return httpx.AsyncClient(proxies=proxy_url, **kwargs)
-        return httpx.AsyncClient(**kwargs)
+                return httpx.AsyncClient(proxies=proxy, **kwargs)
+        pool = self._get_proxy_pool()
+        if not pool.proxies:
+            return httpx.AsyncClient(**kwargs)
+        modes = self._route_modes()
+        pooled = _PooledProxyTransport(pool, verify=verify_ssl, debug_log=self._settings().debug_log)
+        mounts: Dict[str, Optional[httpx.AsyncBaseTransport]] = {}
+        for name, hosts in self._route_hosts().items():
+            for host in hosts:
+                # None 表示使用客户端默认（直连）传输层
+                mounts[f"all://{host}"] = pooled if modes.get(name) == "proxy" else None
+        if modes["other"] == "proxy":
+            mounts["all://"] = pooled
+        return httpx.AsyncClient(mounts=mounts, **kwargs)
+
+    async def _probe_proxies(self) -> None:
+        pool = self._get_proxy_pool()
+        # 探测插件实际在用的地址：优先走代理的主机类，取其当前最优镜像（仅用镜像时不会碰到官方地址）
+        modes = self._route_modes()
+        host_class = next((name for name in MIRROR_PROBE_PATHS if modes.get(name) == "proxy"), "api")
+        url = self._get_mirror_set(host_class).best() + MIRROR_PROBE_PATHS[host_class]
+        timeout_sec = self._settings().request_timeout_sec
+
+        async def probe(proxy: str) -> None:
+            start = time.monotonic()
+            try:
+                async with self._create_http_client(timeout_sec, proxy=proxy) as client:
+                    resp = await client.get(url)
+            except httpx.HTTPError as exc:
+                pool.record(proxy, False, error=self._format_net_error(exc))
+                return
+            if resp.status_code >= 500 or resp.status_code == 407:
+                pool.record(proxy, False, error=f"HTTP {resp.status_code}")
+            else:
+                pool.record(proxy, True, latency=time.monotonic() - start)
+
+        await asyncio.gather(*(probe(proxy) for proxy in pool.proxies), return_exceptions=True)
+        pool.probed_at = time.time()
+
+
+class _Settings(NamedTuple):
+    """配置快照（只读）。字段均已完成类型转换与范围校验。"""
+
+    version: int
+    steam_web_api_key: str
+    poll_interval_sec: int
+    poll_overrun_policy: str
+    poll_watchdog_sec: int
+    send_workers: int
+    send_queue_size: int
+    send_queue_policy: str
+    send_timeout_sec: int
+    send_coalesce_sec: int
+    send_rate_limits: Tuple[Tuple[str, Tuple[float, int]], ...]
+    request_timeout_sec: int
+    request_retries: int
+    request_retry_delay_sec: float
+    proxy_url: str
+    verify_ssl: bool
+    debug_log: bool
+    menu_style: int
+    render_as_image: bool
+    render_image_in_notify: bool
+    image_prefer_game_bg: bool
+    image_default_bg_url: str
+    image_width: int
+    image_height: int
+    image_padding: int
+    image_font_size: int
+    image_line_spacing: int
+    image_overlay_alpha: int
+    image_text_color: str
+    image_font_path: str
+    image_auto_download_font: bool
+    image_font_dir: str
+    image_card_alpha: int
+    image_card_blur: float
+    image_card_padding: int
+    image_card_margin: int
+    image_show_avatar: bool
+    image_avatar_size: int
+    data_dir: str
+    show_csgo_friend_code: bool
+    use_localized_game_name: bool
+    game_name_language: str
+    game_name_cache_ttl_sec: int
+    resolver_cache_ttl_sec: int
+    resolver_negative_ttl_sec: int
+    info_deadline_sec: float
+    achievement_tracking: bool
+    achievement_refresh_sec: int
+    notify_group_enabled: bool
+    notify_on_stop: bool
+    stop_confirm_cycles: int
+    stop_confirm_sec: int
+    auto_add_on_bind_when_no_admin: bool
+    default_platform_id: str
+    default_message_type: str
+    admin_user_ids: Tuple[str, ...]
+    steam_api_mirrors: Tuple[str, ...]
+    steam_store_mirrors: Tuple[str, ...]
+    steam_cdn_mirrors: Tuple[str, ...]
+    steam_mirrors_only: bool
+    mirror_probe_interval_sec: int
+    proxy_pool: Tuple[str, ...]
+    proxy_routes: Tuple[Tuple[str, str], ...]
+    metrics_file: str
+    perf_trace_cycles: int
+    capture_file: str
+
+
+_SETTINGS_KEYS = tuple(name for name in _Settings._fields if name != "version")
+_COLOR_RE = re.compile(r"^(#[0-9a-fA-F]{3}|#[0-9a-fA-F]{6}|#[0-9a-fA-F]{8}|[a-zA-Z]+)$")
+
+
+def _settings_fingerprint(config) -> tuple:
+    values = []
+    for key in _SETTINGS_KEYS:
+        value = config.get(key)
+        values.append(tuple(value) if isinstance(value, list) else value)
+    return tuple(values)
+
+
+def _build_settings(config, version: int) -> Tuple[_Settings, List[str]]:
+    problems: List[str] = []
+
+    def get_int(key: str, default: int, minimum: Optional[int] = None, maximum: Optional[int] = None) -> int:
+        raw = config.get(key, default)
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            problems.append(f"{key}={raw!r} 不是整数，使用默认值 {default}")
+            value = default
+        if minimum is not None and value < minimum:
+            value = minimum
+        if maximum is not None and value > maximum:
+            value = maximum
+        return value
+
+    def get_float(key: str, default: float, minimum: float = 0.0) -> float:
+        raw = config.get(key, default)
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            problems.append(f"{key}={raw!r} 不是数字，使用默认值 {default}")
+            value = default
+        return max(minimum, value)
+
+    def get_bool(key: str, default: bool) -> bool:
+        raw = config.get(key, default)
+        if isinstance(raw, str):
+            lowered = raw.strip().lower()
+            if lowered in {"1", "true", "yes", "on"}:
+                return True
+            if lowered in {"0", "false", "no", "off", ""}:
+                return False
+            problems.append(f"{key}={raw!r} 不是布尔值，使用默认值 {default}")
+            return default
+        return bool(raw)
+
+    def get_str(key: str, default: str, allow_empty: bool = True) -> str:
+        raw = config.get(key, default)
+        value = str(raw if raw is not None else "").strip()
+        if not value and not allow_empty:
+            return default
+        return value
+
+    menu_style = get_int("menu_style", 1)
+    text_color = get_str("image_text_color", DEFAULT_TEXT_COLOR, allow_empty=False)
+    if not _COLOR_RE.match(text_color):
+        problems.append(f"image_text_color={text_color!r} 不是有效颜色，使用默认值 {DEFAULT_TEXT_COLOR}")
+        text_color = DEFAULT_TEXT_COLOR
+    padding = get_int("image_padding", 44, minimum=0)
+
+    def get_list(key: str, default: Iterable[str] = ()) -> Tuple[str, ...]:
+        raw = config.get(key, list(default)) or []
+        if isinstance(raw, str):
+            raw = [raw]
+        return tuple(str(x).strip() for x in raw if str(x).strip())
+
+    def get_mirrors(key: str) -> Tuple[str, ...]:
+        bases = []
+        for base in get_list(key):
+            base = base.rstrip("/")
+            if not base.lower().startswith(("http://", "https://")):
+                problems.append(f"{key} 中的 {base!r} 不是 http(s) 地址，已忽略")
+                continue
+            if base not in bases:
+                bases.append(base)
+        return tuple(bases)
+
+    routes = []
+    for rule in get_list("proxy_routes"):
+        host_class, _, mode = rule.partition("=")
+        host_class = "other" if host_class.strip() == "*" else host_class.strip().lower()
+        mode = mode.strip().lower()
+        if host_class not in ROUTE_CLASSES or mode not in {"proxy", "direct"}:
+            problems.append(f"proxy_routes 规则 {rule!r} 无效（格式：api|store|cdn|community|other=proxy|direct），已忽略")
+            continue
+        routes.append((host_class, mode))
+
+    send_policy = get_str("send_queue_policy", "drop_oldest", allow_empty=False).lower()
+    if send_policy not in SEND_QUEUE_POLICIES:
+        problems.append(
+            f"send_queue_policy={send_policy!r} 无效（可选 drop_oldest/drop_newest/block），使用默认值 drop_oldest"
+        )
+        send_policy = "drop_oldest"
+
+    rate_limits = []
+    for rule in get_list("send_rate_limits", DEFAULT_SEND_RATE_LIMITS):
+        platform, _, limit = rule.partition("=")
+        per_minute, _, burst = limit.partition("/")
+        try:
+            rate = float(per_minute) / 60
+            burst_count = int(burst) if burst.strip() else 1
+        except ValueError:
+            rate, burst_count = -1.0, 0
+        if not platform.strip() or rate < 0 or burst_count < 1:
+            problems.append(f"send_rate_limits 规则 {rule!r} 无效（格式：平台=每分钟条数[/突发条数]），已忽略")
+            continue
+        rate_limits.append((platform.strip(), (rate, burst_count)))
+
+    overrun_policy = get_str("poll_overrun_policy", "skip", allow_empty=False).lower()
+    if overrun_policy not in POLL_OVERRUN_POLICIES:
+        problems.append(f"poll_overrun_policy={overrun_policy!r} 无效（可选 skip/coalesce/shrink），使用默认值 skip")
+        overrun_policy = "skip"
+
+    settings = _Settings(
+        version=version,
+        steam_web_api_key=get_str("steam_web_api_key", ""),
+        poll_interval_sec=get_int("poll_interval_sec", DEFAULT_POLL_INTERVAL_SEC, minimum=MIN_POLL_INTERVAL_SEC),
+        poll_overrun_policy=overrun_policy,
+        poll_watchdog_sec=get_int("poll_watchdog_sec", DEFAULT_POLL_WATCHDOG_SEC, minimum=0),
+        send_workers=get_int("send_workers", DEFAULT_SEND_WORKERS, minimum=1, maximum=32),
+        send_queue_size=get_int("send_queue_size", DEFAULT_SEND_QUEUE_SIZE, minimum=10),
+        send_queue_policy=send_policy,
+        send_timeout_sec=get_int("send_timeout_sec", DEFAULT_SEND_TIMEOUT_SEC, minimum=0),
+        send_coalesce_sec=get_int("send_coalesce_sec", DEFAULT_SEND_COALESCE_SEC, minimum=0, maximum=300),
+        send_rate_limits=tuple(rate_limits),
+        request_timeout_sec=get_int("request_timeout_sec", DEFAULT_REQUEST_TIMEOUT_SEC, minimum=1),
+        request_retries=get_int("request_retries", DEFAULT_REQUEST_RETRIES, minimum=0),
+        request_retry_delay_sec=get_float("request_retry_delay_sec", DEFAULT_REQUEST_RETRY_DELAY_SEC),
+        proxy_url=get_str("proxy_url", ""),
+        verify_ssl=get_bool("verify_ssl", True),
+        debug_log=get_bool("debug_log", False),
+        menu_style=menu_style if menu_style in {1, 2} else 1,
+        render_as_image=get_bool("render_as_image", True),
+        render_image_in_notify=get_bool("render_image_in_notify", True),
+        image_prefer_game_bg=get_bool("image_prefer_game_bg", True),
+        image_default_bg_url=get_str("image_default_bg_url", DEFAULT_STEAM_BG_URL),
+        image_width=get_int("image_width", DEFAULT_IMAGE_SIZE[0], minimum=64, maximum=4096),
+        image_height=get_int("image_height", DEFAULT_IMAGE_SIZE[1], minimum=64, maximum=4096),
+        image_padding=padding,
+        image_font_size=get_int("image_font_size", 30, minimum=6, maximum=256),
+        image_line_spacing=get_int("image_line_spacing", 10, minimum=0),
+        image_overlay_alpha=get_int("image_overlay_alpha", 120, minimum=0, maximum=255),
+        image_text_color=text_color,
+        image_font_path=get_str("image_font_path", ""),
+        image_auto_download_font=get_bool("image_auto_download_font", True),
+        image_font_dir=get_str("image_font_dir", "fonts/steamwatch", allow_empty=False),
+        image_card_alpha=get_int("image_card_alpha", 160, minimum=0, maximum=255),
+        image_card_blur=get_float("image_card_blur", 12.0),
+        image_card_padding=get_int("image_card_padding", 28, minimum=0),
+        image_card_margin=get_int("image_card_margin", padding, minimum=0),
+        image_show_avatar=get_bool("image_show_avatar", True),
+        image_avatar_size=get_int("image_avatar_size", DEFAULT_AVATAR_SIZE, minimum=32, maximum=512),
+        data_dir=get_str("data_dir", DEFAULT_DATA_DIR, allow_empty=False),
+        show_csgo_friend_code=get_bool("show_csgo_friend_code", False),
+        use_localized_game_name=get_bool("use_localized_game_name", False),
+        game_name_language=get_str("game_name_language", "schinese", allow_empty=False),
+        game_name_cache_ttl_sec=get_int("game_name_cache_ttl_sec", 86400, minimum=0),
+        resolver_cache_ttl_sec=get_int("resolver_cache_ttl_sec", 30 * 86400, minimum=0),
+        resolver_negative_ttl_sec=get_int("resolver_negative_ttl_sec", 600, minimum=0),
+        info_deadline_sec=get_float("info_deadline_sec", DEFAULT_INFO_DEADLINE_SEC, minimum=1.0),
+        achievement_tracking=get_bool("achievement_tracking", False),
+        achievement_refresh_sec=get_int("achievement_refresh_sec", DEFAULT_ACHIEVEMENT_REFRESH_SEC, minimum=60),
+        notify_group_enabled=get_bool("notify_group_enabled", False),
+        notify_on_stop=get_bool("notify_on_stop", False),
+        stop_confirm_cycles=get_int("stop_confirm_cycles", DEFAULT_STOP_CONFIRM_CYCLES, minimum=1, maximum=60),
+        stop_confirm_sec=get_int("stop_confirm_sec", 0, minimum=0),
+        auto_add_on_bind_when_no_admin=get_bool("auto_add_on_bind_when_no_admin", False),
+        default_platform_id=get_str("default_platform_id", "aiocqhttp"),
+        default_message_type=get_str("default_message_type", "GroupMessage"),
+        admin_user_ids=get_list("admin_user_ids"),
+        steam_api_mirrors=get_mirrors("steam_api_mirrors"),
+        steam_store_mirrors=get_mirrors("steam_store_mirrors"),
+        steam_cdn_mirrors=get_mirrors("steam_cdn_mirrors"),
+        steam_mirrors_only=get_bool("steam_mirrors_only", False),
+        mirror_probe_interval_sec=get_int("mirror_probe_interval_sec", DEFAULT_MIRROR_PROBE_INTERVAL_SEC, minimum=0),
+        proxy_pool=tuple(dict.fromkeys(x for x in (get_str("proxy_url", ""),) + get_list("proxy_pool") if x)),
+        proxy_routes=tuple(routes),
+        metrics_file=get_str("metrics_file", ""),
+        perf_trace_cycles=get_int("perf_trace_cycles", DEFAULT_PERF_TRACE_CYCLES, minimum=0, maximum=1000),
+        capture_file=get_str("capture_file", ""),
+    )
+    return settings, problems
+
+
+class _PersistentTTLCache:
+    """带 TTL 的 JSON 落盘缓存：首次使用前在线程中加载；有写入后延迟批量刷盘（线程中原子替换），不阻塞事件循环。"""
+
+    def __init__(self, path: Path, max_entries: int = 10000, flush_delay: float = CACHE_FLUSH_INTERVAL_SEC):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_delay = flush_delay
+        self._data: Dict[str, list] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            data = await asyncio.to_thread(self._read)
+            # 加载期间已写入的条目更新，覆盖磁盘上的旧值
+            data.update(self._data)
+            self._data = data
+            self._loaded = True
+
+    def _read(self) -> Dict[str, list]:
+        data: Dict[str, list] = {}
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raw = {}
+        now = time.time()
+        if isinstance(raw, dict):
+            for key, entry in raw.items():
+                if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], (int, float)) and entry[1] > now:
+                    data[key] = entry
+        return data
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._data.pop(key, None)
+            self._mark_dirty()
+            return None
+        return entry[0]
+
+    def set(self, key: str, value, ttl: float) -> None:
+        data = self._data
+        data[key] = [value, time.time() + ttl]
+        if len(data) > self.max_entries:
+            # 淘汰最早过期的 10%
+            for old_key, _ in sorted(data.items(), key=lambda item: item[1][1])[: max(1, self.max_entries // 10)]:
+                data.pop(old_key, None)
+        self._mark_dirty()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        # 先让出任务槽位：写盘期间的新写入会安排下一次刷盘
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._dirty or not self._loaded:
+            return
+        async with self._write_lock:
+            snapshot = dict(self._data)
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            except OSError:
+                self._dirty = True
+                logger.exception("steamwatch cache flush failed: %s", self.path)
+
+    def _write(self, snapshot: Dict[str, list]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+        await self.flush()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(METRIC_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(METRIC_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """按桶上界估算分位数；落在最后一个桶时返回观测到的最大值。"""
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(METRIC_BUCKETS[idx], self.max) if idx < len(METRIC_BUCKETS) else self.max
+        return self.max
+
+
+class _Metrics:
+    """进程内指标：计数器、仪表值与直方图（秒），标签按名称排序后作为键的一部分。"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.gauges: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], _Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, tuple]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        self.gauges[self._key(name, labels)] = float(value)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = _Histogram()
+        hist.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def gauge(self, name: str, **labels) -> float:
+        return self.gauges.get(self._key(name, labels), 0.0)
+
+    def histogram(self, name: str, **labels) -> Optional[_Histogram]:
+        return self.histograms.get(self._key(name, labels))
+
+    def histograms_named(self, name: str) -> List[Tuple[Dict[str, str], _Histogram]]:
+        return [(dict(labels), hist) for (key, labels), hist in self.histograms.items() if key == name]
+
+    def counters_named(self, name: str) -> List[Tuple[Dict[str, str], float]]:
+        return [(dict(labels), value) for (key, labels), value in self.counters.items() if key == name]
+
+    def counter_total(self, name: str) -> float:
+        return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def render_prometheus(self) -> str:
+        def fmt_labels(labels: tuple, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_prom_escape(value)}"' for key, value in pairs) + "}"
+
+        out: List[str] = []
+        for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({key for key, _ in series}):
+                out.append(f"# TYPE steamwatch_{name} {kind}")
+                for (key, labels), value in sorted(series.items()):
+                    if key == name:
+                        out.append(f"steamwatch_{name}{fmt_labels(labels)} {value:g}")
+        for name in sorted({key for key, _ in self.histograms}):
+            out.append(f"# TYPE steamwatch_{name} histogram")
+            for (key, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if key != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(METRIC_BUCKETS + (float("inf"),), hist.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    out.append(f"steamwatch_{name}_bucket{fmt_labels(labels, (('le', le),))} {cumulative}")
+                out.append(f"steamwatch_{name}_sum{fmt_labels(labels)} {hist.total:.6f}")
+                out.append(f"steamwatch_{name}_count{fmt_labels(labels)} {hist.count}")
+        out.append("# TYPE steamwatch_uptime_seconds gauge")
+        out.append(f"steamwatch_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(out) + "\n"
+
+
+def _prom_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class _OutboundMessage(NamedTuple):
+    target: str
+    message: object
+    enqueued_at: float
+    # 入队时所在的追踪阶段，发送协程在其下记录 send 阶段
+    span: Optional["_Span"] = None
+
+
+class _Notice(NamedTuple):
+    text: str
+    appid: Optional[int]
+    avatar_url: str
+    is_playing: bool
+
+
+def _merge_notices(notices: Tuple[_Notice, ...]) -> _Notice:
+    """把合并窗口内的多条通知拼成一条；背景与头像仅在各条一致时保留。"""
+    if len(notices) == 1:
+        return notices[0]
+    appids = {notice.appid for notice in notices}
+    avatars = {notice.avatar_url for notice in notices}
+    return _Notice(
+        "\n\n".join(notice.text for notice in notices),
+        appids.pop() if len(appids) == 1 else None,
+        avatars.pop() if len(avatars) == 1 else "",
+        any(notice.is_playing for notice in notices),
+    )
+
+
+def _target_platform(target: str) -> str:
+    return target.split(":", 1)[0]
+
+
+class _TokenBucket:
+    """按会话限流的令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个；rate 为 0 表示不限流。"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+
+class _SendShard:
+    """有界发送队列的一个分片，由一个发送协程消费。
+
+    每个会话一条 FIFO；有待发消息的会话各在就绪堆中占一项，按（最早可发送时刻, 排队序号）排序，
+    取消息时只看堆顶，不再逐条扫描整个队列。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.queues: Dict[str, "deque[_OutboundMessage]"] = {}
+        self.ready: List[Tuple[float, int, str]] = []
+        self.scheduled: Set[str] = set()
+        self.cond = asyncio.Condition()
+        self.deferred: Set[str] = set()
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        return min((queue[0].enqueued_at for queue in self.queues.values()), default=None)
+
+    def _schedule(self, target: str, not_before: float) -> None:
+        self._seq += 1
+        heapq.heappush(self.ready, (not_before, self._seq, target))
+        self.scheduled.add(target)
+
+    def _drop_oldest(self) -> None:
+        # 只在队列满时发生，按会话数线性查找即可
+        target = min(self.queues, key=lambda key: self.queues[key][0].enqueued_at)
+        queue = self.queues[target]
+        queue.popleft()
+        self.size -= 1
+        if not queue:
+            # 堆中该会话的条目留到出堆时再清理
+            del self.queues[target]
+
+    async def put(self, item: _OutboundMessage, policy: str, wait_sec: float) -> str:
+        """入队；队列已满时按策略处理，返回被丢弃的是 "oldest" 还是 "newest"（未丢弃返回空串）。"""
+        dropped = ""
+        async with self.cond:
+            if self.size >= self.capacity:
+                if policy == "drop_oldest":
+                    self._drop_oldest()
+                    dropped = "oldest"
+                elif policy == "block":
+                    # 背压：等待发送协程腾出空间（wait_sec 为 0 时一直等），超时仍满则放弃这条
+                    try:
+                        await asyncio.wait_for(
+                            self.cond.wait_for(lambda: self.size < self.capacity), wait_sec or None
+                        )
+                    except asyncio.TimeoutError:
+                        return "newest"
+                else:
+                    return "newest"
+            self.queues.setdefault(item.target, deque()).append(item)
+            self.size += 1
+            if item.target not in self.scheduled:
+                self._schedule(item.target, 0.0)
+            self.cond.notify_all()
+        return dropped
+
+    async def get(self, delay_for: Callable[[str], float]) -> Tuple[_OutboundMessage, bool]:
+        """取出就绪堆顶会话的下一条消息，并返回它是否曾因配额不足而被推迟。
+
+        每个会话按 FIFO 发送，保证同一会话内的顺序；配额不足的会话按配额恢复时刻重新入堆，不会阻塞同分片的其他会话。
+        """
+        async with self.cond:
+            while True:
+                await self.cond.wait_for(lambda: bool(self.ready))
+                not_before, seq, target = self.ready[0]
+                queue = self.queues.get(target)
+                if not queue:
+                    heapq.heappop(self.ready)
+                    self.scheduled.discard(target)
+                    continue
+                now = time.monotonic()
+                if not_before > now:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self.cond.wait(), not_before - now)
+                    continue
+                delay = delay_for(target)
+                if delay > 0:
+                    self.deferred.add(target)
+                    heapq.heapreplace(self.ready, (now + delay, seq, target))
+                    continue
+                heapq.heappop(self.ready)
+                self.scheduled.discard(target)
+                item = queue.popleft()
+                self.size -= 1
+                if queue:
+                    self._schedule(target, 0.0)
+                else:
+                    del self.queues[target]
+                self.cond.notify_all()
+                delayed = target in self.deferred
+                self.deferred.discard(target)
+                return item, delayed
+
+
+class _CaptureWriter:
+    """把 Steam API 原始响应追加写入 gzip 压缩的 JSON Lines 文件（每轮轮询前写一条 cycle 标记），供 bench/replay.py 回放。"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fp = None
+
+    def write(self, record: dict) -> None:
+        if self._fp is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 追加模式会新增一个 gzip 成员，gzip 模块读取时自动拼接
+            self._fp = gzip.open(self.path, "at", encoding="utf-8")
+        self._fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self) -> None:
+        if self._fp is not None:
+            try:
+                self._fp.flush()
+            except OSError:
+                logger.exception("steamwatch capture flush failed: %s", self.path)
+
+    def close(self) -> None:
+        if self._fp is not None:
+            with contextlib.suppress(OSError):
+                self._fp.close()
+            self._fp = None
+
+
+class _Span:
+    """轮询追踪中的一个阶段：起点、耗时、属性与子阶段。"""
+
+    __slots__ = ("name", "attrs", "started", "duration", "children")
+
+    def __init__(self, name: str, attrs: Optional[dict] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.children: List["_Span"] = []
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.started
+
+    def walk(self, depth: int = 0) -> Iterable[Tuple[int, "_Span"]]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def to_dict(self, origin: float) -> dict:
+        data = {
+            "name": self.name,
+            "offset_ms": round((self.started - origin) * 1000, 3),
+            "ms": round(self.duration * 1000, 3),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+class _ProfileSession:
+    """一次按需剖析：cycles 模式只在轮询期间启用，seconds 模式覆盖事件循环线程上的全部处理。"""
+
+    def __init__(self, mode: str, amount: int, origin: str):
+        self.profiler = cProfile.Profile()
+        self.mode = mode
+        self.amount = amount
+        self.remaining = amount
+        self.origin = origin
+        self.started_at = time.time()
+
+
+def _format_profile_top(stats: "pstats.Stats", limit: int = PROFILE_TOP_N) -> List[str]:
+    rows = [
+        (Path(filename).name, lineno, func, calls, tottime, cumtime)
+        for (filename, lineno, func), (_, calls, tottime, cumtime, _) in stats.stats.items()
+    ]
+
+    def label(row) -> str:
+        filename, lineno, func = row[:3]
+        return func if filename == "~" else f"{func}（{filename}:{lineno}）"
+
+    lines = ["按累计耗时："]
+    for row in sorted(rows, key=lambda item: -item[5])[:limit]:
+        lines.append(f"- {row[5]:.3f}s  {row[3]} 次  {label(row)}")
+    lines.append("按自身耗时：")
+    for row in sorted(rows, key=lambda item: -item[4])[:limit]:
+        lines.append(f"- {row[4]:.3f}s  {row[3]} 次  {label(row)}")
+    return lines
+
+
+class _CycleTrace(NamedTuple):
+    seq: int
+    at: float
+    root: _Span
+
+
+# 当前所在的追踪阶段；不在轮询中时为 None，_trace_span 直接跳过
+_TRACE_SPAN: "contextvars.ContextVar[Optional[_Span]]" = contextvars.ContextVar("steamwatch_trace_span", default=None)
+
+
+@contextlib.contextmanager
+def _trace_span(name: str, **attrs):
+    parent = _TRACE_SPAN.get()
+    if parent is None:
+        yield
+        return
+    span = _Span(name, attrs)
+    parent.children.append(span)
+    token = _TRACE_SPAN.set(span)
+    try:
+        yield
+    finally:
+        span.finish()
+        _TRACE_SPAN.reset(token)
+
+
+def _trace_annotate(**attrs) -> None:
+    span = _TRACE_SPAN.get()
+    if span is not None:
+        span.attrs.update(attrs)
+
+
+class _ProxyStats:
+    __slots__ = ("latency", "failures", "ejected_until", "requests", "errors", "last_error")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.last_error = ""
+
+
+class _ProxyPool:
+    """代理池：连续失败达到阈值的代理暂时剔除，可用代理按延迟倒数加权随机选择。"""
+
+    def __init__(self, proxies: Tuple[str, ...], previous: Optional["_ProxyPool"] = None, version: int = -1):
+        self.proxies = proxies
+        self.version = version
+        self.stats: Dict[str, _ProxyStats] = {}
+        for proxy in proxies:
+            kept = previous.stats.get(proxy) if previous is not None else None
+            self.stats[proxy] = kept or _ProxyStats()
+        self.probed_at = previous.probed_at if previous is not None else 0.0
+
+    def candidates(self) -> List[str]:
+        """本次请求依次尝试的代理；全部被剔除时返回空列表（改为直连）。"""
+        now = time.time()
+        healthy = [proxy for proxy in self.proxies if self.stats[proxy].ejected_until <= now]
+        ordered = []
+        while healthy:
+            weights = [1.0 / max(0.01, self.stats[proxy].latency or PROXY_UNKNOWN_LATENCY_SEC) for proxy in healthy]
+            choice = random.choices(healthy, weights=weights)[0]
+            ordered.append(choice)
+            healthy.remove(choice)
+        return ordered
+
+    def record(self, proxy: str, ok: bool, latency: Optional[float] = None, error: str = "") -> None:
+        stats = self.stats.get(proxy)
+        if stats is None:
+            return
+        stats.requests += 1
+        if not ok:
+            stats.errors += 1
+            stats.failures += 1
+            stats.last_error = error
+            if stats.failures >= MIRROR_FAILURE_THRESHOLD:
+                stats.ejected_until = time.time() + PROXY_EJECT_SEC
+            return
+        stats.failures = 0
+        stats.ejected_until = 0.0
+        if latency is not None:
+            previous = stats.latency
+            stats.latency = latency if previous is None else previous + MIRROR_LATENCY_ALPHA * (latency - previous)
+
+
+class _PooledProxyTransport(httpx.AsyncBaseTransport):
+    """按代理池选择代理发送请求；代理连接失败时换下一个，全部不可用时直连。"""
+
+    def __init__(self, pool: _ProxyPool, verify=True, debug_log: bool = False):
+        self._pool = pool
+        self._verify = verify
+        self._debug_log = debug_log
+        self._transports: Dict[Optional[str], httpx.AsyncHTTPTransport] = {}
+
+    def _transport(self, proxy: Optional[str]) -> httpx.AsyncHTTPTransport:
+        transport = self._transports.get(proxy)
+        if transport is None:
+            if proxy:
+                transport = httpx.AsyncHTTPTransport(proxy=httpx.Proxy(proxy), verify=self._verify)
+            else:
+                transport = httpx.AsyncHTTPTransport(verify=self._verify)
+            self._transports[proxy] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        candidates = self._pool.candidates()
+        if not candidates:
+            if self._debug_log:
+                logger.info("steamwatch all proxies ejected, connecting directly: %s", request.url.host)
+            return await self._transport(None).handle_async_request(request)
+        last_exc: Optional[Exception] = None
+        for proxy in candidates:
+            start = time.monotonic()
+            try:
+                response = await self._transport(proxy).handle_async_request(request)
+            except (httpx.ProxyError, httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                # 连接阶段失败：请求未发出，可安全换下一个代理
+                self._pool.record(proxy, False, error=f"{exc.__class__.__name__}: {exc}")
+                last_exc = exc
+                continue
+            except httpx.TransportError as exc:
+                self._pool.record(proxy, False, error=f"{exc.__class__.__name__}: {exc}")
+                raise
+            self._pool.record(proxy, True, latency=time.monotonic() - start)
+            return response
+        raise last_exc
+
+    async def aclose(self) -> None:
+        # 同一实例挂载在多个主机上，客户端关闭时会被多次调用
+        transports, self._transports = list(self._transports.values()), {}
+        for transport in transports:
+            await transport.aclose()
+
+
+class _MirrorSet:
+    """同一类 Steam 主机的候选地址：记录延迟（EWMA）与连续失败次数，按健康度、延迟、配置顺序排序。"""
+
+    def __init__(self, bases: List[str], previous: Optional["_MirrorSet"] = None):
+        self.bases = bases
+        self.latency: Dict[str, Optional[float]] = {base: None for base in bases}
+        self.failures: Dict[str, int] = {base: 0 for base in bases}
+        self.last_error: Dict[str, str] = {base: "" for base in bases}
+        self.probed_at = 0.0
+        if previous is not None:
+            # 配置变更后保留仍在列表中的地址的测速结果
+            for base in bases:
+                if base in previous.failures:
+                    self.latency[base] = previous.latency[base]
+                    self.failures[base] = previous.failures[base]
+                    self.last_error[base] = previous.last_error[base]
+            self.probed_at = previous.probed_at
+
+    def healthy(self, base: str) -> bool:
+        return self.failures[base] < MIRROR_FAILURE_THRESHOLD
+
+    def ordered(self) -> List[str]:
+        rank = {base: idx for idx, base in enumerate(self.bases)}
+        return sorted(
+            self.bases,
+            key=lambda base: (
+                not self.healthy(base),
+                self.failures[base],
+                self.latency[base] is None,
+                self.latency[base] or 0.0,
+                rank[base],
+            ),
+        )
+
+    def best(self) -> str:
+        return self.ordered()[0]
+
+    def record(self, base: str, ok: bool, latency: Optional[float] = None, error: str = "") -> None:
+        if base not in self.failures:
+            return
+        if not ok:
+            self.failures[base] += 1
+            self.last_error[base] = error
+            return
+        self.failures[base] = 0
+        self.last_error[base] = ""
+        if latency is not None:
+            previous = self.latency[base]
+            self.latency[base] = latency if previous is None else previous + MIRROR_LATENCY_ALPHA * (latency - previous)
+
+
+class _AppCatalog:
+    """本地游戏名目录（SQLite，按 appid+语言建主键索引），文件不存在时不创建连接。"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._missing = not path.exists()
+        # 查询在工作线程中执行，共用一个连接，逐个进行
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS apps ("
+            "appid INTEGER NOT NULL, lang TEXT NOT NULL, name TEXT NOT NULL, "
+            "PRIMARY KEY (appid, lang)) WITHOUT ROWID"
+        )
+        return conn
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._missing:
+            try:
+                self._conn = self._connect()
+            except sqlite3.Error:
+                logger.exception("steamwatch open app catalog failed: %s", self.path)
+                self._missing = True
+        return self._conn
+
+    @property
+    def available(self) -> bool:
+        return not self._missing
+
+    def lookup(self, appid: int, lang: str) -> Optional[str]:
+        """优先返回指定语言的名称，其次为未标注语言的名称。"""
+        with self._lock:
+            conn = self._reader()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT name FROM apps WHERE appid = ? AND lang IN (?, '') ORDER BY lang = '' LIMIT 1",
+                    (int(appid), lang.lower()),
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row else None
+
+    def names(self, appid: int) -> List[Tuple[str, str]]:
+        with self._lock:
+            conn = self._reader()
+            if conn is None:
+                return []
+            return conn.execute("SELECT lang, name FROM apps WHERE appid = ? ORDER BY lang", (int(appid),)).fetchall()
+
+    def stats(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            conn = self._reader()
+            if conn is None:
+                return []
+            return conn.execute("SELECT lang, COUNT(*) FROM apps GROUP BY lang ORDER BY lang").fetchall()
+
+    def import_file(self, path: Path, lang: str = "") -> Tuple[int, int]:
+        """导入 GetAppList JSON 或 CSV 文件，返回 (导入条数, 跳过条数)。在工作线程中调用。"""
+        rows, skipped = _parse_app_catalog(path.read_text(encoding="utf-8-sig"), lang)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                for start in range(0, len(rows), APP_CATALOG_BATCH_SIZE):
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO apps (appid, lang, name) VALUES (?, ?, ?)",
+                        rows[start:start + APP_CATALOG_BATCH_SIZE],
+                    )
+        finally:
+            conn.close()
+        self._missing = False
+        return len(rows), skipped
+
+    def clear(self) -> None:
+        self.close()
+        with contextlib.suppress(OSError):
+            self.path.unlink()
+        self._missing = True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _OwnedLibrary:
+    """单个账号的游戏库：按 appid 排序的平行数组（appid / 分钟），名称单独成列；private 表示游戏库不公开。"""
+
+    __slots__ = ("appids", "minutes", "names", "fetched_at", "private")
+
+    def __init__(self, games: List[dict], private: bool = False):
+        rows = []
+        for game in games:
+            appid = _safe_int(game.get("appid"))
+            if appid is None or appid < 0:
+                continue
+            minutes = _safe_int(game.get("playtime_forever")) or 0
+            rows.append((appid, max(0, minutes), str(game.get("name") or "")))
+        rows.sort()
+        self.appids = array("I", (row[0] for row in rows))
+        self.minutes = array("I", (row[1] for row in rows))
+        self.names = [row[2] for row in rows]
+        self.fetched_at = time.time()
+        self.private = private
+
+    def __len__(self) -> int:
+        return len(self.appids)
+
+    def minutes_for(self, appid: int) -> Optional[int]:
+        pos = bisect_left(self.appids, appid)
+        if pos < len(self.appids) and self.appids[pos] == appid:
+            return self.minutes[pos]
+        return None
+
+    def top(self, count: int) -> List[Tuple[int, int, str]]:
+        order = heapq.nlargest(count, range(len(self.appids)), key=self.minutes.__getitem__)
+        return [(self.appids[i], self.minutes[i], self.names[i]) for i in order if self.minutes[i] > 0]
+
+    def total_minutes(self) -> int:
+        return sum(self.minutes)
+
+
+class _PendingStop:
+    """已观察到停止、尚未确认的游戏会话：since 为首次看到停止的时间，cycles 为连续看到的轮数。"""
+
+    __slots__ = ("since", "cycles")
+
+    def __init__(self, since: float):
+        self.since = since
+        self.cycles = 0
+
+
+class _AchievementState:
+    """单个账号在单个游戏下的成就状态：成就名元组（按接口顺序）+ 已解锁位图。"""
+
+    __slots__ = ("names", "bits", "fetched_at")
+
+    def __init__(self, names: Tuple[str, ...], bits: int):
+        self.names = names
+        self.bits = bits
+        self.fetched_at = time.time()
+
+    @property
+    def total(self) -> int:
+        return len(self.names)
+
+    @property
+    def achieved(self) -> int:
+        return bin(self.bits).count("1")
+
+    def unlocked_since(self, previous: "_AchievementState") -> int:
+        if previous.names is self.names or previous.names == self.names:
+            return bin(self.bits & ~previous.bits).count("1")
+        before = {name for idx, name in enumerate(previous.names) if previous.bits >> idx & 1}
+        return sum(1 for idx, name in enumerate(self.names) if self.bits >> idx & 1 and name not in before)
+
+
+class _Flight:
+    """_singleflight 中一个进行中的请求及其等待方数量。"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _CommandArgs(list):
+    """一次指令调用的参数：按 shlex 切分后的 token 列表，附带原始消息文本与保留换行的参数原文。"""
+
+    def __init__(self, tokens: List[str], raw_text: str = "", payload: str = ""):
+        super().__init__(tokens)
+        self.raw_text = raw_text
+        self.payload = payload
+
+    def shift(self) -> "_CommandArgs":
+        """去掉首个 token（子命令名），payload 同步去掉对应前缀。"""
+        payload = _LEADING_TOKEN_RE.sub("", self.payload, count=1)
+        return _CommandArgs(list(self[1:]), raw_text=self.raw_text, payload=payload)
+
+
+@lru_cache(maxsize=64)
+def _command_args_pattern(cmd_name: str) -> "re.Pattern":
+    return re.compile(rf"(?:^|\s)/?{re.escape(cmd_name)}(?:@[\w\-]+)?\b(.*)\Z", re.IGNORECASE | re.DOTALL)
+
+
+def _extract_command_args(text: str, cmd_name: str) -> str:
+    if not text:
+        return ""
+    match = _command_args_pattern(cmd_name).search(text)
+    if match:
+        return match.group(1).strip()
+    return ""
+
+
+class _RateLimiter:
+    """异步限速器：相邻两次 acquire 至少间隔 1/rate 秒，rate 不大于 0 时不限速。"""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self._interval <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _normalize_nickname(text: str) -> str:
+    """昵称归一化：全/半角统一（NFKC）、大小写折叠、去首尾空白并合并连续空白。"""
+    text = unicodedata.normalize("NFKC", str(text or "")).casefold()
+    return " ".join(text.split())
+
+
+def _nickname_grams(key: str) -> Set[str]:
+    if len(key) <= 1:
+        return {key} if key else set()
+    return {key[i : i + 2] for i in range(len(key) - 1)}
+
+
+class _NicknameIndex:
+    """昵称索引：精确匹配走哈希，前缀匹配走有序键 + 二分，模糊匹配走二元组倒排。"""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+        self._key_by_user: Dict[str, str] = {}
+        self._users_by_key: Dict[str, List[str]] = {}
+        self._sorted_keys: List[str] = []
+        self._grams: Dict[str, Set[str]] = {}
+
+    def set(self, user_id: str, nickname: str) -> None:
+        self.remove(user_id)
+        key = _normalize_nickname(nickname)
+        if not key:
+            return
+        self.names[user_id] = nickname
+        self._key_by_user[user_id] = key
+        users = self._users_by_key.setdefault(key, [])
+        if not users:
+            insort(self._sorted_keys, key)
+            for gram in _nickname_grams(key):
+                self._grams.setdefault(gram, set()).add(key)
+        users.append(user_id)
+
+    def remove(self, user_id: str) -> None:
+        self.names.pop(user_id, None)
+        key = self._key_by_user.pop(user_id, None)
+        if key is None:
+            return
+        users = self._users_by_key.get(key, [])
+        if user_id in users:
+            users.remove(user_id)
+        if users:
+            return
+        self._users_by_key.pop(key, None)
+        pos = bisect_left(self._sorted_keys, key)
+        if pos < len(self._sorted_keys) and self._sorted_keys[pos] == key:
+            del self._sorted_keys[pos]
+        for gram in _nickname_grams(key):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._grams.pop(gram, None)
+
+    def exact(self, name: str) -> List[str]:
+        return list(self._users_by_key.get(_normalize_nickname(name), []))
+
+    def prefix(self, name: str, limit: int) -> List[str]:
+        key = _normalize_nickname(name)
+        if not key:
+            return []
+        out: List[str] = []
+        pos = bisect_left(self._sorted_keys, key)
+        while pos < len(self._sorted_keys) and len(out) < limit:
+            candidate = self._sorted_keys[pos]
+            if not candidate.startswith(key):
+                break
+            out.extend(self._users_by_key.get(candidate, []))
+            pos += 1
+        return out[:limit]
+
+    def fuzzy(self, name: str, limit: int) -> List[str]:
+        key = _normalize_nickname(name)
+        grams = _nickname_grams(key)
+        if not grams:
+            return []
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        scored = []
+        for candidate, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(_nickname_grams(candidate)))
+            if score >= NICKNAME_FUZZY_MIN_SCORE:
+                scored.append((score, candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        out: List[str] = []
+        for _, candidate in scored:
+            out.extend(self._users_by_key.get(candidate, []))
+            if len(out) >= limit:
+                break
+        return out[:limit]
+
+    def suggest(self, name: str, limit: int) -> List[str]:
+        out = self.prefix(name, limit)
+        for user_id in self.fuzzy(name, limit):
+            if len(out) >= limit:
+                break
+            if user_id not in out:
+                out.append(user_id)
+        return out
 
 
 def _chunk_list(items: List[str], size: int):
@@ -2369,38 +5574,127 @@ def _extract_at_user_id_from_text(text: str) -> Optional[str]:
     return None
 
 
+def _extract_all_at_user_ids(text: str) -> List[str]:
+    if not text:
+        return []
+    found = re.findall(r"\[At:(\d+)\]|\[CQ:at,qq=(\d+)\]", text)
+    return list(dict.fromkeys(a or b for a, b in found))
+
+
+class _SteamIdForms(NamedTuple):
+    steamid64: int
+    account_id: int
+    csgo_code: Optional[str]
+
+    @property
+    def steam2(self) -> str:
+        return f"STEAM_0:{self.account_id & 1}:{self.account_id >> 1}"
+
+    @property
+    def steam3(self) -> str:
+        return f"[U:1:{self.account_id}]"
+
+
+def _parse_steamid(raw: str) -> Optional[int]:
+    """离线识别各种 ID 写法并换算为 SteamID64；无法识别返回 None，CS:GO 好友码校验失败或账号 ID 超出 32 位时抛 ValueError。
+
+    支持：SteamID64、账号 ID（SteamID32）、Steam2 ``STEAM_0:y:z``、Steam3 ``[U:1:n]``、CS:GO 好友码。
+    """
+    text = raw.strip()
+    if text.isdigit():
+        if len(text) == 17:
+            return int(text)
+        if len(text) <= 10:
+            return _steamid64_from_account_id(int(text))
+        return None
+    m = STEAM2_ID_RE.match(text)
+    if m:
+        return _steamid64_from_account_id(int(m.group(2)) * 2 + int(m.group(1)))
+    m = STEAM3_ID_RE.match(text)
+    if m:
+        return _steamid64_from_account_id(int(m.group(1)))
+    if CSGO_FRIEND_CODE_RE.match(text):
+        return _decode_csgo_friend_code(text)
+    return None
+
+
+def _steamid64_from_account_id(account_id: int) -> int:
+    if not 0 <= account_id < 2**32:
+        raise ValueError(f"account id out of range: {account_id}")
+    return account_id + STEAMID64_BASE
+
+
+def _steamid_forms(steamid64: int, with_csgo: bool = False) -> _SteamIdForms:
+    return _SteamIdForms(
+        steamid64,
+        _account_id_from_steamid64(steamid64),
+        _encode_csgo_friend_code(steamid64) if with_csgo else None,
+    )
+
+
+def _convert_steamids(raws: Iterable[str], with_csgo: bool = False) -> Dict[str, Optional[_SteamIdForms]]:
+    """批量换算：输入去重后逐个识别，结果按原始写法（去除首尾空白）索引，无法识别的为 None。"""
+    converted: Dict[str, Optional[_SteamIdForms]] = {}
+    for raw in raws:
+        key = str(raw).strip()
+        if key in converted:
+            continue
+        try:
+            steamid64 = _parse_steamid(key)
+        except ValueError:
+            steamid64 = None
+        converted[key] = _steamid_forms(steamid64, with_csgo) if steamid64 is not None else None
+    return converted
+
+
+CSGO_FRIEND_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+
+@lru_cache(maxsize=STEAMID_CODE_CACHE_SIZE)
 def _encode_csgo_friend_code(steamid64: int) -> str:
-    alphabet = "ABCDEFGHJKLMNOPQRSTUVWXYZ23456789"
-    steamid = steamid64 - STEAMID64_BASE_HEX
-    checksum = _friend_code_checksum(steamid)
-    steamid ^= checksum
+    """CS:GO 好友码：账号 ID 每 4 位后插入 1 位 MD5 校验位，按字节反序后做 base32。"""
+    account_id = steamid64 & 0xFFFFFFFF
+    checksum = _friend_code_checksum(account_id)
+    value = 0
+    for i in range(8):
+        value = (value << 4) | ((account_id >> (i * 4)) & 0xF)
+        value = (value << 1) | ((checksum >> i) & 1)
+    value = int.from_bytes(value.to_bytes(8, byteorder="big"), byteorder="little")
     chars = []
-    for i in range(9):
-        chars.append(alphabet[(steamid >> (i * 5)) & 31])
-    code = "".join(chars)[::-1]
+    for _ in range(13):
+        chars.append(CSGO_FRIEND_CODE_ALPHABET[value & 31])
+        value >>= 5
+    # 前 4 位恒为 "AAAA"，好友码只展示后 9 位
+    code = "".join(chars[4:])
     return f"{code[:5]}-{code[5:]}"
 
 
+@lru_cache(maxsize=STEAMID_CODE_CACHE_SIZE)
 def _decode_csgo_friend_code(code: str) -> int:
     code = code.replace("-", "").upper()
     if len(code) != 9:
         raise ValueError("Invalid code length")
-    alphabet = "ABCDEFGHJKLMNOPQRSTUVWXYZ23456789"
-    code = code[::-1]
-    steamid = 0
-    for idx, ch in enumerate(code):
-        try:
-            digit = alphabet.index(ch)
-        except ValueError:
-            raise ValueError("Invalid character") from None
-        steamid += digit << (idx * 5)
-    checksum = _friend_code_checksum(steamid)
-    steamid ^= checksum
-    return steamid + STEAMID64_BASE_HEX
-
-
-def _friend_code_checksum(steamid: int) -> int:
-    data = steamid.to_bytes(8, byteorder="little", signed=False)
+    value = 0
+    for idx, ch in enumerate("AAAA" + code):
+        digit = CSGO_FRIEND_CODE_ALPHABET.find(ch)
+        if digit < 0:
+            raise ValueError("Invalid character")
+        value |= digit << (idx * 5)
+    value = int.from_bytes((value & 0xFFFFFFFFFFFFFFFF).to_bytes(8, byteorder="little"), byteorder="big")
+    account_id = 0
+    bits = 0
+    for i in range(8):
+        bits |= (value & 1) << (7 - i)
+        value >>= 1
+        account_id |= (value & 0xF) << ((7 - i) * 4)
+        value >>= 4
+    if bits != _friend_code_checksum(account_id) & 0xFF:
+        raise ValueError("Invalid checksum")
+    return account_id + STEAMID64_BASE_HEX
+
+
+def _friend_code_checksum(account_id: int) -> int:
+    data = (account_id | 0x4353474F00000000).to_bytes(8, byteorder="little", signed=False)
     digest = hashlib.md5(data).digest()
     return int.from_bytes(digest[:4], byteorder="little", signed=False)
 
@@ -2430,3 +5724,124 @@ def _playtime_taunt(minutes: int) -> str:
     if minutes <= 120:
         return "不错，继续保持。"
     return "今天挺猛的，给你点个赞。"
+
+
+def _split_group_cell(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        parts = [str(v) for v in value]
+    else:
+        parts = re.split(r"[|;、]", str(value or ""))
+    out: List[str] = []
+    for part in parts:
+        part = part.strip()
+        if part and part not in out:
+            out.append(part)
+    return out
+
+
+def _parse_import_rows(text: str) -> Tuple[List[dict], List[str]]:
+    """解析导入内容：JSON 数组（字符串或对象）或 CSV（target,groups,user_id,nickname）。"""
+    rows: List[dict] = []
+    errors: List[str] = []
+    stripped = text.strip()
+    if stripped.startswith("[") or stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+        except ValueError as exc:
+            return [], [f"JSON 解析失败：{exc}"]
+        if isinstance(data, dict):
+            data = data.get("accounts", data.get("rows", []))
+        if not isinstance(data, list):
+            return [], ["JSON 顶层需要是数组。"]
+        for idx, item in enumerate(data, start=1):
+            if isinstance(item, (str, int)):
+                item = {"target": str(item)}
+            if not isinstance(item, dict):
+                errors.append(f"第 {idx} 行：格式无效。")
+                continue
+            target = str(item.get("target") or item.get("steamid") or item.get("id") or "").strip()
+            if not target:
+                errors.append(f"第 {idx} 行：缺少 target。")
+                continue
+            rows.append(
+                {
+                    "line": idx,
+                    "target": target,
+                    "groups": _split_group_cell(item.get("groups", item.get("group", ""))),
+                    "user_id": str(item.get("user_id") or item.get("user") or "").strip(),
+                    "nickname": str(item.get("nickname") or "").strip(),
+                }
+            )
+        return rows, errors
+    reader = csv.reader(io.StringIO(stripped))
+    for idx, cells in enumerate(reader, start=1):
+        cells = [c.strip() for c in cells]
+        if not cells or not cells[0] or cells[0].startswith("#"):
+            continue
+        if idx == 1 and cells[0].lower() in {"target", "steamid", "id"}:
+            continue
+        cells += [""] * (len(EXPORT_FIELDS) - len(cells))
+        rows.append(
+            {
+                "line": idx,
+                "target": cells[0],
+                "groups": _split_group_cell(cells[1]),
+                "user_id": cells[2],
+                "nickname": cells[3],
+            }
+        )
+    return rows, errors
+
+
+def _format_export_rows(rows: List[dict], fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(rows, ensure_ascii=False, indent=2) + "\n"
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([row["target"], "|".join(row["groups"]), row["user_id"], row["nickname"]])
+    return buf.getvalue()
+
+
+def _parse_app_catalog(text: str, default_lang: str = "") -> Tuple[List[Tuple[int, str, str]], int]:
+    """解析游戏名目录：GetAppList JSON（applist.apps / response.apps / 列表）或 appid,name[,lang] CSV。"""
+    rows: Dict[Tuple[int, str], str] = {}
+    skipped = 0
+
+    def add(appid, name, lang) -> None:
+        nonlocal skipped
+        appid_int = _safe_int(appid)
+        name = str(name or "").strip()
+        if appid_int is None or appid_int <= 0 or not name:
+            skipped += 1
+            return
+        rows[(appid_int, str(lang or default_lang).strip().lower())] = name
+
+    stripped = text.lstrip()
+    if stripped.startswith(("{", "[")):
+        data = json.loads(stripped)
+        if isinstance(data, dict):
+            container = data.get("applist") or data.get("response") or data
+            data = container.get("apps", []) if isinstance(container, dict) else []
+            if isinstance(data, dict):
+                data = data.get("app", [])
+        if not isinstance(data, list):
+            raise ValueError("未找到 apps 列表")
+        for item in data:
+            if isinstance(item, dict):
+                add(item.get("appid"), item.get("name"), item.get("lang") or item.get("language"))
+            else:
+                skipped += 1
+    else:
+        reader = csv.reader(io.StringIO(text))
+        for index, record in enumerate(reader):
+            if not record or not "".join(record).strip():
+                continue
+            if index == 0 and record[0].strip().lower() == "appid":
+                continue
+            if len(record) < 2:
+                skipped += 1
+                continue
+            add(record[0].strip(), record[1], record[2] if len(record) > 2 else "")
+    return [(appid, lang, name) for (appid, lang), name in rows.items()], skipped
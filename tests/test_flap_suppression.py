@@ -0,0 +1,114 @@
+"""停止确认窗口：短暂掉线后重开同一游戏不提醒，换游戏时先结算上一局再提醒开局。
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import load_plugin, make_plugin  # noqa: E402
+
+load_plugin()
+
+STEAMID = "76561198000000001"
+
+
+def _playing(appid: int, name: str) -> dict:
+    return {"steamid": STEAMID, "personaname": "甲", "gameid": str(appid), "gameextrainfo": name}
+
+
+IDLE = {"steamid": STEAMID, "personaname": "甲"}
+
+
+async def _plugin(script):
+    """按 script 逐轮返回玩家摘要，记录发出的提醒与结算时传入的 ended_at。"""
+    plugin = await make_plugin(
+        {
+            "data_dir": tempfile.mkdtemp(),
+            "steam_web_api_key": "key",
+            "steamids": [STEAMID],
+            "notify_on_stop": True,
+            "achievement_tracking": False,
+            "use_localized_game_name": False,
+            "stop_confirm_cycles": 2,
+            "stop_confirm_sec": 0,
+        }
+    )
+    rounds = iter(script)
+    notices = []
+    ended = []
+
+    async def fetch(api_key, steamids, deadline=None):
+        return {STEAMID: next(rounds)}
+
+    async def notify(steamid, text, **kwargs):
+        notices.append(text)
+
+    consume = plugin._consume_session_minutes
+
+    def consume_session_minutes(steamid, ended_at=None):
+        ended.append(ended_at)
+        return consume(steamid, ended_at)
+
+    plugin._fetch_player_summaries = fetch
+    plugin._notify_by_steamid = notify
+    plugin._consume_session_minutes = consume_session_minutes
+    return plugin, notices, ended
+
+
+def _suppressed(plugin) -> float:
+    return sum(value for labels, value in plugin._metrics.counters_named("transitions_suppressed_total"))
+
+
+def test_restart_same_game_is_suppressed():
+    async def run():
+        plugin, notices, ended = await _plugin([_playing(730, "CS2"), IDLE, _playing(730, "CS2"), IDLE, IDLE])
+        try:
+            await plugin._poll_cycle()
+            await plugin._poll_cycle()
+            assert STEAMID in plugin._pending_stops
+            await plugin._poll_cycle()
+            # 确认前重开同一游戏：两条提醒都不发，会话继续计时
+            assert notices == []
+            assert STEAMID not in plugin._pending_stops
+            assert _suppressed(plugin) == 1
+            await plugin._poll_cycle()
+            since = plugin._pending_stops[STEAMID].since
+            await plugin._poll_cycle()
+            assert len(notices) == 1 and "已停止游戏 CS2" in notices[0]
+            # 时长结算到首次看到停止的时刻，而不是确认的时刻
+            assert ended == [since]
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_switch_game_announces_stop_then_start():
+    async def run():
+        plugin, notices, ended = await _plugin([_playing(730, "CS2"), IDLE, _playing(570, "Dota 2")])
+        try:
+            await plugin._poll_cycle()
+            await plugin._poll_cycle()
+            since = plugin._pending_stops[STEAMID].since
+            await plugin._poll_cycle()
+            assert len(notices) == 2
+            assert "已停止游戏 CS2" in notices[0]
+            assert "正在玩 Dota 2" in notices[1]
+            assert ended == [since]
+            assert _suppressed(plugin) == 0
+            assert plugin._last_state[STEAMID] == (True, "Dota 2", "570")
+            assert STEAMID in plugin._session_start
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_restart_same_game_is_suppressed()
+    test_switch_game_announces_stop_then_start()
+    print("ok")
@@ -0,0 +1,116 @@
+"""批量导入的冲突处理、导出往返与配置事务回滚。
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import load_plugin, make_plugin  # noqa: E402
+
+main = load_plugin()
+from astrbot.api.event import AstrMessageEvent  # noqa: E402
+
+SID_A = "76561198000000001"
+SID_B = "76561198000000002"
+SID_C = "76561198000000003"
+
+
+async def _plugin(**config):
+    plugin = await make_plugin(
+        {
+            "data_dir": tempfile.mkdtemp(),
+            "steamids": [SID_A],
+            "bindings": [f"100:{SID_A}"],
+            "binding_meta": ["100:甲"],
+            **config,
+        }
+    )
+    saves = []
+    plugin.config.save_config = lambda: saves.append(dict(plugin.config))
+    return plugin, saves
+
+
+async def _run(plugin, text: str) -> str:
+    results = [item async for item in plugin.short_cmd(AstrMessageEvent(text), "")]
+    return "\n".join(str(item) for item in results)
+
+
+def test_import_reports_conflicts_and_applies_the_rest():
+    async def run():
+        plugin, saves = await _plugin()
+        try:
+            payload = "\n".join(
+                [
+                    "target,groups,user_id,nickname",
+                    f"{SID_B},,100,换绑",  # 用户 100 已绑定 SID_A
+                    f"{SID_A},,200,抢绑",  # SID_A 已被用户 100 绑定
+                    f"{SID_C},g1|g2,300,丙",
+                    f"{SID_C},g2,,",  # 重复账号只追加分组
+                ]
+            )
+            reply = await _run(plugin, f"/sw import\n{payload}")
+            assert "新增 2 个账号" in reply
+            assert "新增 1 条绑定" in reply
+            assert "失败 2 条" in reply
+            assert "用户 100 已绑定其他 SteamID" in reply
+            assert "该 SteamID 已被其他用户绑定" in reply
+            assert plugin._get_steamids() == [SID_A, SID_B, SID_C]
+            assert plugin._get_bindings() == {"100": SID_A, "300": SID_C}
+            assert plugin._get_binding_meta() == {"100": "甲", "300": "丙"}
+            assert plugin._get_steamid_groups() == {SID_C: ["g1", "g2"]}
+            # 四项配置在同一事务内写入，只保存一次
+            assert len(saves) == 1
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_export_rows_round_trip():
+    rows = [
+        {"target": SID_A, "groups": ["g1", "g2"], "user_id": "100", "nickname": "甲, 乙"},
+        {"target": SID_B, "groups": [], "user_id": "", "nickname": ""},
+    ]
+    for fmt in ("csv", "json"):
+        parsed, errors = main._parse_import_rows(main._format_export_rows(rows, fmt))
+        assert not errors
+        assert [(r["target"], r["groups"], r["user_id"], r["nickname"]) for r in parsed] == [
+            (r["target"], r["groups"], r["user_id"], r["nickname"]) for r in rows
+        ]
+
+
+def test_config_transaction_rolls_back_on_error():
+    async def run():
+        plugin, saves = await _plugin()
+        try:
+            pool = plugin._get_pool_index()
+            with pytest.raises(RuntimeError):
+                with plugin._config_transaction():
+                    plugin._set_steamids([SID_A, SID_B])
+                    plugin._set_bindings({"100": SID_A, "200": SID_B})
+                    raise RuntimeError("boom")
+            assert plugin._get_steamids() == [SID_A]
+            assert plugin._get_bindings() == {"100": SID_A}
+            assert SID_B not in plugin._get_pool_index()
+            assert plugin._get_pool_index() is not pool
+            assert not saves
+            # 回滚后事务计数归零，之后的写入照常保存
+            plugin._set_steamids([SID_A, SID_C])
+            assert len(saves) == 1
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_import_reports_conflicts_and_applies_the_rest()
+    test_export_rows_round_trip()
+    test_config_transaction_rolls_back_on_error()
+    print("ok")
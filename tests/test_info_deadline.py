@@ -0,0 +1,155 @@
+"""/sw info 超过总时限时取消查询，不能让共享的 single-flight 请求用上已关闭的 client。
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import load_plugin, make_plugin  # noqa: E402
+
+load_plugin()
+from astrbot.api.event import AstrMessageEvent  # noqa: E402
+
+STEAMID = "76561198000000001"
+APPID = 730
+SLOW_SEC = 1.5
+
+
+class _Transport(httpx.AsyncBaseTransport):
+    """每个 client 一个实例；client 关闭后仍未完成的请求失败，模拟真实连接池被关闭。"""
+
+    def __init__(self, calls: dict, slow_summaries: bool = False):
+        self.calls = calls
+        self.closed = False
+        self.slow_summaries = slow_summaries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls[path] = self.calls.get(path, 0) + 1
+        if path.endswith("/GetPlayerSummaries/v0002/") and not self.slow_summaries:
+            player = {"steamid": STEAMID, "personaname": "P", "gameid": str(APPID), "gameextrainfo": "CS2"}
+            return httpx.Response(200, json={"response": {"players": [player]}})
+        await asyncio.sleep(SLOW_SEC)
+        if self.closed:
+            raise httpx.ConnectError("client has been closed", request=request)
+        if path.endswith("/GetPlayerAchievements/v0001/"):
+            achievements = [{"apiname": "A", "achieved": 1}, {"apiname": "B", "achieved": 0}]
+            return httpx.Response(200, json={"playerstats": {"achievements": achievements}})
+        if path.endswith("/GetOwnedGames/v0001/"):
+            return httpx.Response(200, json={"response": {"games": [{"appid": APPID, "playtime_forever": 600}]}})
+        return httpx.Response(404)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+async def _plugin(calls: dict, slow_summaries: bool = False, **config):
+    plugin = await make_plugin(
+        {
+            "steam_web_api_key": "test",
+            "data_dir": tempfile.mkdtemp(),
+            "render_as_image": False,
+            "use_localized_game_name": False,
+            "info_deadline_sec": 1,
+            "request_retry_delay_sec": 0,
+            **config,
+        }
+    )
+    plugin._create_http_client = lambda *args, **kwargs: httpx.AsyncClient(
+        transport=_Transport(calls, slow_summaries)
+    )
+    return plugin
+
+
+async def _run_info(plugin) -> str:
+    event = AstrMessageEvent(f"/sw info {STEAMID}")
+    results = [item async for item in plugin.short_cmd(event, f"info {STEAMID}")]
+    return str(results[0])
+
+
+def test_info_deadline_keeps_shared_fetch_alive():
+    async def run():
+        calls: dict = {}
+        plugin = await _plugin(calls)
+        try:
+            # /sw info 先发起成就请求，轮询随后加入同一 single-flight；info 超时放弃后轮询仍应拿到正常结果
+            info = asyncio.create_task(_run_info(plugin))
+            await asyncio.sleep(0.2)
+            assert f"achv:{STEAMID}:{APPID}" in plugin._inflight
+            poll_waiter = asyncio.create_task(plugin._refresh_achievement_state("test", STEAMID, APPID))
+            text = await info
+            assert "成就进度" not in text
+            state = await poll_waiter
+            assert state is not None and (state.achieved, state.total) == (1, 2)
+            assert plugin._achievements[(STEAMID, APPID)] is state
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_info_deadline_cancels_unshared_fetch():
+    async def run():
+        calls: dict = {}
+        plugin = await _plugin(calls)
+        try:
+            text = await _run_info(plugin)
+            assert "游戏总时长" not in text
+            # 没有其他等待方时请求随 /sw info 一起取消，不在后台继续
+            await asyncio.sleep(SLOW_SEC + 0.2)
+            assert not plugin._inflight
+            assert STEAMID not in plugin._owned_games
+            assert (STEAMID, APPID) not in plugin._achievements
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_info_deadline_covers_summaries():
+    async def run():
+        plugin = await _plugin({}, slow_summaries=True)
+        try:
+            started = time.monotonic()
+            text = await _run_info(plugin)
+            assert time.monotonic() - started < SLOW_SEC
+            assert "未获取到" in text
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_info_deadline_covers_background_download():
+    async def run():
+        plugin = await _plugin(
+            {},
+            render_as_image=True,
+            image_auto_download_font=False,
+            image_default_bg_url="https://bg.invalid/bg.jpg",
+            image_show_avatar=False,
+        )
+        try:
+            started = time.monotonic()
+            await _run_info(plugin)
+            # 补充信息已用满时限，背景下载不能再额外等一个 SLOW_SEC
+            assert time.monotonic() - started < 1 + SLOW_SEC / 2
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_info_deadline_keeps_shared_fetch_alive()
+    test_info_deadline_cancels_unshared_fetch()
+    test_info_deadline_covers_summaries()
+    test_info_deadline_covers_background_download()
+    print("ok")
@@ -0,0 +1,97 @@
+"""绑定/解绑时昵称索引增量更新，不因保存配置而整体重建。
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import load_plugin, make_plugin  # noqa: E402
+
+load_plugin()
+from astrbot.api.event import AstrMessageEvent  # noqa: E402
+
+STEAMID = "76561198000000001"
+
+
+class _NamedEvent(AstrMessageEvent):
+    def __init__(self, text: str, sender: str, name: str):
+        super().__init__(text, sender=sender)
+        self._name = name
+
+    def get_sender_name(self):
+        return self._name
+
+
+async def _plugin():
+    return await make_plugin(
+        {
+            "data_dir": tempfile.mkdtemp(),
+            "steamids": [f"7656119800000{n:04d}" for n in range(1000, 1100)],
+            "bindings": [f"{n}:7656119800000{n:04d}" for n in range(1000, 1100)],
+            "binding_meta": [f"{n}:玩家{n}" for n in range(1000, 1100)],
+        }
+    )
+
+
+async def _run(plugin, event):
+    return [item async for item in plugin.short_cmd(event, "")]
+
+
+def test_bind_then_lookup_keeps_index():
+    async def run():
+        plugin = await _plugin()
+        try:
+            index = plugin._get_nickname_index()
+            await _run(plugin, _NamedEvent(f"/sw bind {STEAMID}", "42", "新来的"))
+            assert plugin._get_bindings()["42"] == STEAMID
+            assert plugin._get_nickname_index() is index
+            assert index.exact("新来的") == ["42"]
+            assert index.exact("玩家1000") == ["1000"]
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_unbind_then_lookup_keeps_index():
+    async def run():
+        plugin = await _plugin()
+        try:
+            index = plugin._get_nickname_index()
+            await _run(plugin, _NamedEvent("/sw unbind", "1000", "玩家1000"))
+            assert "1000" not in plugin._get_bindings()
+            assert plugin._get_nickname_index() is index
+            assert index.exact("玩家1000") == []
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_unrelated_config_write_keeps_indexes():
+    async def run():
+        plugin = await _plugin()
+        try:
+            nick = plugin._get_nickname_index()
+            bindings = plugin._get_binding_index()
+            pool = plugin._get_pool_index()
+            plugin.config["poll_interval_sec"] = 120
+            plugin._save_config_safe()
+            assert plugin._get_nickname_index() is nick
+            assert plugin._get_binding_index() is bindings
+            assert plugin._get_pool_index() is pool
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_bind_then_lookup_keeps_index()
+    test_unbind_then_lookup_keeps_index()
+    test_unrelated_config_write_keeps_indexes()
+    print("ok")
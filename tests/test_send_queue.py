@@ -0,0 +1,207 @@
+"""发送队列：满载时的三种策略（含 block 在 send_timeout_sec=0 时无限等待）、按平台令牌桶限流与合并窗口。
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import BenchContext, load_plugin, make_plugin  # noqa: E402
+
+main = load_plugin()
+
+TARGET = "aiocqhttp:GroupMessage:1"
+# send_queue_size 的最小值；单个发送协程时即为唯一分片的容量
+CAPACITY = 10
+
+
+class _GatedContext(BenchContext):
+    """发送在 gate 打开前一直挂起，用来把队列稳定地堆满。"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+        self.delivered = []
+        self.delivered_at = []
+
+    async def send_message(self, target, message):
+        await self.gate.wait()
+        self.delivered.append((target, message.chain[0]))
+        self.delivered_at.append(time.monotonic())
+        return await super().send_message(target, message)
+
+
+async def _plugin(policy: str, timeout: int = 15, **config):
+    context = _GatedContext()
+    plugin = await make_plugin(
+        {
+            "data_dir": tempfile.mkdtemp(),
+            "render_as_image": False,
+            "send_workers": 1,
+            "send_queue_size": CAPACITY,
+            "send_queue_policy": policy,
+            "send_timeout_sec": timeout,
+            "send_coalesce_sec": 0,
+            "send_rate_limits": [],
+            **config,
+        },
+        context,
+    )
+    return plugin, context
+
+
+async def _fill(plugin, count: int) -> None:
+    """第一条被发送协程取走后挂在发送上，其余留在分片队列里。"""
+    for i in range(count):
+        await plugin._notify_to_targets(f"m{i}", [TARGET])
+        await asyncio.sleep(0)
+
+
+def _counter(plugin, name: str, **labels) -> float:
+    return sum(value for row_labels, value in plugin._metrics.counters_named(name) if row_labels == labels)
+
+
+def _dropped(plugin, reason: str) -> float:
+    return _counter(plugin, "send_dropped_total", reason=reason)
+
+
+def test_drop_oldest_keeps_newest_messages():
+    async def run():
+        plugin, context = await _plugin("drop_oldest")
+        try:
+            await _fill(plugin, CAPACITY + 3)
+            context.gate.set()
+            assert await plugin._flush_send_queue(5)
+            assert [text for _, text in context.delivered] == ["m0"] + [f"m{i}" for i in range(3, CAPACITY + 3)]
+            assert _dropped(plugin, "oldest") == 2
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_drop_newest_keeps_queued_messages():
+    async def run():
+        plugin, context = await _plugin("drop_newest")
+        try:
+            await _fill(plugin, CAPACITY + 3)
+            context.gate.set()
+            assert await plugin._flush_send_queue(5)
+            assert [text for _, text in context.delivered] == [f"m{i}" for i in range(CAPACITY + 1)]
+            assert _dropped(plugin, "newest") == 2
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_block_waits_for_space():
+    async def run():
+        plugin, context = await _plugin("block", timeout=5)
+        try:
+            await _fill(plugin, CAPACITY + 1)
+            blocked = asyncio.create_task(plugin._notify_to_targets("last", [TARGET]))
+            await asyncio.sleep(0.2)
+            assert not blocked.done()
+            context.gate.set()
+            await blocked
+            assert await plugin._flush_send_queue(5)
+            assert [text for _, text in context.delivered] == [f"m{i}" for i in range(CAPACITY + 1)] + ["last"]
+            assert _dropped(plugin, "newest") == 0
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_block_with_timeout_zero_waits_without_limit():
+    async def run():
+        # send_timeout_sec=0 表示不限时：队列满时一直等空位，而不是立即丢弃
+        plugin, context = await _plugin("block", timeout=0)
+        try:
+            await _fill(plugin, CAPACITY + 1)
+            blocked = asyncio.create_task(plugin._notify_to_targets("last", [TARGET]))
+            await asyncio.sleep(1.2)
+            assert not blocked.done()
+            assert _dropped(plugin, "newest") == 0
+            context.gate.set()
+            await blocked
+            assert await plugin._flush_send_queue(5)
+            assert [text for _, text in context.delivered] == [f"m{i}" for i in range(CAPACITY + 1)] + ["last"]
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_token_bucket():
+    bucket = main._TokenBucket(2.0, 2)
+    now = bucket.updated
+    assert bucket.delay(now) == 0
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.delay(now) == 0.5
+    assert bucket.delay(now + 0.5) == 0
+    unlimited = main._TokenBucket(0.0, 0)
+    unlimited.take(now)
+    assert unlimited.delay(now) == 0
+
+
+def test_rate_limit_defers_only_the_limited_platform():
+    async def run():
+        # aiocqhttp 每个会话每秒 1 条、不可突发；其他平台不限
+        plugin, context = await _plugin("drop_oldest", send_rate_limits=["aiocqhttp=60/1", "*=0"])
+        other = "qq_official:GroupMessage:2"
+        try:
+            context.gate.set()
+            started = time.monotonic()
+            await plugin._notify_to_targets("a0", [TARGET])
+            await plugin._notify_to_targets("a1", [TARGET])
+            await plugin._notify_to_targets("b0", [other])
+            await plugin._notify_to_targets("b1", [other])
+            assert await plugin._flush_send_queue(5)
+            order = [text for _, text in context.delivered]
+            # 被限流的会话等配额时，同分片的其他会话照常发送
+            assert order == ["a0", "b0", "b1", "a1"]
+            assert context.delivered_at[-1] - started >= 0.9
+            assert context.delivered_at[2] - started < 0.5
+            assert _counter(plugin, "send_delayed_total", platform="aiocqhttp") == 1
+            assert _counter(plugin, "send_delayed_total", platform="qq_official") == 0
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+def test_coalesce_merges_notices_per_target():
+    async def run():
+        plugin, context = await _plugin("drop_oldest", send_coalesce_sec=1)
+        other = "aiocqhttp:GroupMessage:2"
+        try:
+            context.gate.set()
+            for i in range(3):
+                await plugin._notify_to_targets(f"n{i}", [TARGET, other])
+            assert not context.delivered
+            # 不等窗口到期，直接冲刷：两个会话收到相同的合并通知
+            assert await plugin._flush_send_queue(5)
+            assert sorted(context.delivered) == [(TARGET, "n0\n\nn1\n\nn2"), (other, "n0\n\nn1\n\nn2")]
+            assert _counter(plugin, "send_coalesced_total") == 4
+        finally:
+            await plugin.terminate()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_drop_oldest_keeps_newest_messages()
+    test_drop_newest_keeps_queued_messages()
+    test_block_waits_for_space()
+    test_block_with_timeout_zero_waits_without_limit()
+    test_token_bucket()
+    test_rate_limit_defers_only_the_limited_platform()
+    test_coalesce_merges_notices_per_target()
+    print("ok")
@@ -0,0 +1,68 @@
+"""离线 SteamID 换算：各种写法互转、CS:GO 好友码往返与账号 ID 范围校验。
+
+运行：python -m pytest -q tests
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from _support import load_plugin  # noqa: E402
+
+main = load_plugin()
+
+KNOWN_STEAMID = 76561197960287930
+KNOWN_CODE = "SUCVS-FADA"
+
+
+def test_friend_code_known_pair():
+    assert main._encode_csgo_friend_code(KNOWN_STEAMID) == KNOWN_CODE
+    assert main._decode_csgo_friend_code(KNOWN_CODE) == KNOWN_STEAMID
+    assert main._parse_steamid(KNOWN_CODE) == KNOWN_STEAMID
+
+
+def test_friend_code_round_trip():
+    # base32 需要恰好 32 个字符；原先的字母表多了 'O'，编码结果与 CS:GO 客户端不一致
+    assert len(main.CSGO_FRIEND_CODE_ALPHABET) == 32
+    assert "O" not in main.CSGO_FRIEND_CODE_ALPHABET
+    rng = random.Random(0)
+    for account_id in [0, 1, 22202, 2**31, 2**32 - 1] + [rng.randrange(2**32) for _ in range(200)]:
+        steamid64 = account_id + main.STEAMID64_BASE
+        code = main._encode_csgo_friend_code(steamid64)
+        assert main.CSGO_FRIEND_CODE_RE.match(code)
+        assert main._decode_csgo_friend_code(code) == steamid64
+
+
+def test_friend_code_rejects_bad_input():
+    for code in ("SUCVS-FADB", "SUCVO-FADA", "SUCVS-FAD"):
+        with pytest.raises(ValueError):
+            main._decode_csgo_friend_code(code)
+
+
+def test_parse_forms_agree():
+    account_id = KNOWN_STEAMID - main.STEAMID64_BASE
+    for raw in (str(KNOWN_STEAMID), str(account_id), "STEAM_0:0:11101", "STEAM_1:0:11101", "[U:1:22202]", "U:1:22202"):
+        assert main._parse_steamid(raw) == KNOWN_STEAMID, raw
+    assert main._parse_steamid("not-an-id") is None
+
+
+def test_parse_rejects_account_id_out_of_range():
+    assert main._parse_steamid("[U:1:4294967295]") == 2**32 - 1 + main.STEAMID64_BASE
+    for raw in ("[U:1:9999999999]", "[U:1:4294967296]", "STEAM_0:1:2147483648", "4294967296"):
+        with pytest.raises(ValueError):
+            main._parse_steamid(raw)
+    converted = main._convert_steamids(["[U:1:9999999999]", "[U:1:22202]"])
+    assert converted["[U:1:9999999999]"] is None
+    assert converted["[U:1:22202]"].steamid64 == KNOWN_STEAMID
+
+
+if __name__ == "__main__":
+    test_friend_code_known_pair()
+    test_friend_code_round_trip()
+    test_friend_code_rejects_bad_input()
+    test_parse_forms_agree()
+    test_parse_rejects_account_id_out_of_range()
+    print("ok")